@@ -367,7 +367,7 @@ class BacktestEngineNew:
         
         return ticker_str
     
-    def run_backtest(self, start_date, end_date, strategy_func, tickers=None):
+    def run_backtest(self, start_date, end_date, strategy_func, tickers=None, initial_orders_func=None):
         """
         執行回測
         
@@ -376,6 +376,8 @@ class BacktestEngineNew:
         - end_date: 結束日期（'YYYY-MM-DD' 或 date 對象）
         - strategy_func: 策略函數
         - tickers: 要回測的股票代號列表（預設所有）
+        - initial_orders_func: 回測開始買進函數 (state, row, price_dict) -> 訂單序列（可選），
+          每日呼叫直到第一次回傳訂單為止，之後不再呼叫
         
         返回:
         - dict: 回測結果字典
@@ -445,38 +447,44 @@ class BacktestEngineNew:
         # 取得唯一的日期列表（所有 ticker 的日期合併）
         unique_dates = sorted(df['date'].unique())
         
+        # 預先將每日指標欄位取出為陣列（每個日期取第一筆資料，與迴圈內的 day_data.iloc[0] 相同）
+        first_rows = df.drop_duplicates('date').set_index('date').reindex(unique_dates)
+        signal_score_arr = self._indicator_array(first_rows, 'signal_景氣對策信號綜合分數')
+        m1b_arr = self._indicator_array(first_rows, 'leading_貨幣總計數M1B(百萬元)')
+        
+        # 預先依日期分組取得每日資料列的位置（保持 df 內原本的順序），
+        # 迴圈內不再對整個 df 做布林篩選、複製與 iterrows
+        day_codes = pd.Index(unique_dates).get_indexer(df['date'])
+        day_order = np.argsort(day_codes, kind='stable')
+        day_bounds = np.searchsorted(day_codes[day_order], np.arange(len(unique_dates) + 1))
+        ticker_list = df['ticker'].tolist()
+        close_list = df['close'].tolist()
+        
+        # 每個日期的第一筆資料一次轉為字典（策略使用的 row）
+        first_row_dicts = df.iloc[day_order[day_bounds[:-1]]].to_dict('records')
+        
         # 每日迭代
         prev_score = None
         prev_month_key = None
         
-        for date in unique_dates:
-            # 取得當天的所有資料（可能包含多個 ticker）
-            day_data = df[df['date'] == date].copy()
-            
-            if day_data.empty:
-                continue
+        for day_idx, date in enumerate(unique_dates):
+            # 取得第一個 ticker 的指標數據（假設同一天所有 ticker 的指標相同）
+            row_dict = first_row_dicts[day_idx]
             
-            # 建立價格字典
+            # 建立價格字典（當天所有 ticker 的資料列）
             price_dict = {}
-            for _, row in day_data.iterrows():
-                ticker = row['ticker']
-                close = row['close']
+            for pos in day_order[day_bounds[day_idx]:day_bounds[day_idx + 1]].tolist():
+                close = close_list[pos]
                 if pd.notna(close) and close > 0:
-                    price_dict[ticker] = close
+                    price_dict[ticker_list[pos]] = close
             
             if not price_dict:
                 # 如果當天沒有任何有效價格，跳過
                 continue
             
-            # 取得第一個 ticker 的指標數據（假設同一天所有 ticker 的指標相同）
-            first_row = day_data.iloc[0]
-            
-            # 轉換 row 為字典以便策略使用
-            row_dict = first_row.to_dict()
-            
             # 更新策略狀態（從 row_dict 取得指標數據）
-            score = row_dict.get('signal_景氣對策信號綜合分數')
-            if pd.notna(score):
+            score = signal_score_arr[day_idx]
+            if score == score:  # 非 NaN
                 strategy_state['score'] = float(score)
             else:
                 strategy_state['score'] = None
@@ -494,8 +502,8 @@ class BacktestEngineNew:
                 strategy_state['score_momentum'] = None
             
             # 更新 M1B 相關數據（從 leading_貨幣總計數M1B 取得）
-            m1b_value = row_dict.get('leading_貨幣總計數M1B(百萬元)')
-            if pd.notna(m1b_value):
+            m1b_value = m1b_arr[day_idx]
+            if m1b_value == m1b_value:  # 非 NaN
                 strategy_state['m1b_yoy_month'] = float(m1b_value)
             else:
                 strategy_state['m1b_yoy_month'] = None
@@ -646,8 +654,16 @@ class BacktestEngineNew:
                 if split_order['days_remaining'] < 0:
                     del split_orders[ticker]
             
-            # 2. 執行策略，取得新訂單
+            # 2. 執行策略，取得新訂單（回測開始買進的訂單排在最前面）
+            initial_orders = ()
+            if initial_orders_func is not None:
+                initial_orders = initial_orders_func(strategy_state, row_dict, price_dict)
+                if initial_orders:
+                    initial_orders_func = None  # 只執行一次
+            
             orders = strategy_func(strategy_state, date, row_dict, price_dict, self.positions, portfolio_value_before)
+            if initial_orders:
+                orders = [*initial_orders, *orders]
             
             # 3. 處理策略產生的新訂單
             for order in orders:
@@ -771,6 +787,21 @@ class BacktestEngineNew:
             'daily_prediction_debug': self.daily_prediction_debug  # 每日預測調試信息記錄
         }
     
+    def _indicator_array(self, first_rows, column):
+        """
+        取出指標欄位為 float 陣列（欄位不存在或無法轉為數值時為 NaN）
+        
+        參數:
+        - first_rows: 以日期為索引、每個日期一筆的資料
+        - column: 欄位名稱
+        
+        返回:
+        - np.ndarray(float64)
+        """
+        if column not in first_rows.columns:
+            return np.full(len(first_rows), np.nan)
+        return pd.to_numeric(first_rows[column], errors='coerce').to_numpy(dtype=float)
+    
     def _execute_order(self, order, date, price_dict):
         """
         執行訂單
@@ -36,6 +36,35 @@ except ImportError:
     Domain = None
     ContinuousVariable = None
 
+# Numba 為可選依賴，未安裝時 njit 不做事（函數以純 Python 執行）
+from utils._njit import njit
+
+
+@njit(cache=True)
+def _tree_predict_batch(X, feature, threshold, children_left, children_right, leaf_value):
+    """
+    以決策樹陣列逐筆走訪到葉節點並取得預測值
+    
+    參數:
+    - X: 特徵陣列（float32，與 scikit-learn 預測時的精度相同），形狀為 [n_samples, n_features]
+    - feature, threshold: 各節點的分割特徵索引與門檻（特徵值 <= 門檻時走左子樹）
+    - children_left, children_right: 各節點的子節點索引（葉節點為 -1）
+    - leaf_value: 各節點的預測值
+    
+    返回:
+    - 預測值陣列（float64）
+    """
+    out = np.empty(X.shape[0])
+    for i in range(X.shape[0]):
+        node = 0
+        while children_left[node] != -1:
+            if X[i, feature[node]] <= threshold[node]:
+                node = children_left[node]
+            else:
+                node = children_right[node]
+        out[i] = leaf_value[node]
+    return out
+
 
 class OrangeModelLoader:
     """
@@ -70,6 +99,9 @@ class OrangeModelLoader:
         self.model = None
         self.domain = None
         self.feature_names = None
+        self._predict_domains = {}  # 預測用 Domain 快取 {特徵數量: Domain}
+        self._column_orders = {}  # predict_array 欄位順序快取 {呼叫端特徵名稱: 欄位索引}
+        self._tree_arrays = None  # 決策樹節點陣列（scikit-learn 迴歸樹才有，供 predict_fast 使用）
         
         # 載入模型
         self._load_model()
@@ -112,6 +144,7 @@ class OrangeModelLoader:
                 print(f"[Orange] 成功載入 Orange 模型")
                 print(f"[Orange] 模型特徵數量: {len(self.feature_names)}")
                 print(f"[Orange] 特徵名稱: {self.feature_names}")
+                self._tree_arrays = self._extract_tree_arrays()
             else:
                 print("[Orange Warning] 模型沒有 domain 資訊，需要手動指定特徵名稱")
                 self.feature_names = None
@@ -147,7 +180,145 @@ class OrangeModelLoader:
         # 轉換輸入數據為 Orange Table
         orange_table = self._convert_to_orange_table(data)
         
-        # 進行預測
+        return self._predict_table(orange_table)
+    
+    def predict_array(self, X, feature_names=None):
+        """
+        直接以 numpy 陣列進行預測（不經過 DataFrame 轉換，供回測逐筆或批次呼叫）
+        
+        參數:
+        - X: 特徵陣列，形狀為 [n_samples, n_features]（一維陣列視為單筆）
+        - feature_names: X 各欄對應的特徵名稱（可選）；提供時會依模型的特徵順序重新排列欄位
+        
+        返回:
+        - 預測值（numpy array）
+        
+        異常:
+        - RuntimeError: 如果模型未載入或預測失敗
+        - ValueError: 如果特徵缺失或數據包含 NaN
+        """
+        X = self._prepare_array(X, feature_names)
+        return self._predict_table(Table.from_numpy(self._predict_domain(X.shape[1]), X))
+    
+    def predict_fast(self, X, feature_names=None):
+        """
+        以編譯後的決策樹走訪進行預測（略過 Orange Table 與 Domain）
+        
+        只有 scikit-learn 迴歸樹包裝的模型能取得節點陣列；其他模型（例如 Orange 原生 TreeModel）
+        自動改用 predict_array，結果相同。
+        
+        參數:
+        - X: 特徵陣列，形狀為 [n_samples, n_features]（一維陣列視為單筆）
+        - feature_names: X 各欄對應的特徵名稱（可選），用法同 predict_array
+        
+        返回:
+        - 預測值（numpy array）
+        """
+        if self._tree_arrays is None:
+            return self.predict_array(X, feature_names)
+        
+        X = self._prepare_array(X, feature_names)
+        # scikit-learn 預測時先把特徵轉為 float32 再與門檻比較，這裡採用相同精度
+        return _tree_predict_batch(X.astype(np.float32), *self._tree_arrays)
+    
+    def _prepare_array(self, X, feature_names):
+        """
+        將輸入轉為依模型特徵順序排列的二維 float64 陣列並檢查缺失值
+        
+        參數:
+        - X: 特徵陣列
+        - feature_names: X 各欄對應的特徵名稱（可選）
+        
+        返回:
+        - 二維 float64 陣列
+        """
+        if self.model is None:
+            raise RuntimeError("模型未載入")
+        
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        
+        if feature_names is not None and self.feature_names:
+            X = X[:, self._column_order(feature_names)]
+        
+        if np.isnan(X).any():
+            raise ValueError("輸入數據包含缺失值（NaN），無法進行預測")
+        
+        return X
+    
+    def _extract_tree_arrays(self):
+        """
+        從 scikit-learn 迴歸樹包裝的 Orange 模型取出節點陣列
+        
+        返回:
+        - (feature, threshold, children_left, children_right, leaf_value)，模型不是單輸出迴歸樹時返回 None
+        """
+        tree = getattr(getattr(self.model, 'skl_model', None), 'tree_', None)
+        if tree is None or getattr(tree, 'n_outputs', None) != 1 or tree.value.shape[2] != 1:
+            return None
+        
+        return (
+            np.ascontiguousarray(tree.feature, dtype=np.int64),
+            np.ascontiguousarray(tree.threshold, dtype=np.float64),
+            np.ascontiguousarray(tree.children_left, dtype=np.int64),
+            np.ascontiguousarray(tree.children_right, dtype=np.int64),
+            np.ascontiguousarray(tree.value[:, 0, 0], dtype=np.float64),
+        )
+    
+    def _column_order(self, feature_names):
+        """
+        取得呼叫端特徵欄位對應到模型特徵順序的索引（依特徵名稱快取）
+        
+        參數:
+        - feature_names: 呼叫端陣列各欄的特徵名稱
+        
+        返回:
+        - 欄位索引列表
+        
+        異常:
+        - ValueError: 如果缺少模型需要的特徵
+        """
+        key = tuple(feature_names)
+        order = self._column_orders.get(key)
+        if order is None:
+            missing_features = [f for f in self.feature_names if f not in key]
+            if missing_features:
+                raise ValueError(f"缺少 Orange 模型需要的特徵: {missing_features}")
+            order = self._column_orders[key] = [key.index(f) for f in self.feature_names]
+        return order
+    
+    def _predict_domain(self, n_features):
+        """
+        取得預測用的 Orange Domain（只含特徵，不含目標變量；建立一次後快取）
+        
+        參數:
+        - n_features: 特徵數量（模型沒有 domain 時用於建立欄位）
+        
+        返回:
+        - Orange Domain 對象
+        """
+        domain = self._predict_domains.get(n_features)
+        if domain is None:
+            if self.domain is not None:
+                # 使用模型的 domain，但只保留 attributes（不包含 class_var）
+                domain = Domain(self.domain.attributes)
+            else:
+                # 手動建立 domain
+                domain = Domain([ContinuousVariable(f"feature_{i}") for i in range(n_features)])
+            self._predict_domains[n_features] = domain
+        return domain
+    
+    def _predict_table(self, orange_table):
+        """
+        以 Orange Table 呼叫模型預測
+        
+        參數:
+        - orange_table: Orange Table 對象
+        
+        返回:
+        - 預測值（numpy array）
+        """
         try:
             predictions = self.model(orange_table)
             # 轉換為 numpy array
@@ -198,19 +369,9 @@ class OrangeModelLoader:
         if np.isnan(feature_data).any():
             raise ValueError("輸入數據包含缺失值（NaN），無法進行預測")
         
-        # 建立 Orange Domain
-        # 預測時只需要 attributes（特徵），不需要 class variable（目標變量）
-        if self.domain is not None:
-            # 使用模型的 domain，但只保留 attributes（不包含 class_var）
-            # 這對於預測是正確的，因為我們只提供特徵，不提供目標值
-            domain = Domain(self.domain.attributes)
-        else:
-            # 手動建立 domain
-            attributes = [ContinuousVariable(f"feature_{i}") for i in range(feature_data.shape[1])]
-            domain = Domain(attributes)
-        
         # 建立 Orange Table
-        orange_table = Table.from_numpy(domain, feature_data)
+        # 預測時只需要 attributes（特徵），不需要 class variable（目標變量）
+        orange_table = Table.from_numpy(self._predict_domain(feature_data.shape[1]), feature_data)
         
         return orange_table
     
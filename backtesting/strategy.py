@@ -3,10 +3,113 @@
 參考範例程式碼的策略邏輯
 """
 
+from bisect import bisect_right
+from functools import lru_cache
+
+import numpy as np
+
+
+# 燈號等級（由低到高）與各等級分數下界、上界（國發會標準）
+# 藍燈：9-16分、黃藍燈：17-22分、綠燈：23-31分、黃紅燈：32-37分、紅燈：38-45分
+_SIGNAL_LEVELS = ('blue', 'yellow_blue', 'green', 'yellow_red', 'red')
+_SIGNAL_LEVEL_LOWER_BOUNDS = (9, 17, 23, 32, 38)
+_SIGNAL_LEVEL_UPPER_BOUNDS = (16, 22, 31, 37, float('inf'))
+
+
+# 批次訂單的結構化陣列格式（參數掃描時供下游向量化處理）
+# action：0=買進、1=賣出；ticker：_intern_ticker 配發的股票代號編號
+ORDER_DTYPE = np.dtype([('day', 'i4'), ('action', 'u1'), ('ticker', 'u2'), ('percent', 'f8')])
+_ORDER_ACTION_CODES = {'buy': 0, 'sell': 1}
+
+# 股票代號 → 整數編號（跨策略實例共用，於建構時配發）
+_TICKER_IDS = {}
+
+
+def _intern_ticker(ticker):
+    """
+    取得股票代號對應的整數編號（首次出現時配發新編號）
+    
+    參數:
+    - ticker: 股票代號（例如 '006208'）
+    
+    回傳:
+    - 整數編號；ticker 為 None 時回傳 None
+    """
+    if ticker is None:
+        return None
+    return _TICKER_IDS.setdefault(ticker, len(_TICKER_IDS))
+
+
+# 無訂單時共用的空結果（不可變，避免每日配置新的空列表）
+_EMPTY_ORDERS = ()
+
+
+@lru_cache(maxsize=64)
+def _signal_level_index(score):
+    """
+    將景氣燈號分數轉換為燈號等級索引（對應 _SIGNAL_LEVELS）
+    分數只有約 50 種可能值，結果跨策略實例快取共用
+    
+    參數:
+    - score: 景氣對策信號綜合分數
+    
+    回傳:
+    - 燈號等級索引（0-4），分數缺失（None/NaN）、< 9 或落在區間之間（例如 16.5）時回傳 None
+    """
+    # NaN 與任何數比較皆為 False，以 not >= 排除
+    if score is None or not score >= 9:
+        return None
+    index = bisect_right(_SIGNAL_LEVEL_LOWER_BOUNDS, score) - 1
+    if score > _SIGNAL_LEVEL_UPPER_BOUNDS[index]:
+        return None
+    return index
+
+
+def _holding_pct(shares, price, portfolio_value):
+    """
+    計算單一持倉佔投資組合的比例（純數值運算，不依賴策略實例）
+    
+    參數:
+    - shares: 持有股數
+    - price: 當日價格
+    - portfolio_value: 投資組合總價值
+    
+    回傳:
+    - 持倉比例，投資組合價值 <= 0 時回傳 0
+    """
+    return shares * price / portfolio_value if portfolio_value > 0 else 0
+
+
+def _dynamic_target_position(score, score_momentum, m1b_momentum):
+    """
+    計算動態倉位策略的目標股票倉位（以布林運算取代多層分支）
+    
+    - 藍燈（9-16分）：100% 倉位
+    - 黃藍燈、綠燈（17-22、23-31分）：分數驟降（動能 < -2）時 50%，否則 100%
+    - 黃紅燈、紅燈（32-37、38分以上）：價量背離（M1B 動能 < 0）時 0%，否則 50%
+    - 其他分數（< 9 或落在區間之間，例如 22.5、37.5）：0%
+    
+    參數:
+    - score: 景氣對策信號綜合分數
+    - score_momentum: 景氣分數動能（可為 None）
+    - m1b_momentum: M1B 年增率動能（可為 None）
+    
+    回傳:
+    - 目標股票倉位比例（0.0 - 1.0）
+    """
+    score_drop = score_momentum is not None and score_momentum < -2
+    divergence = m1b_momentum is not None and m1b_momentum < 0
+    return ((9 <= score <= 16) * 1.0
+            + (17 <= score <= 22 or 23 <= score <= 31) * (1.0 - 0.5 * score_drop)
+            + (32 <= score <= 37 or score >= 38) * (0.5 - 0.5 * divergence))
+
 
 class CycleStrategy:
     """景氣週期投資策略基類"""
     
+    # 產生訂單時是否依賴當前持倉與投資組合價值（為 True 時不支援 generate_all_orders）
+    _REQUIRES_POSITIONS = False
+    
     def __init__(self, stock_ticker='006208', hedge_ticker=None):
         """
         初始化策略
@@ -17,6 +120,8 @@ class CycleStrategy:
         """
         self.stock_ticker = stock_ticker
         self.hedge_ticker = hedge_ticker
+        self._stock_id = _intern_ticker(stock_ticker)
+        self._hedge_id = _intern_ticker(hedge_ticker)
     
     def _create_trade_step(self, reason, state, additional_conditions=None):
         """
@@ -31,31 +136,32 @@ class CycleStrategy:
         - 交易步驟字典 {'reason': str, 'conditions': [{'name': str, 'value': float}, ...]}
         """
         conditions = []
+        get = state.get
         
         # 添加景氣燈號分數
-        score = state.get('score')
+        score = get('score')
         if score is not None:
             conditions.append({'name': '景氣燈號分數', 'value': score})
         
         # 添加M1B相關條件（如果有）
-        m1b_yoy_momentum = state.get('m1b_yoy_momentum')
+        m1b_yoy_momentum = get('m1b_yoy_momentum')
         if m1b_yoy_momentum is not None:
             conditions.append({'name': 'M1B年增率動能', 'value': m1b_yoy_momentum})
         
-        m1b_mom = state.get('m1b_mom')
+        m1b_mom = get('m1b_mom')
         if m1b_mom is not None:
             conditions.append({'name': 'M1B動能', 'value': m1b_mom})
         
-        m1b_yoy_month = state.get('m1b_yoy_month')
+        m1b_yoy_month = get('m1b_yoy_month')
         if m1b_yoy_month is not None:
             conditions.append({'name': 'M1B年增率', 'value': m1b_yoy_month})
         
-        m1b_vs_3m_avg = state.get('m1b_vs_3m_avg')
+        m1b_vs_3m_avg = get('m1b_vs_3m_avg')
         if m1b_vs_3m_avg is not None:
             conditions.append({'name': 'M1Bvs3月平均', 'value': m1b_vs_3m_avg})
         
         # 添加分數動能（如果有）
-        score_momentum = state.get('score_momentum')
+        score_momentum = get('score_momentum')
         if score_momentum is not None:
             conditions.append({'name': '景氣分數動能', 'value': score_momentum})
         
@@ -68,6 +174,116 @@ class CycleStrategy:
             'conditions': conditions
         }
     
+    def _emit_blue(self, state, orders, split_execution=False):
+        """
+        藍燈：買進股票，若持有避險資產則一併賣出
+        
+        參數:
+        - state: 策略狀態字典
+        - orders: 訂單列表（直接附加）
+        - split_execution: 是否標記為分批執行
+        """
+        buy_order = {
+            'action': 'buy',
+            'ticker': self.stock_ticker,
+            'percent': 1.0,
+            'trade_step': self._create_trade_step('藍燈買進', state)
+        }
+        if split_execution:
+            buy_order['split_execution'] = True  # 標記需要分批執行
+        orders.append(buy_order)
+        state['state'] = True
+        
+        if self.hedge_ticker and state.get('hedge_state', False):
+            sell_order = {
+                'action': 'sell',
+                'ticker': self.hedge_ticker,
+                'percent': 1.0,
+                'trade_step': self._create_trade_step('藍燈賣出避險資產', state)
+            }
+            if split_execution:
+                sell_order['split_execution'] = True  # 標記需要分批執行
+                sell_order['is_hedge_sell'] = True  # 標記為避險資產賣出
+            orders.append(sell_order)
+            state['hedge_state'] = False
+    
+    def _emit_first_entry(self, state, orders):
+        """
+        首次進入非藍燈、非紅燈區間時，若尚未持有股票則直接買進（不需要分批）
+        
+        參數:
+        - state: 策略狀態字典
+        - orders: 訂單列表（直接附加）
+        """
+        if state.get('a', 0) == 0:
+            state['a'] = 1
+            if not state.get('state', False):
+                orders.append({
+                    'action': 'buy',
+                    'ticker': self.stock_ticker,
+                    'percent': 1.0,
+                    'trade_step': self._create_trade_step('首次進入買進', state)
+                })
+                state['state'] = True
+    
+    def _emit_rebalance(self, state, orders, ticker, diff, reasons, conditions, target_pct=None, is_hedge=False):
+        """
+        依有號的比例差額產生單筆調整訂單（正值增持買進、負值減持賣出）
+        
+        參數:
+        - state: 策略狀態字典
+        - orders: 訂單列表（直接附加）
+        - ticker: 標的代號
+        - diff: 目標比例 - 當前比例
+        - reasons: (增持原因, 減持原因)
+        - conditions: 交易步驟的額外條件列表
+        - target_pct: 目標持倉比例（可選，會寫入 target_position_pct）
+        - is_hedge: 是否為避險資產（增持時標記 is_hedge_buy）
+        """
+        is_buy = diff > 0
+        order = {
+            'action': 'buy' if is_buy else 'sell',
+            'ticker': ticker,
+            'percent': abs(diff)
+        }
+        if target_pct is not None:
+            order['target_position_pct'] = target_pct
+        if is_hedge and is_buy:
+            order['is_hedge_buy'] = True
+        order['trade_step'] = self._create_trade_step(reasons[0] if is_buy else reasons[1], state, conditions)
+        orders.append(order)
+    
+    def generate_all_orders(self, states, dates, price_dicts):
+        """
+        逐日產生訂單並打包為結構化陣列（不含持倉資訊，適用於訊號層級的參數掃描）
+        只支援僅依景氣燈號產生訂單的策略（CycleStrategy 與各避險資產子類）；
+        依賴持倉的策略沒有持倉資訊時每日都會走首次配置分支，因此直接拒絕
+        
+        參數:
+        - states: 每日策略狀態字典序列（如 score、m1b_yoy_momentum），會依序合併到同一個策略狀態中
+        - dates: 交易日期序列
+        - price_dicts: 每日價格字典序列
+        
+        回傳:
+        - numpy 結構化陣列（dtype 為 ORDER_DTYPE），day 欄位為序列中的索引
+        """
+        if self._REQUIRES_POSITIONS:
+            raise TypeError(f"{type(self).__name__} 產生訂單需要持倉資訊，不支援 generate_all_orders")
+        
+        ticker_ids = {self.stock_ticker: self._stock_id}
+        if self.hedge_ticker:
+            ticker_ids[self.hedge_ticker] = self._hedge_id
+        
+        state = {}
+        records = []
+        append = records.append
+        for day, (day_state, date, price_dict) in enumerate(zip(states, dates, price_dicts)):
+            state.update(day_state)
+            for order in self.generate_orders(state, date, price_dict):
+                append((day, _ORDER_ACTION_CODES[order['action']], ticker_ids[order['ticker']], order['percent']))
+        
+        return np.array(records, dtype=ORDER_DTYPE)
+    
     def generate_orders(self, state, date, price_dict, positions=None, portfolio_value=None):
         """
         根據策略狀態和景氣燈號產生訂單
@@ -82,67 +298,54 @@ class CycleStrategy:
         回傳:
         - 訂單列表
         """
-        orders = []
-        score = state.get('score')
+        # 綁定為區域變數，避免每日呼叫時重複查找屬性與方法
+        get = state.get
+        stock_ticker = self.stock_ticker
+        hedge_ticker = self.hedge_ticker
+        score = get('score')
         
         if score is None:
-            return orders
+            return _EMPTY_ORDERS
+        
+        # 快速路徑：藍燈與紅燈之間且已完成首次進入時不會產生任何訂單（回測中最常見的情況）
+        if 16 < score < 38 and get('a', 0) != 0:
+            return _EMPTY_ORDERS
+        
+        orders = []
+        append = orders.append
         
         # 檢查分批執行標記
-        should_buy_in_split = state.get('should_buy_in_split', False)
-        should_sell_in_split = state.get('should_sell_in_split', False)
+        should_buy_in_split = get('should_buy_in_split', False)
+        should_sell_in_split = get('should_sell_in_split', False)
         
         # SCORE <= 16（藍燈）：買進股票，賣出避險資產
         if score <= 16:
             # 如果是首次買進（state['state'] 為 False），或者是在分批買進窗口內
-            if not state.get('state', False) or should_buy_in_split:
+            if not get('state', False) or should_buy_in_split:
                 # 只有在分批買進時間窗口內才產生訂單
                 if should_buy_in_split:
                     # 添加調試日誌
                     if date.year >= 2021:
-                        print(f"[DEBUG Strategy] {date.strftime('%Y-%m-%d')} 藍燈買進條件滿足: score={score}, state['state']={state.get('state', False)}, should_buy_in_split={should_buy_in_split}")
-                    trade_step = self._create_trade_step('藍燈買進', state)
-                    orders.append({
-                        'action': 'buy',
-                        'ticker': self.stock_ticker,
-                        'percent': 1.0,
-                        'split_execution': True,  # 標記需要分批執行
-                        'trade_step': trade_step
-                    })
-                    # 只在首次買進時設置 state['state'] = True
-                    # 後續的分批買進不會再次設置，因為已經是 True
-                    if not state.get('state', False):
-                        state['state'] = True
-                    
-                    # 如果有避險資產且持有，則賣出（也要分批）
-                    if self.hedge_ticker and state.get('hedge_state', False):
-                        hedge_trade_step = self._create_trade_step('藍燈賣出避險資產', state)
-                        orders.append({
-                            'action': 'sell',
-                            'ticker': self.hedge_ticker,
-                            'percent': 1.0,
-                            'split_execution': True,  # 標記需要分批執行
-                            'is_hedge_sell': True,  # 標記為避險資產賣出
-                            'trade_step': hedge_trade_step
-                        })
-                        state['hedge_state'] = False
+                        print(f"[DEBUG Strategy] {date.strftime('%Y-%m-%d')} 藍燈買進條件滿足: score={score}, state['state']={get('state', False)}, should_buy_in_split={should_buy_in_split}")
+                    # 買進股票並賣出避險資產（都要分批）
+                    self._emit_blue(state, orders, split_execution=True)
             else:
                 # 添加調試日誌 - 藍燈但不在買進窗口內
                 if date.year >= 2021:
-                    print(f"[DEBUG Strategy] {date.strftime('%Y-%m-%d')} 藍燈但不在買進窗口: score={score}, state['state']={state.get('state', False)}, should_buy_in_split={should_buy_in_split}")
+                    print(f"[DEBUG Strategy] {date.strftime('%Y-%m-%d')} 藍燈但不在買進窗口: score={score}, state['state']={get('state', False)}, should_buy_in_split={should_buy_in_split}")
         else:
             # 添加調試日誌 - 藍燈但條件不滿足
             if date.year >= 2021 and score <= 16 and should_buy_in_split:
-                print(f"[DEBUG Strategy] {date.strftime('%Y-%m-%d')} 藍燈買進條件不滿足: score={score}, state['state']={state.get('state', False)}, should_buy_in_split={should_buy_in_split}, 條件檢查: score<=16={score <= 16}, not state={not state.get('state', False)}")
+                print(f"[DEBUG Strategy] {date.strftime('%Y-%m-%d')} 藍燈買進條件不滿足: score={score}, state['state']={get('state', False)}, should_buy_in_split={should_buy_in_split}, 條件檢查: score<=16={score <= 16}, not state={not get('state', False)}")
         
         # SCORE >= 38（紅燈）：賣出股票，買進避險資產
-        if score >= 38 and state.get('state', False):
+        if score >= 38 and get('state', False):
             # 只有在分批賣出時間窗口內才產生訂單
             if should_sell_in_split:
                 trade_step = self._create_trade_step('紅燈賣出', state)
-                orders.append({
+                append({
                     'action': 'sell',
-                    'ticker': self.stock_ticker,
+                    'ticker': stock_ticker,
                     'percent': 1.0,
                     'split_execution': True,  # 標記需要分批執行
                     'trigger_hedge_buy': True,  # 標記需要同時買進避險資產
@@ -151,11 +354,11 @@ class CycleStrategy:
                 state['state'] = False
                 
                 # 如果有避險資產，則買進（需要同步分批）
-                if self.hedge_ticker and not state.get('hedge_state', False):
+                if hedge_ticker and not get('hedge_state', False):
                     hedge_trade_step = self._create_trade_step('紅燈買進避險資產', state)
-                    orders.append({
+                    append({
                         'action': 'buy',
-                        'ticker': self.hedge_ticker,
+                        'ticker': hedge_ticker,
                         'percent': 1.0,
                         'split_execution': True,  # 標記需要分批執行
                         'is_hedge_buy': True,  # 標記為避險資產買進
@@ -166,18 +369,7 @@ class CycleStrategy:
         
         # 16 < SCORE < 38：首次進入時買進股票
         if 16 < score < 38:
-            if state.get('a', 0) == 0:
-                state['a'] = 1
-                if not state.get('state', False):
-                    # 首次進入時直接買進（不需要分批）
-                    trade_step = self._create_trade_step('首次進入買進', state)
-                    orders.append({
-                        'action': 'buy',
-                        'ticker': self.stock_ticker,
-                        'percent': 1.0,
-                        'trade_step': trade_step
-                    })
-                    state['state'] = True
+            self._emit_first_entry(state, orders)
         
         return orders
 
@@ -213,6 +405,8 @@ class InverseETFStrategy(CycleStrategy):
 class FiftyFiftyStrategy(CycleStrategy):
     """50:50 配置策略（股票和避險資產各50%）"""
     
+    _REQUIRES_POSITIONS = True
+    
     def __init__(self, stock_ticker='006208', hedge_ticker='00865B'):
         super().__init__(stock_ticker, hedge_ticker)
     
@@ -231,39 +425,31 @@ class FiftyFiftyStrategy(CycleStrategy):
         回傳:
         - 訂單列表
         """
-        orders = []
-        score = state.get('score')
+        # 綁定為區域變數，避免每日呼叫時重複查找屬性與方法
+        get = state.get
+        stock_ticker = self.stock_ticker
+        hedge_ticker = self.hedge_ticker
+        score = get('score')
         
         if score is None:
-            return orders
+            return _EMPTY_ORDERS
+        
+        # 快速路徑：藍燈與紅燈之間且已完成首次進入時不會產生任何訂單（回測中最常見的情況）
+        if 16 < score < 38 and get('a', 0) != 0:
+            return _EMPTY_ORDERS
+        
+        orders = []
+        append = orders.append
         
         # SCORE <= 16（藍燈）：100% 買進股票，賣出避險資產
-        if score <= 16 and not state.get('state', False):
-            trade_step = self._create_trade_step('藍燈買進', state)
-            orders.append({
-                'action': 'buy',
-                'ticker': self.stock_ticker,
-                'percent': 1.0,
-                'trade_step': trade_step
-            })
-            state['state'] = True
-            
-            if self.hedge_ticker and state.get('hedge_state', False):
-                hedge_trade_step = self._create_trade_step('藍燈賣出避險資產', state)
-                orders.append({
-                    'action': 'sell',
-                    'ticker': self.hedge_ticker,
-                    'percent': 1.0,
-                    'trade_step': hedge_trade_step
-                })
-                state['hedge_state'] = False
+        if score <= 16 and not get('state', False):
+            self._emit_blue(state, orders)
         
         # SCORE >= 38（紅燈）：保留 50% 股票，買進 50% 避險資產
-        elif score >= 38 and state.get('state', False):
+        elif score >= 38 and get('state', False):
             # 計算當前持倉比例
             if positions and portfolio_value:
-                current_stock_value = positions.get(self.stock_ticker, 0) * price_dict.get(self.stock_ticker, 0)
-                current_stock_pct = current_stock_value / portfolio_value if portfolio_value > 0 else 0
+                current_stock_pct = _holding_pct(positions.get(stock_ticker, 0), price_dict.get(stock_ticker, 0), portfolio_value)
                 
                 # 如果股票比例 > 55%，需要減碼至50%
                 if current_stock_pct > 0.55:
@@ -271,19 +457,18 @@ class FiftyFiftyStrategy(CycleStrategy):
                     trade_step = self._create_trade_step('紅燈減碼至50%', state, [
                         {'name': '當前股票比例', 'value': current_stock_pct}
                     ])
-                    orders.append({
+                    append({
                         'action': 'sell',
-                        'ticker': self.stock_ticker,
+                        'ticker': stock_ticker,
                         'percent': sell_pct,
                         'trigger_hedge_buy': True,
-                        'hedge_ticker': self.hedge_ticker,
+                        'hedge_ticker': hedge_ticker,
                         'trade_step': trade_step
                     })
                     
                     # 同步買進避險資產
-                    if self.hedge_ticker:
-                        current_hedge_value = positions.get(self.hedge_ticker, 0) * price_dict.get(self.hedge_ticker, 0)
-                        current_hedge_pct = current_hedge_value / portfolio_value if portfolio_value > 0 else 0
+                    if hedge_ticker:
+                        current_hedge_pct = _holding_pct(positions.get(hedge_ticker, 0), price_dict.get(hedge_ticker, 0), portfolio_value)
                         target_hedge_pct = 0.5
                         hedge_diff = target_hedge_pct - current_hedge_pct
                         
@@ -292,9 +477,9 @@ class FiftyFiftyStrategy(CycleStrategy):
                                 {'name': '當前避險資產比例', 'value': current_hedge_pct},
                                 {'name': '目標避險資產比例', 'value': target_hedge_pct}
                             ])
-                            orders.append({
+                            append({
                                 'action': 'buy',
-                                'ticker': self.hedge_ticker,
+                                'ticker': hedge_ticker,
                                 'percent': hedge_diff,
                                 'is_hedge_buy': True,
                                 'trade_step': hedge_trade_step
@@ -303,20 +488,20 @@ class FiftyFiftyStrategy(CycleStrategy):
             else:
                 # 如果沒有持倉資訊，賣出50%股票並買進50%避險資產
                 trade_step = self._create_trade_step('紅燈減碼至50%', state)
-                orders.append({
+                append({
                     'action': 'sell',
-                    'ticker': self.stock_ticker,
+                    'ticker': stock_ticker,
                     'percent': 0.5,
                     'trigger_hedge_buy': True,
-                    'hedge_ticker': self.hedge_ticker,
+                    'hedge_ticker': hedge_ticker,
                     'trade_step': trade_step
                 })
                 
-                if self.hedge_ticker:
+                if hedge_ticker:
                     hedge_trade_step = self._create_trade_step('紅燈買進避險資產至50%', state)
-                    orders.append({
+                    append({
                         'action': 'buy',
-                        'ticker': self.hedge_ticker,
+                        'ticker': hedge_ticker,
                         'percent': 0.5,
                         'is_hedge_buy': True,
                         'trade_step': hedge_trade_step
@@ -325,17 +510,7 @@ class FiftyFiftyStrategy(CycleStrategy):
         
         # 16 < SCORE < 38：首次進入時買進股票
         elif 16 < score < 38:
-            if state.get('a', 0) == 0:
-                state['a'] = 1
-                if not state.get('state', False):
-                    trade_step = self._create_trade_step('首次進入買進', state)
-                    orders.append({
-                        'action': 'buy',
-                        'ticker': self.stock_ticker,
-                        'percent': 1.0,
-                        'trade_step': trade_step
-                    })
-                    state['state'] = True
+            self._emit_first_entry(state, orders)
         
         return orders
 
@@ -343,47 +518,36 @@ class FiftyFiftyStrategy(CycleStrategy):
 class ProportionalAllocationStrategy(CycleStrategy):
     """等比例配置策略（006208:短期美債，根據景氣燈號等比例配置）"""
     
+    _REQUIRES_POSITIONS = True
+    
+    # 定義燈號等級和對應的股票配置比例（依燈號等級索引排列，所有實例共用）
+    # 燈號從低到高：藍燈、黃藍燈、綠燈、黃紅燈、紅燈
+    # 股票比例從高到低：100%, 80%, 60%, 40%, 20%
+    _ALLOCATION_TABLE = (
+        ('blue', 1.0, 0.0),         # 藍燈：100% 股票, 0% 債券
+        ('yellow_blue', 0.8, 0.2),  # 黃藍燈：80% 股票, 20% 債券
+        ('green', 0.6, 0.4),        # 綠燈：60% 股票, 40% 債券
+        ('yellow_red', 0.4, 0.6),   # 黃紅燈：40% 股票, 60% 債券
+        ('red', 0.2, 0.8)           # 紅燈：20% 股票, 80% 債券
+    )
+    
     def __init__(self, stock_ticker='006208', hedge_ticker='00865B'):
         super().__init__(stock_ticker, hedge_ticker)
-        
-        # 定義燈號等級和對應的股票配置比例
-        # 燈號從低到高：藍燈、黃藍燈、綠燈、黃紅燈、紅燈
-        # 股票比例從高到低：100%, 80%, 60%, 40%, 20%
-        self.allocation_rules = {
-            'blue': {'stock_pct': 1.0, 'bond_pct': 0.0},      # 藍燈：100% 股票, 0% 債券
-            'yellow_blue': {'stock_pct': 0.8, 'bond_pct': 0.2}, # 黃藍燈：80% 股票, 20% 債券
-            'green': {'stock_pct': 0.6, 'bond_pct': 0.4},     # 綠燈：60% 股票, 40% 債券
-            'yellow_red': {'stock_pct': 0.4, 'bond_pct': 0.6}, # 黃紅燈：40% 股票, 60% 債券
-            'red': {'stock_pct': 0.2, 'bond_pct': 0.8}        # 紅燈：20% 股票, 80% 債券
-        }
     
-    def _get_signal_level(self, score):
+    def _get_allocation(self, score):
         """
-        根據景氣燈號分數判斷燈號等級
+        根據景氣燈號分數取得燈號等級與目標配置比例
         
         參數:
         - score: 景氣對策信號綜合分數
         
         回傳:
-        - 燈號等級字串
+        - (燈號等級, 股票比例, 債券比例)，分數缺失或 < 9 時回傳 None
         """
-        if score is None:
-            return None
-        
-        # 根據官方景氣燈號分數區間（國發會標準）
-        # 藍燈：9-16分、黃藍燈：17-22分、綠燈：23-31分、黃紅燈：32-37分、紅燈：38-45分
-        if 9 <= score <= 16:
-            return 'blue'  # 藍燈
-        elif 17 <= score <= 22:
-            return 'yellow_blue'  # 黃藍燈
-        elif 23 <= score <= 31:
-            return 'green'  # 綠燈
-        elif 32 <= score <= 37:
-            return 'yellow_red'  # 黃紅燈
-        elif score >= 38:
-            return 'red'  # 紅燈
-        else:
-            return None  # 分數 < 9，可能是資料缺失
+        level_index = _signal_level_index(score)
+        if level_index is None:
+            return None  # 分數缺失或 < 9，可能是資料缺失
+        return self._ALLOCATION_TABLE[level_index]
     
     def generate_orders(self, state, date, price_dict, positions=None, portfolio_value=None):
         """
@@ -399,61 +563,70 @@ class ProportionalAllocationStrategy(CycleStrategy):
         回傳:
         - 訂單列表
         """
-        orders = []
         score = state.get('score')
         
         if score is None:
-            return orders
+            return _EMPTY_ORDERS
         
-        # 取得當前的燈號等級
-        signal_level = self._get_signal_level(score)
+        # 取得當前的燈號等級與目標配置比例
+        allocation = self._get_allocation(score)
         
-        if signal_level is None:
-            return orders
+        if allocation is None:
+            return _EMPTY_ORDERS
         
-        # 取得目標配置比例
-        target_allocation = self.allocation_rules.get(signal_level)
+        return self._generate_allocation_orders(state, allocation, price_dict, positions, portfolio_value)
+    
+    def _generate_allocation_orders(self, state, allocation, price_dict, positions, portfolio_value):
+        """
+        依已分類的燈號等級產生等比例配置的調整訂單
         
-        if target_allocation is None:
-            return orders
+        參數:
+        - state: 策略狀態字典
+        - allocation: _get_allocation 的結果 (燈號等級, 股票比例, 債券比例)
+        - price_dict: 價格字典
+        - positions: 當前持倉字典 {ticker: shares}
+        - portfolio_value: 當前投資組合總價值
         
-        target_stock_pct = target_allocation['stock_pct']
-        target_bond_pct = target_allocation['bond_pct']
+        回傳:
+        - 訂單列表
+        """
+        # 綁定為區域變數，避免每日呼叫時重複查找屬性與方法
+        stock_ticker = self.stock_ticker
+        hedge_ticker = self.hedge_ticker
+        signal_level, target_stock_pct, target_bond_pct = allocation
         
         # 如果沒有持倉資訊，首次配置
         if positions is None or portfolio_value is None or portfolio_value <= 0:
+            orders = []
+            append = orders.append
             # 首次買進目標比例的股票和債券
             if target_stock_pct > 0:
                 trade_step = self._create_trade_step('等比例配置首次買進', state, [
                     {'name': '目標股票比例', 'value': target_stock_pct},
                     {'name': '燈號等級', 'value': signal_level}
                 ])
-                orders.append({
+                append({
                     'action': 'buy',
-                    'ticker': self.stock_ticker,
+                    'ticker': stock_ticker,
                     'percent': target_stock_pct,
                     'trade_step': trade_step
                 })
-            if target_bond_pct > 0 and self.hedge_ticker:
+            if target_bond_pct > 0 and hedge_ticker:
                 trade_step = self._create_trade_step('等比例配置首次買進', state, [
                     {'name': '目標債券比例', 'value': target_bond_pct},
                     {'name': '燈號等級', 'value': signal_level}
                 ])
-                orders.append({
+                append({
                     'action': 'buy',
-                    'ticker': self.hedge_ticker,
+                    'ticker': hedge_ticker,
                     'percent': target_bond_pct,
                     'trade_step': trade_step
                 })
             return orders
         
-        # 計算當前持倉價值
-        current_stock_value = positions.get(self.stock_ticker, 0) * price_dict.get(self.stock_ticker, 0)
-        current_bond_value = positions.get(self.hedge_ticker, 0) * price_dict.get(self.hedge_ticker, 0) if self.hedge_ticker else 0
-        
         # 計算當前持倉比例
-        current_stock_pct = current_stock_value / portfolio_value if portfolio_value > 0 else 0
-        current_bond_pct = current_bond_value / portfolio_value if portfolio_value > 0 else 0
+        current_stock_pct = _holding_pct(positions.get(stock_ticker, 0), price_dict.get(stock_ticker, 0), portfolio_value)
+        current_bond_pct = _holding_pct(positions.get(hedge_ticker, 0), price_dict.get(hedge_ticker, 0), portfolio_value) if hedge_ticker else 0
         
         # 計算需要調整的比例
         stock_diff = target_stock_pct - current_stock_pct
@@ -462,61 +635,26 @@ class ProportionalAllocationStrategy(CycleStrategy):
         # 產生調整訂單（容許小的誤差，避免頻繁交易）
         threshold = 0.05  # 5% 的容許誤差
         
-        if abs(stock_diff) > threshold:
-            if stock_diff > 0:
-                # 需要增持股票
-                trade_step = self._create_trade_step('等比例配置增持股票', state, [
-                    {'name': '目標股票比例', 'value': target_stock_pct},
-                    {'name': '當前股票比例', 'value': current_stock_pct},
-                    {'name': '燈號等級', 'value': signal_level}
-                ])
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.stock_ticker,
-                    'percent': stock_diff,
-                    'trade_step': trade_step
-                })
-            else:
-                # 需要減持股票
-                trade_step = self._create_trade_step('等比例配置減持股票', state, [
-                    {'name': '目標股票比例', 'value': target_stock_pct},
-                    {'name': '當前股票比例', 'value': current_stock_pct},
-                    {'name': '燈號等級', 'value': signal_level}
-                ])
-                orders.append({
-                    'action': 'sell',
-                    'ticker': self.stock_ticker,
-                    'percent': abs(stock_diff),
-                    'trade_step': trade_step
-                })
+        rebalance_stock = abs(stock_diff) > threshold
+        rebalance_bond = hedge_ticker and abs(bond_diff) > threshold
+        if not (rebalance_stock or rebalance_bond):
+            # 持倉已在容許誤差內（大多數交易日），不需配置訂單列表
+            return _EMPTY_ORDERS
+        orders = []
         
-        if self.hedge_ticker and abs(bond_diff) > threshold:
-            if bond_diff > 0:
-                # 需要增持債券
-                trade_step = self._create_trade_step('等比例配置增持債券', state, [
-                    {'name': '目標債券比例', 'value': target_bond_pct},
-                    {'name': '當前債券比例', 'value': current_bond_pct},
-                    {'name': '燈號等級', 'value': signal_level}
-                ])
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.hedge_ticker,
-                    'percent': bond_diff,
-                    'trade_step': trade_step
-                })
-            else:
-                # 需要減持債券
-                trade_step = self._create_trade_step('等比例配置減持債券', state, [
-                    {'name': '目標債券比例', 'value': target_bond_pct},
-                    {'name': '當前債券比例', 'value': current_bond_pct},
-                    {'name': '燈號等級', 'value': signal_level}
-                ])
-                orders.append({
-                    'action': 'sell',
-                    'ticker': self.hedge_ticker,
-                    'percent': abs(bond_diff),
-                    'trade_step': trade_step
-                })
+        if rebalance_stock:
+            self._emit_rebalance(state, orders, stock_ticker, stock_diff, ('等比例配置增持股票', '等比例配置減持股票'), [
+                {'name': '目標股票比例', 'value': target_stock_pct},
+                {'name': '當前股票比例', 'value': current_stock_pct},
+                {'name': '燈號等級', 'value': signal_level}
+            ])
+        
+        if rebalance_bond:
+            self._emit_rebalance(state, orders, hedge_ticker, bond_diff, ('等比例配置增持債券', '等比例配置減持債券'), [
+                {'name': '目標債券比例', 'value': target_bond_pct},
+                {'name': '當前債券比例', 'value': current_bond_pct},
+                {'name': '燈號等級', 'value': signal_level}
+            ])
         
         return orders
 
@@ -539,6 +677,7 @@ class BuyAndHoldStrategy:
         - stock_ticker: 股票代號（預設 '006208'，富邦台50）
         """
         self.stock_ticker = stock_ticker
+        self._stock_id = _intern_ticker(stock_ticker)
         self.bought = False
     
     def generate_orders(self, state, date, price_dict, positions=None, portfolio_value=None):
@@ -555,25 +694,31 @@ class BuyAndHoldStrategy:
         回傳:
         - 訂單列表
         """
+        # 已買進後不再交易，直接回傳共用的空結果
+        if self.bought:
+            return _EMPTY_ORDERS
+        
         orders = []
+        # 綁定為區域變數，避免每日呼叫時重複查找屬性與方法
+        append = orders.append
+        stock_ticker = self.stock_ticker
         
         # 只在第一次買進
-        if not self.bought:
-            if self.stock_ticker in price_dict:
-                # BuyAndHoldStrategy 不使用 CycleStrategy 的 _create_trade_step，需要手動建立
-                trade_step = {
-                    'reason': '買進並持有',
-                    'conditions': [
-                        {'name': '策略類型', 'value': 'BuyAndHold'}
-                    ]
-                }
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.stock_ticker,
-                    'percent': 1.0,  # 100% 買進
-                    'trade_step': trade_step
-                })
-                self.bought = True
+        if stock_ticker in price_dict:
+            # BuyAndHoldStrategy 不使用 CycleStrategy 的 _create_trade_step，需要手動建立
+            trade_step = {
+                'reason': '買進並持有',
+                'conditions': [
+                    {'name': '策略類型', 'value': 'BuyAndHold'}
+                ]
+            }
+            append({
+                'action': 'buy',
+                'ticker': stock_ticker,
+                'percent': 1.0,  # 100% 買進
+                'trade_step': trade_step
+            })
+            self.bought = True
         
         return orders
 
@@ -581,6 +726,8 @@ class BuyAndHoldStrategy:
 class M1BFilterStrategy(CycleStrategy):
     """M1B 動能濾網策略基類"""
     
+    _REQUIRES_POSITIONS = True
+    
     def generate_orders(self, state, date, price_dict, positions=None, portfolio_value=None):
         """
         M1B 動能濾網策略：在紅燈區加入 M1B 動能檢測
@@ -595,76 +742,68 @@ class M1BFilterStrategy(CycleStrategy):
         回傳:
         - 訂單列表
         """
-        orders = []
-        score = state.get('score')
-        m1b_momentum = state.get('m1b_yoy_momentum')
+        # 綁定為區域變數，避免每日呼叫時重複查找屬性與方法
+        get = state.get
+        stock_ticker = self.stock_ticker
+        hedge_ticker = self.hedge_ticker
+        score = get('score')
+        m1b_momentum = get('m1b_yoy_momentum')
         
         if score is None:
-            return orders
+            return _EMPTY_ORDERS
+        
+        # 快速路徑：藍燈與 M1B 濾網區間之間且已完成首次進入時不會產生任何訂單（回測中最常見的情況）
+        if 16 < score < 32 and get('a', 0) != 0:
+            return _EMPTY_ORDERS
+        
+        orders = []
+        append = orders.append
         
         # SCORE <= 16（藍燈）：買進股票，賣出避險資產
-        if score <= 16 and not state.get('state', False):
-            trade_step = self._create_trade_step('藍燈買進', state)
-            orders.append({
-                'action': 'buy',
-                'ticker': self.stock_ticker,
-                'percent': 1.0,
-                'trade_step': trade_step
-            })
-            state['state'] = True
-            
-            if self.hedge_ticker and state.get('hedge_state', False):
-                hedge_trade_step = self._create_trade_step('藍燈賣出避險資產', state)
-                orders.append({
-                    'action': 'sell',
-                    'ticker': self.hedge_ticker,
-                    'percent': 1.0,
-                    'trade_step': hedge_trade_step
-                })
-                state['hedge_state'] = False
+        if score <= 16 and not get('state', False):
+            self._emit_blue(state, orders)
         
         # SCORE >= 32（紅燈）：加入 M1B 動能濾網
         elif score >= 32:
             if m1b_momentum is not None and m1b_momentum < 0:
                 # 價量背離：清倉離場
-                if state.get('state', False):
+                if get('state', False):
                     trade_step = self._create_trade_step('價量背離清倉', state, [
                         {'name': 'M1B年增率動能', 'value': m1b_momentum}
                     ])
-                    orders.append({
+                    append({
                         'action': 'sell',
-                        'ticker': self.stock_ticker,
+                        'ticker': stock_ticker,
                         'percent': 1.0,
                         'trade_step': trade_step
                     })
                     state['state'] = False
                 
-                if self.hedge_ticker and state.get('hedge_state', False):
+                if hedge_ticker and get('hedge_state', False):
                     hedge_trade_step = self._create_trade_step('價量背離清倉避險資產', state, [
                         {'name': 'M1B年增率動能', 'value': m1b_momentum}
                     ])
-                    orders.append({
+                    append({
                         'action': 'sell',
-                        'ticker': self.hedge_ticker,
+                        'ticker': hedge_ticker,
                         'percent': 1.0,
                         'trade_step': hedge_trade_step
                     })
                     state['hedge_state'] = False
             else:
                 # M1B 動能正常或無資料：減碼至 50%
-                if state.get('state', False):
+                if get('state', False):
                     # 檢查當前持倉比例
                     if positions and portfolio_value:
-                        current_value = positions.get(self.stock_ticker, 0) * price_dict.get(self.stock_ticker, 0)
-                        current_pct = current_value / portfolio_value if portfolio_value > 0 else 0
+                        current_pct = _holding_pct(positions.get(stock_ticker, 0), price_dict.get(stock_ticker, 0), portfolio_value)
                         if current_pct > 0.55:  # 如果超過 55%，減碼至 50%
                             trade_step = self._create_trade_step('紅燈減碼至50%', state, [
                                 {'name': 'M1B年增率動能', 'value': m1b_momentum if m1b_momentum is not None else '無資料'},
                                 {'name': '當前股票比例', 'value': current_pct}
                             ])
-                            orders.append({
+                            append({
                                 'action': 'sell',
-                                'ticker': self.stock_ticker,
+                                'ticker': stock_ticker,
                                 'percent': (current_pct - 0.5) / current_pct,
                                 'trade_step': trade_step
                             })
@@ -673,19 +812,18 @@ class M1BFilterStrategy(CycleStrategy):
                         trade_step = self._create_trade_step('紅燈減碼至50%', state, [
                             {'name': 'M1B年增率動能', 'value': m1b_momentum if m1b_momentum is not None else '無資料'}
                         ])
-                        orders.append({
+                        append({
                             'action': 'sell',
-                            'ticker': self.stock_ticker,
+                            'ticker': stock_ticker,
                             'percent': 0.5,
                             'trade_step': trade_step
                         })
                     
                     # 處理避險資產（如果有）：減碼時同步買進避險資產，補足到100%（50%股票 + 50%避險資產）
-                    if self.hedge_ticker:
+                    if hedge_ticker:
                         # 計算當前避險資產持倉比例
                         if positions and portfolio_value:
-                            current_hedge_value = positions.get(self.hedge_ticker, 0) * price_dict.get(self.hedge_ticker, 0)
-                            current_hedge_pct = current_hedge_value / portfolio_value if portfolio_value > 0 else 0
+                            current_hedge_pct = _holding_pct(positions.get(hedge_ticker, 0), price_dict.get(hedge_ticker, 0), portfolio_value)
                             target_hedge_pct = 0.5  # 目標是50%避險資產
                             
                             # 計算需要調整的避險資產比例
@@ -698,9 +836,9 @@ class M1BFilterStrategy(CycleStrategy):
                                     {'name': '當前避險資產比例', 'value': current_hedge_pct},
                                     {'name': '目標避險資產比例', 'value': target_hedge_pct}
                                 ])
-                                orders.append({
+                                append({
                                     'action': 'buy',
-                                    'ticker': self.hedge_ticker,
+                                    'ticker': hedge_ticker,
                                     'percent': hedge_diff,
                                     'is_hedge_buy': True,
                                     'trade_step': hedge_trade_step
@@ -711,9 +849,9 @@ class M1BFilterStrategy(CycleStrategy):
                             hedge_trade_step = self._create_trade_step('紅燈買進避險資產至50%', state, [
                                 {'name': 'M1B年增率動能', 'value': m1b_momentum if m1b_momentum is not None else '無資料'}
                             ])
-                            orders.append({
+                            append({
                                 'action': 'buy',
-                                'ticker': self.hedge_ticker,
+                                'ticker': hedge_ticker,
                                 'percent': 0.5,
                                 'is_hedge_buy': True,
                                 'trade_step': hedge_trade_step
@@ -722,17 +860,7 @@ class M1BFilterStrategy(CycleStrategy):
         
         # 16 < SCORE < 38：首次進入時買進股票
         elif 16 < score < 38:
-            if state.get('a', 0) == 0:
-                state['a'] = 1
-                if not state.get('state', False):
-                    trade_step = self._create_trade_step('首次進入買進', state)
-                    orders.append({
-                        'action': 'buy',
-                        'ticker': self.stock_ticker,
-                        'percent': 1.0,
-                        'trade_step': trade_step
-                    })
-                    state['state'] = True
+            self._emit_first_entry(state, orders)
         
         return orders
 
@@ -751,54 +879,60 @@ class M1BFilterBondStrategy(M1BFilterStrategy):
         super().__init__(stock_ticker, hedge_ticker)
 
 
-class M1BFilterProportionalStrategy(M1BFilterStrategy, ProportionalAllocationStrategy):
+class M1BFilterProportionalStrategy(M1BFilterStrategy):
     """M1B 濾網 + 等比例配置策略"""
     
     def __init__(self, stock_ticker='006208', hedge_ticker='00865B'):
-        M1BFilterStrategy.__init__(self, stock_ticker, hedge_ticker)
-        ProportionalAllocationStrategy.__init__(self, stock_ticker, hedge_ticker)
+        super().__init__(stock_ticker, hedge_ticker)
+        # 以組合方式持有等比例配置邏輯（取代多重繼承）
+        self._alloc = ProportionalAllocationStrategy(stock_ticker, hedge_ticker)
     
     def generate_orders(self, state, date, price_dict, positions=None, portfolio_value=None):
         """
         結合 M1B 濾網和等比例配置的邏輯
         """
-        orders = []
-        score = state.get('score')
-        m1b_momentum = state.get('m1b_yoy_momentum')
+        # 綁定為區域變數，避免每日呼叫時重複查找屬性與方法
+        get = state.get
+        stock_ticker = self.stock_ticker
+        hedge_ticker = self.hedge_ticker
+        score = get('score')
+        m1b_momentum = get('m1b_yoy_momentum')
         
         if score is None:
-            return orders
+            return _EMPTY_ORDERS
+        
+        orders = []
+        append = orders.append
         
         # 紅燈區且 M1B 動能 < 0：清倉股票，全部投入債券
         if score >= 32 and m1b_momentum is not None and m1b_momentum < 0:
             # 清倉股票
-            if positions and self.stock_ticker in positions and positions[self.stock_ticker] > 0:
+            if positions and positions.get(stock_ticker, 0) > 0:
                 trade_step = self._create_trade_step('價量背離清倉股票', state, [
                     {'name': 'M1B年增率動能', 'value': m1b_momentum}
                 ])
-                orders.append({
+                append({
                     'action': 'sell',
-                    'ticker': self.stock_ticker,
+                    'ticker': stock_ticker,
                     'percent': 1.0,
                     'trigger_hedge_buy': True,
-                    'hedge_ticker': self.hedge_ticker,
+                    'hedge_ticker': hedge_ticker,
                     'trade_step': trade_step
                 })
             
             # 確保買進100%債券
-            if self.hedge_ticker:
+            if hedge_ticker:
                 # 計算當前債券持倉比例
                 if positions and portfolio_value and portfolio_value > 0:
-                    current_bond_value = positions.get(self.hedge_ticker, 0) * price_dict.get(self.hedge_ticker, 0)
-                    current_bond_pct = current_bond_value / portfolio_value
+                    current_bond_pct = _holding_pct(positions.get(hedge_ticker, 0), price_dict.get(hedge_ticker, 0), portfolio_value)
                     if current_bond_pct < 0.95:  # 容許5%誤差
                         hedge_trade_step = self._create_trade_step('價量背離買進100%債券', state, [
                             {'name': 'M1B年增率動能', 'value': m1b_momentum},
                             {'name': '當前債券比例', 'value': current_bond_pct}
                         ])
-                        orders.append({
+                        append({
                             'action': 'buy',
-                            'ticker': self.hedge_ticker,
+                            'ticker': hedge_ticker,
                             'percent': 1.0 - current_bond_pct,
                             'is_hedge_buy': True,
                             'trade_step': hedge_trade_step
@@ -808,9 +942,9 @@ class M1BFilterProportionalStrategy(M1BFilterStrategy, ProportionalAllocationStr
                     hedge_trade_step = self._create_trade_step('價量背離買進100%債券', state, [
                         {'name': 'M1B年增率動能', 'value': m1b_momentum}
                     ])
-                    orders.append({
+                    append({
                         'action': 'buy',
-                        'ticker': self.hedge_ticker,
+                        'ticker': hedge_ticker,
                         'percent': 1.0,
                         'is_hedge_buy': True,
                         'trade_step': hedge_trade_step
@@ -820,13 +954,18 @@ class M1BFilterProportionalStrategy(M1BFilterStrategy, ProportionalAllocationStr
             state['hedge_state'] = True
             return orders
         
-        # 其他情況使用等比例配置邏輯
-        return ProportionalAllocationStrategy.generate_orders(self, state, date, price_dict, positions, portfolio_value)
+        # 其他情況使用等比例配置邏輯（沿用已分類的燈號等級）
+        allocation = self._alloc._get_allocation(score)
+        if allocation is None:
+            return _EMPTY_ORDERS
+        return self._alloc._generate_allocation_orders(state, allocation, price_dict, positions, portfolio_value)
 
 
 class DynamicPositionStrategy(CycleStrategy):
     """動態倉位調整策略基類"""
     
+    _REQUIRES_POSITIONS = True
+    
     def generate_orders(self, state, date, price_dict, positions=None, portfolio_value=None):
         """
         動態倉位調整策略：根據 Score 和動能調整倉位比例
@@ -841,56 +980,22 @@ class DynamicPositionStrategy(CycleStrategy):
         回傳:
         - 訂單列表
         """
-        orders = []
-        score = state.get('score')
-        score_momentum = state.get('score_momentum')
-        m1b_momentum = state.get('m1b_yoy_momentum')
+        # 綁定為區域變數，避免每日呼叫時重複查找屬性與方法
+        get = state.get
+        stock_ticker = self.stock_ticker
+        hedge_ticker = self.hedge_ticker
+        score = get('score')
+        score_momentum = get('score_momentum')
+        m1b_momentum = get('m1b_yoy_momentum')
         
         if score is None:
-            return orders
-        
-        # 計算目標倉位
-        target_position = 0.0
-        
-        # 藍燈（9-16分）：100% 倉位
-        if 9 <= score <= 16:
-            target_position = 1.0
-        
-        # 黃藍燈（17-22分）：根據動能調整
-        elif 17 <= score <= 22:
-            if score_momentum is not None and score_momentum < -2:
-                # 分數驟降：50% 倉位
-                target_position = 0.5
-            else:
-                # 正常：100% 倉位
-                target_position = 1.0
-        
-        # 綠燈（23-31分）：根據動能調整
-        elif 23 <= score <= 31:
-            if score_momentum is not None and score_momentum < -2:
-                # 分數驟降：50% 倉位
-                target_position = 0.5
-            else:
-                # 正常：100% 倉位
-                target_position = 1.0
+            return _EMPTY_ORDERS
         
-        # 黃紅燈（32-37分）：根據 M1B 動能調整
-        elif 32 <= score <= 37:
-            if m1b_momentum is not None and m1b_momentum < 0:
-                # 價量背離：0% 倉位（清倉）
-                target_position = 0.0
-            else:
-                # 正常：50% 倉位
-                target_position = 0.5
+        orders = []
+        append = orders.append
         
-        # 紅燈（38-45分）：根據 M1B 動能調整
-        elif score >= 38:
-            if m1b_momentum is not None and m1b_momentum < 0:
-                # 價量背離：0% 倉位（清倉）
-                target_position = 0.0
-            else:
-                # 正常：50% 倉位
-                target_position = 0.5
+        # 計算目標倉位
+        target_position = _dynamic_target_position(score, score_momentum, m1b_momentum)
         
         # 根據目標倉位產生訂單
         if positions is None or portfolio_value is None or portfolio_value <= 0:
@@ -905,9 +1010,9 @@ class DynamicPositionStrategy(CycleStrategy):
                     additional_conditions.append({'name': 'M1B年增率動能', 'value': m1b_momentum})
                 
                 trade_step = self._create_trade_step(reason, state, additional_conditions)
-                orders.append({
+                append({
                     'action': 'buy',
-                    'ticker': self.stock_ticker,
+                    'ticker': stock_ticker,
                     'percent': target_position,
                     'target_position_pct': target_position,
                     'trade_step': trade_step
@@ -915,8 +1020,7 @@ class DynamicPositionStrategy(CycleStrategy):
                 state['state'] = True
         else:
             # 計算當前持倉比例
-            current_stock_value = positions.get(self.stock_ticker, 0) * price_dict.get(self.stock_ticker, 0)
-            current_pct = current_stock_value / portfolio_value if portfolio_value > 0 else 0
+            current_pct = _holding_pct(positions.get(stock_ticker, 0), price_dict.get(stock_ticker, 0), portfolio_value)
             
             # 計算需要調整的比例
             diff = target_position - current_pct
@@ -936,9 +1040,9 @@ class DynamicPositionStrategy(CycleStrategy):
                         additional_conditions.append({'name': 'M1B年增率動能', 'value': m1b_momentum})
                     
                     trade_step = self._create_trade_step(reason, state, additional_conditions)
-                    orders.append({
+                    append({
                         'action': 'buy',
-                        'ticker': self.stock_ticker,
+                        'ticker': stock_ticker,
                         'percent': diff,
                         'target_position_pct': target_position,
                         'trade_step': trade_step
@@ -957,9 +1061,9 @@ class DynamicPositionStrategy(CycleStrategy):
                         additional_conditions.append({'name': 'M1B年增率動能', 'value': m1b_momentum})
                     
                     trade_step = self._create_trade_step(reason, state, additional_conditions)
-                    orders.append({
+                    append({
                         'action': 'sell',
-                        'ticker': self.stock_ticker,
+                        'ticker': stock_ticker,
                         'percent': abs(diff),
                         'target_position_pct': target_position,
                         'trade_step': trade_step
@@ -968,14 +1072,14 @@ class DynamicPositionStrategy(CycleStrategy):
                         state['state'] = False
         
         # 處理避險資產（如果有）
-        if self.hedge_ticker:
+        if hedge_ticker:
             if target_position == 0:
                 # 清倉時也清空避險資產
-                if state.get('hedge_state', False):
+                if get('hedge_state', False):
                     hedge_trade_step = self._create_trade_step('清倉避險資產', state)
-                    orders.append({
+                    append({
                         'action': 'sell',
-                        'ticker': self.hedge_ticker,
+                        'ticker': hedge_ticker,
                         'percent': 1.0,
                         'trade_step': hedge_trade_step
                     })
@@ -987,8 +1091,7 @@ class DynamicPositionStrategy(CycleStrategy):
                 
                 # 計算當前避險資產持倉比例
                 if positions is not None and portfolio_value is not None and portfolio_value > 0:
-                    current_hedge_value = positions.get(self.hedge_ticker, 0) * price_dict.get(self.hedge_ticker, 0)
-                    current_hedge_pct = current_hedge_value / portfolio_value if portfolio_value > 0 else 0
+                    current_hedge_pct = _holding_pct(positions.get(hedge_ticker, 0), price_dict.get(hedge_ticker, 0), portfolio_value)
                     
                     # 計算需要調整的避險資產比例
                     hedge_diff = hedge_target_pct - current_hedge_pct
@@ -1001,9 +1104,9 @@ class DynamicPositionStrategy(CycleStrategy):
                                 {'name': '目標避險資產比例', 'value': hedge_target_pct},
                                 {'name': '當前避險資產比例', 'value': current_hedge_pct}
                             ])
-                            orders.append({
+                            append({
                                 'action': 'buy',
-                                'ticker': self.hedge_ticker,
+                                'ticker': hedge_ticker,
                                 'percent': hedge_diff,
                                 'target_position_pct': hedge_target_pct,
                                 'is_hedge_buy': True,
@@ -1016,9 +1119,9 @@ class DynamicPositionStrategy(CycleStrategy):
                                 {'name': '目標避險資產比例', 'value': hedge_target_pct},
                                 {'name': '當前避險資產比例', 'value': current_hedge_pct}
                             ])
-                            orders.append({
+                            append({
                                 'action': 'sell',
-                                'ticker': self.hedge_ticker,
+                                'ticker': hedge_ticker,
                                 'percent': abs(hedge_diff),
                                 'target_position_pct': hedge_target_pct,
                                 'trade_step': hedge_trade_step
@@ -1029,9 +1132,9 @@ class DynamicPositionStrategy(CycleStrategy):
                         hedge_trade_step = self._create_trade_step('動態倉位首次配置避險資產', state, [
                             {'name': '目標避險資產比例', 'value': hedge_target_pct}
                         ])
-                        orders.append({
+                        append({
                             'action': 'buy',
-                            'ticker': self.hedge_ticker,
+                            'ticker': hedge_ticker,
                             'percent': hedge_target_pct,
                             'target_position_pct': hedge_target_pct,
                             'is_hedge_buy': True,
@@ -1056,102 +1159,73 @@ class DynamicPositionBondStrategy(DynamicPositionStrategy):
         super().__init__(stock_ticker, hedge_ticker)
 
 
-class DynamicPositionProportionalStrategy(DynamicPositionStrategy, ProportionalAllocationStrategy):
+class DynamicPositionProportionalStrategy(DynamicPositionStrategy):
     """動態倉位 + 等比例配置策略"""
     
     def __init__(self, stock_ticker='006208', hedge_ticker='00865B'):
-        DynamicPositionStrategy.__init__(self, stock_ticker, hedge_ticker)
-        ProportionalAllocationStrategy.__init__(self, stock_ticker, hedge_ticker)
+        super().__init__(stock_ticker, hedge_ticker)
+        # 以組合方式持有等比例配置邏輯（取代多重繼承）
+        self._alloc = ProportionalAllocationStrategy(stock_ticker, hedge_ticker)
     
     def generate_orders(self, state, date, price_dict, positions=None, portfolio_value=None):
         """
         結合動態倉位和等比例配置的邏輯
         """
-        orders = []
-        score = state.get('score')
-        score_momentum = state.get('score_momentum')
-        m1b_momentum = state.get('m1b_yoy_momentum')
+        # 綁定為區域變數，避免每日呼叫時重複查找屬性與方法
+        get = state.get
+        stock_ticker = self.stock_ticker
+        hedge_ticker = self.hedge_ticker
+        score = get('score')
+        score_momentum = get('score_momentum')
+        m1b_momentum = get('m1b_yoy_momentum')
         
         if score is None:
-            return orders
-        
-        # 計算目標股票倉位
-        target_stock_pct = 0.0
-        
-        # 藍燈（9-16分）：100% 倉位
-        if 9 <= score <= 16:
-            target_stock_pct = 1.0
-        
-        # 黃藍燈（17-22分）：根據動能調整
-        elif 17 <= score <= 22:
-            if score_momentum is not None and score_momentum < -2:
-                target_stock_pct = 0.5
-            else:
-                target_stock_pct = 1.0
+            return _EMPTY_ORDERS
         
-        # 綠燈（23-31分）：根據動能調整
-        elif 23 <= score <= 31:
-            if score_momentum is not None and score_momentum < -2:
-                target_stock_pct = 0.5
-            else:
-                target_stock_pct = 1.0
-        
-        # 黃紅燈（32-37分）：根據 M1B 動能調整
-        elif 32 <= score <= 37:
-            if m1b_momentum is not None and m1b_momentum < 0:
-                target_stock_pct = 0.0
-            else:
-                target_stock_pct = 0.5
+        orders = []
+        append = orders.append
         
-        # 紅燈（38-45分）：根據 M1B 動能調整
-        elif score >= 38:
-            if m1b_momentum is not None and m1b_momentum < 0:
-                target_stock_pct = 0.0
-            else:
-                target_stock_pct = 0.5
+        # 計算目標股票倉位
+        target_stock_pct = _dynamic_target_position(score, score_momentum, m1b_momentum)
         
         # 根據燈號等級調整目標配置（結合等比例配置邏輯）
-        signal_level = self._get_signal_level(score)
-        if signal_level:
-            base_allocation = self.allocation_rules.get(signal_level, {'stock_pct': 0.6, 'bond_pct': 0.4})
-            base_stock_pct = base_allocation['stock_pct']
+        allocation = self._alloc._get_allocation(score)
+        signal_level = None
+        if allocation is not None:
+            signal_level, base_stock_pct, _ = allocation
             # 取兩者較小值（更保守）
             target_stock_pct = min(target_stock_pct, base_stock_pct)
         
         target_bond_pct = 1.0 - target_stock_pct
         
         # 產生調整訂單
-        signal_level = self._get_signal_level(score)
         if positions is None or portfolio_value is None or portfolio_value <= 0:
             if target_stock_pct > 0:
                 trade_step = self._create_trade_step('動態等比例配置首次買進', state, [
                     {'name': '目標股票比例', 'value': target_stock_pct},
                     {'name': '燈號等級', 'value': signal_level if signal_level else '未知'}
                 ])
-                orders.append({
+                append({
                     'action': 'buy',
-                    'ticker': self.stock_ticker,
+                    'ticker': stock_ticker,
                     'percent': target_stock_pct,
                     'trade_step': trade_step
                 })
-            if target_bond_pct > 0 and self.hedge_ticker:
+            if target_bond_pct > 0 and hedge_ticker:
                 trade_step = self._create_trade_step('動態等比例配置首次買進', state, [
                     {'name': '目標債券比例', 'value': target_bond_pct},
                     {'name': '燈號等級', 'value': signal_level if signal_level else '未知'}
                 ])
-                orders.append({
+                append({
                     'action': 'buy',
-                    'ticker': self.hedge_ticker,
+                    'ticker': hedge_ticker,
                     'percent': target_bond_pct,
                     'is_hedge_buy': True,
                     'trade_step': trade_step
                 })
         else:
-            current_stock_value = positions.get(self.stock_ticker, 0) * price_dict.get(self.stock_ticker, 0)
-            current_bond_value = positions.get(self.hedge_ticker, 0) * price_dict.get(self.hedge_ticker, 0) if self.hedge_ticker else 0
-            
-            current_stock_pct = current_stock_value / portfolio_value if portfolio_value > 0 else 0
-            current_bond_pct = current_bond_value / portfolio_value if portfolio_value > 0 else 0
+            current_stock_pct = _holding_pct(positions.get(stock_ticker, 0), price_dict.get(stock_ticker, 0), portfolio_value)
+            current_bond_pct = _holding_pct(positions.get(hedge_ticker, 0), price_dict.get(hedge_ticker, 0), portfolio_value) if hedge_ticker else 0
             
             stock_diff = target_stock_pct - current_stock_pct
             bond_diff = target_bond_pct - current_bond_pct
@@ -1159,57 +1233,18 @@ class DynamicPositionProportionalStrategy(DynamicPositionStrategy, ProportionalA
             threshold = 0.05
             
             if abs(stock_diff) > threshold:
-                if stock_diff > 0:
-                    trade_step = self._create_trade_step('動態等比例配置增持股票', state, [
-                        {'name': '目標股票比例', 'value': target_stock_pct},
-                        {'name': '當前股票比例', 'value': current_stock_pct},
-                        {'name': '燈號等級', 'value': signal_level if signal_level else '未知'}
-                    ])
-                    orders.append({
-                        'action': 'buy',
-                        'ticker': self.stock_ticker,
-                        'percent': stock_diff,
-                        'trade_step': trade_step
-                    })
-                else:
-                    trade_step = self._create_trade_step('動態等比例配置減持股票', state, [
-                        {'name': '目標股票比例', 'value': target_stock_pct},
-                        {'name': '當前股票比例', 'value': current_stock_pct},
-                        {'name': '燈號等級', 'value': signal_level if signal_level else '未知'}
-                    ])
-                    orders.append({
-                        'action': 'sell',
-                        'ticker': self.stock_ticker,
-                        'percent': abs(stock_diff),
-                        'trade_step': trade_step
-                    })
+                self._emit_rebalance(state, orders, stock_ticker, stock_diff, ('動態等比例配置增持股票', '動態等比例配置減持股票'), [
+                    {'name': '目標股票比例', 'value': target_stock_pct},
+                    {'name': '當前股票比例', 'value': current_stock_pct},
+                    {'name': '燈號等級', 'value': signal_level if signal_level else '未知'}
+                ])
             
-            if self.hedge_ticker and abs(bond_diff) > threshold:
-                if bond_diff > 0:
-                    trade_step = self._create_trade_step('動態等比例配置增持債券', state, [
-                        {'name': '目標債券比例', 'value': target_bond_pct},
-                        {'name': '當前債券比例', 'value': current_bond_pct},
-                        {'name': '燈號等級', 'value': signal_level if signal_level else '未知'}
-                    ])
-                    orders.append({
-                        'action': 'buy',
-                        'ticker': self.hedge_ticker,
-                        'percent': bond_diff,
-                        'is_hedge_buy': True,
-                        'trade_step': trade_step
-                    })
-                else:
-                    trade_step = self._create_trade_step('動態等比例配置減持債券', state, [
-                        {'name': '目標債券比例', 'value': target_bond_pct},
-                        {'name': '當前債券比例', 'value': current_bond_pct},
-                        {'name': '燈號等級', 'value': signal_level if signal_level else '未知'}
-                    ])
-                    orders.append({
-                        'action': 'sell',
-                        'ticker': self.hedge_ticker,
-                        'percent': abs(bond_diff),
-                        'trade_step': trade_step
-                    })
+            if hedge_ticker and abs(bond_diff) > threshold:
+                self._emit_rebalance(state, orders, hedge_ticker, bond_diff, ('動態等比例配置增持債券', '動態等比例配置減持債券'), [
+                    {'name': '目標債券比例', 'value': target_bond_pct},
+                    {'name': '當前債券比例', 'value': current_bond_pct},
+                    {'name': '燈號等級', 'value': signal_level if signal_level else '未知'}
+                ], is_hedge=True)
         
         return orders
 
@@ -1217,81 +1252,70 @@ class DynamicPositionProportionalStrategy(DynamicPositionStrategy, ProportionalA
 class MultiplierAllocationStrategy(CycleStrategy):
     """倍數放大配置策略（根據燈號等級遞減倉位）"""
     
+    _REQUIRES_POSITIONS = True
+    
+    # 倍數遞減配置規則（依燈號等級索引排列，所有實例共用）
+    _ALLOCATION_TABLE = (
+        ('blue', 1.0, 0.0),           # 藍燈（9-16）：100% 股票, 0% 債券
+        ('yellow_blue', 0.75, 0.25),  # 黃藍燈（17-22）：75% 股票, 25% 債券
+        ('green', 0.5, 0.5),          # 綠燈（23-31）：50% 股票, 50% 債券
+        ('yellow_red', 0.25, 0.75),   # 黃紅燈（32-37）：25% 股票, 75% 債券
+        ('red', 0.0, 1.0)             # 紅燈（38-45）：0% 股票, 100% 債券
+    )
+    
     def __init__(self, stock_ticker='006208', hedge_ticker='00865B'):
         super().__init__(stock_ticker, hedge_ticker)
-        
-        # 倍數遞減配置規則
-        self.allocation_rules = {
-            'blue': {'stock_pct': 1.0, 'bond_pct': 0.0},        # 藍燈（9-16）：100% 股票, 0% 債券
-            'yellow_blue': {'stock_pct': 0.75, 'bond_pct': 0.25}, # 黃藍燈（17-22）：75% 股票, 25% 債券
-            'green': {'stock_pct': 0.5, 'bond_pct': 0.5},       # 綠燈（23-31）：50% 股票, 50% 債券
-            'yellow_red': {'stock_pct': 0.25, 'bond_pct': 0.75}, # 黃紅燈（32-37）：25% 股票, 75% 債券
-            'red': {'stock_pct': 0.0, 'bond_pct': 1.0}         # 紅燈（38-45）：0% 股票, 100% 債券
-        }
     
-    def _get_signal_level(self, score):
-        """根據景氣燈號分數判斷燈號等級（使用官方標準）"""
-        if score is None:
-            return None
-        
-        if 9 <= score <= 16:
-            return 'blue'  # 藍燈
-        elif 17 <= score <= 22:
-            return 'yellow_blue'  # 黃藍燈
-        elif 23 <= score <= 31:
-            return 'green'  # 綠燈
-        elif 32 <= score <= 37:
-            return 'yellow_red'  # 黃紅燈
-        elif score >= 38:
-            return 'red'  # 紅燈
-        else:
-            return None  # 分數 < 9，可能是資料缺失
+    def _get_allocation(self, score):
+        """根據景氣燈號分數取得 (燈號等級, 股票比例, 債券比例)（使用官方標準）"""
+        level_index = _signal_level_index(score)
+        if level_index is None:
+            return None  # 分數缺失或 < 9，可能是資料缺失
+        return self._ALLOCATION_TABLE[level_index]
     
     def generate_orders(self, state, date, price_dict, positions=None, portfolio_value=None):
         """根據燈號等級產生倍數遞減配置訂單"""
-        orders = []
-        score = state.get('score')
+        # 綁定為區域變數，避免每日呼叫時重複查找屬性與方法
+        get = state.get
+        stock_ticker = self.stock_ticker
+        hedge_ticker = self.hedge_ticker
+        score = get('score')
         
         if score is None:
-            return orders
-        
-        # 取得當前的燈號等級
-        signal_level = self._get_signal_level(score)
-        
-        if signal_level is None:
-            return orders
+            return _EMPTY_ORDERS
         
-        # 取得目標配置比例
-        target_allocation = self.allocation_rules.get(signal_level)
+        # 取得當前的燈號等級與目標配置比例
+        allocation = self._get_allocation(score)
         
-        if target_allocation is None:
-            return orders
+        if allocation is None:
+            return _EMPTY_ORDERS
         
-        target_stock_pct = target_allocation['stock_pct']
-        target_bond_pct = target_allocation['bond_pct']
+        signal_level, target_stock_pct, target_bond_pct = allocation
         
         # 如果沒有持倉資訊，首次配置
         if positions is None or portfolio_value is None or portfolio_value <= 0:
+            orders = []
+            append = orders.append
             if target_stock_pct > 0:
                 trade_step = self._create_trade_step('倍數放大首次配置', state, [
                     {'name': '目標股票比例', 'value': target_stock_pct},
                     {'name': '燈號等級', 'value': signal_level}
                 ])
-                orders.append({
+                append({
                     'action': 'buy',
-                    'ticker': self.stock_ticker,
+                    'ticker': stock_ticker,
                     'percent': target_stock_pct,
                     'target_position_pct': target_stock_pct,
                     'trade_step': trade_step
                 })
-            if target_bond_pct > 0 and self.hedge_ticker:
+            if target_bond_pct > 0 and hedge_ticker:
                 trade_step = self._create_trade_step('倍數放大首次配置', state, [
                     {'name': '目標債券比例', 'value': target_bond_pct},
                     {'name': '燈號等級', 'value': signal_level}
                 ])
-                orders.append({
+                append({
                     'action': 'buy',
-                    'ticker': self.hedge_ticker,
+                    'ticker': hedge_ticker,
                     'percent': target_bond_pct,
                     'target_position_pct': target_bond_pct,
                     'is_hedge_buy': True,
@@ -1299,12 +1323,9 @@ class MultiplierAllocationStrategy(CycleStrategy):
                 })
             return orders
         
-        # 計算當前持倉價值和比例
-        current_stock_value = positions.get(self.stock_ticker, 0) * price_dict.get(self.stock_ticker, 0)
-        current_bond_value = positions.get(self.hedge_ticker, 0) * price_dict.get(self.hedge_ticker, 0) if self.hedge_ticker else 0
-        
-        current_stock_pct = current_stock_value / portfolio_value if portfolio_value > 0 else 0
-        current_bond_pct = current_bond_value / portfolio_value if portfolio_value > 0 else 0
+        # 計算當前持倉比例
+        current_stock_pct = _holding_pct(positions.get(stock_ticker, 0), price_dict.get(stock_ticker, 0), portfolio_value)
+        current_bond_pct = _holding_pct(positions.get(hedge_ticker, 0), price_dict.get(hedge_ticker, 0), portfolio_value) if hedge_ticker else 0
         
         # 計算需要調整的比例
         stock_diff = target_stock_pct - current_stock_pct
@@ -1312,63 +1333,27 @@ class MultiplierAllocationStrategy(CycleStrategy):
         
         threshold = 0.05  # 5% 的容許誤差
         
-        # 產生調整訂單
-        if abs(stock_diff) > threshold:
-            if stock_diff > 0:
-                trade_step = self._create_trade_step('倍數放大增持股票', state, [
-                    {'name': '目標股票比例', 'value': target_stock_pct},
-                    {'name': '當前股票比例', 'value': current_stock_pct},
-                    {'name': '燈號等級', 'value': signal_level}
-                ])
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.stock_ticker,
-                    'percent': stock_diff,
-                    'target_position_pct': target_stock_pct,
-                    'trade_step': trade_step
-                })
-            else:
-                trade_step = self._create_trade_step('倍數放大減持股票', state, [
-                    {'name': '目標股票比例', 'value': target_stock_pct},
-                    {'name': '當前股票比例', 'value': current_stock_pct},
-                    {'name': '燈號等級', 'value': signal_level}
-                ])
-                orders.append({
-                    'action': 'sell',
-                    'ticker': self.stock_ticker,
-                    'percent': abs(stock_diff),
-                    'target_position_pct': target_stock_pct,
-                    'trade_step': trade_step
-                })
+        rebalance_stock = abs(stock_diff) > threshold
+        rebalance_bond = hedge_ticker and abs(bond_diff) > threshold
+        if not (rebalance_stock or rebalance_bond):
+            # 持倉已在容許誤差內（大多數交易日），不需配置訂單列表
+            return _EMPTY_ORDERS
+        orders = []
         
-        if self.hedge_ticker and abs(bond_diff) > threshold:
-            if bond_diff > 0:
-                trade_step = self._create_trade_step('倍數放大增持債券', state, [
-                    {'name': '目標債券比例', 'value': target_bond_pct},
-                    {'name': '當前債券比例', 'value': current_bond_pct},
-                    {'name': '燈號等級', 'value': signal_level}
-                ])
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.hedge_ticker,
-                    'percent': bond_diff,
-                    'target_position_pct': target_bond_pct,
-                    'is_hedge_buy': True,
-                    'trade_step': trade_step
-                })
-            else:
-                trade_step = self._create_trade_step('倍數放大減持債券', state, [
-                    {'name': '目標債券比例', 'value': target_bond_pct},
-                    {'name': '當前債券比例', 'value': current_bond_pct},
-                    {'name': '燈號等級', 'value': signal_level}
-                ])
-                orders.append({
-                    'action': 'sell',
-                    'ticker': self.hedge_ticker,
-                    'percent': abs(bond_diff),
-                    'target_position_pct': target_bond_pct,
-                    'trade_step': trade_step
-                })
+        # 產生調整訂單
+        if rebalance_stock:
+            self._emit_rebalance(state, orders, stock_ticker, stock_diff, ('倍數放大增持股票', '倍數放大減持股票'), [
+                {'name': '目標股票比例', 'value': target_stock_pct},
+                {'name': '當前股票比例', 'value': current_stock_pct},
+                {'name': '燈號等級', 'value': signal_level}
+            ], target_pct=target_stock_pct)
+        
+        if rebalance_bond:
+            self._emit_rebalance(state, orders, hedge_ticker, bond_diff, ('倍數放大增持債券', '倍數放大減持債券'), [
+                {'name': '目標債券比例', 'value': target_bond_pct},
+                {'name': '當前債券比例', 'value': current_bond_pct},
+                {'name': '燈號等級', 'value': signal_level}
+            ], target_pct=target_bond_pct, is_hedge=True)
         
         return orders
 
@@ -1381,80 +1366,60 @@ class MultiplierAllocationCashStrategy(MultiplierAllocationStrategy):
     
     def generate_orders(self, state, date, price_dict, positions=None, portfolio_value=None):
         """倍數放大 + 現金避險：紅燈時全部賣出，持有現金"""
-        orders = []
-        score = state.get('score')
+        # 綁定為區域變數，避免每日呼叫時重複查找屬性與方法
+        get = state.get
+        stock_ticker = self.stock_ticker
+        score = get('score')
         
         if score is None:
-            return orders
-        
-        # 取得當前的燈號等級
-        signal_level = self._get_signal_level(score)
+            return _EMPTY_ORDERS
         
-        if signal_level is None:
-            return orders
+        # 取得當前的燈號等級與目標配置比例
+        allocation = self._get_allocation(score)
         
-        # 取得目標配置比例
-        target_allocation = self.allocation_rules.get(signal_level)
+        if allocation is None:
+            return _EMPTY_ORDERS
         
-        if target_allocation is None:
-            return orders
-        
-        target_stock_pct = target_allocation['stock_pct']
+        signal_level, target_stock_pct, _ = allocation
         # 現金策略：不需要買進避險資產，紅燈時全部賣出即可
         
         # 如果沒有持倉資訊，首次配置
         if positions is None or portfolio_value is None or portfolio_value <= 0:
+            orders = []
+            append = orders.append
             if target_stock_pct > 0:
                 trade_step = self._create_trade_step('倍數放大現金策略首次買進', state, [
                     {'name': '目標股票比例', 'value': target_stock_pct},
                     {'name': '燈號等級', 'value': signal_level}
                 ])
-                orders.append({
+                append({
                     'action': 'buy',
-                    'ticker': self.stock_ticker,
+                    'ticker': stock_ticker,
                     'percent': target_stock_pct,
                     'target_position_pct': target_stock_pct,
                     'trade_step': trade_step
                 })
             return orders
         
-        # 計算當前持倉價值和比例
-        current_stock_value = positions.get(self.stock_ticker, 0) * price_dict.get(self.stock_ticker, 0)
-        current_stock_pct = current_stock_value / portfolio_value if portfolio_value > 0 else 0
+        # 計算當前持倉比例
+        current_stock_pct = _holding_pct(positions.get(stock_ticker, 0), price_dict.get(stock_ticker, 0), portfolio_value)
         
         # 計算需要調整的比例
         stock_diff = target_stock_pct - current_stock_pct
         
         threshold = 0.05  # 5% 的容許誤差
         
+        if abs(stock_diff) <= threshold:
+            # 持倉已在容許誤差內（大多數交易日），不需配置訂單列表
+            return _EMPTY_ORDERS
+        orders = []
+        
         # 產生調整訂單
-        if abs(stock_diff) > threshold:
-            if stock_diff > 0:
-                trade_step = self._create_trade_step('倍數放大現金策略增持股票', state, [
-                    {'name': '目標股票比例', 'value': target_stock_pct},
-                    {'name': '當前股票比例', 'value': current_stock_pct},
-                    {'name': '燈號等級', 'value': signal_level}
-                ])
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.stock_ticker,
-                    'percent': stock_diff,
-                    'target_position_pct': target_stock_pct,
-                    'trade_step': trade_step
-                })
-            else:
-                trade_step = self._create_trade_step('倍數放大現金策略減持股票', state, [
-                    {'name': '目標股票比例', 'value': target_stock_pct},
-                    {'name': '當前股票比例', 'value': current_stock_pct},
-                    {'name': '燈號等級', 'value': signal_level}
-                ])
-                orders.append({
-                    'action': 'sell',
-                    'ticker': self.stock_ticker,
-                    'percent': abs(stock_diff),
-                    'target_position_pct': target_stock_pct,
-                    'trade_step': trade_step
-                })
+        self._emit_rebalance(state, orders, stock_ticker, stock_diff, ('倍數放大現金策略增持股票', '倍數放大現金策略減持股票'), [
+            {'name': '目標股票比例', 'value': target_stock_pct},
+            {'name': '當前股票比例', 'value': current_stock_pct},
+            {'name': '燈號等級', 'value': signal_level}
+        ], target_pct=target_stock_pct)
         
         return orders
 
@@ -3,10 +3,208 @@
 簡化版本，不需要處理發布日期、分批執行等複雜邏輯
 """
 
+import hashlib
+import multiprocessing
+import os
+import pickle
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+# Numba 為可選依賴，未安裝時 njit 不做事（函數以純 Python 執行）
+from utils._njit import njit
+
+
+# 無訂單時共用的空結果（不可變，避免每日配置新的空列表）
+_EMPTY_ORDERS = ()
+
+# 交易步驟的分數條件名稱（預先 intern）
+_SCORE_CONDITION_NAME = sys.intern('景氣燈號分數')
+
+
+@lru_cache(maxsize=512, typed=True)
+def _cached_trade_step(reason, score):
+    """
+    依（交易原因, 燈號分數）快取唯讀的交易步驟
+    
+    交易原因只有少數幾種、分數約 0-45，整段回測的組合數有限；typed=True 使 16 與 16.0
+    分開快取，保留分數原本的型別（交易記錄依型別格式化數值）；
+    回傳的物件在多筆訂單間共用，呼叫端不可修改（使用一般 dict 以便訂單能 pickle 傳遞到子行程）。
+    
+    參數:
+    - reason: 交易原因
+    - score: 景氣燈號分數（可為 None）
+    
+    返回:
+    - 共用的交易步驟 {'reason': str, 'conditions': ({'name': str, 'value': float},)}
+    """
+    conditions = ({'name': _SCORE_CONDITION_NAME, 'value': score},) if score is not None else ()
+    return {'reason': sys.intern(reason), 'conditions': conditions}
+
+# 訂單動作代碼（OrderBatch.actions）
+ORDER_ACTION_BUY = 0
+ORDER_ACTION_SELL = 1
+
+
+@dataclass
+class OrderBatch:
+    """
+    整段回測訂單的欄式表示（各欄位為等長的平行陣列）
+    
+    欄位:
+    - days: 訂單所在的交易日索引（int32）
+    - actions: 動作代碼 ORDER_ACTION_BUY / ORDER_ACTION_SELL（int8）
+    - ticker_ids: 標的編號，對應策略的 ticker_ids 對照表（int16）
+    - percents: 交易比例（float64）
+    - aux: 每筆訂單的交易原因字串
+    """
+    days: np.ndarray
+    actions: np.ndarray
+    ticker_ids: np.ndarray
+    percents: np.ndarray
+    aux: list
+    
+    def __len__(self):
+        return len(self.days)
+
+
+# 分桶（0 = 低於藍燈、1 = 藍燈、2 = 藍燈與紅燈之間、3 = 紅燈）→ 燈號（0 = 不動作、1 = 藍燈、2 = 紅燈）
+_BUCKET_LIGHT = np.array([0, 1, 0, 2], dtype=np.int8)
+
+def _build_score_light_table(blue_lo=9, blue_hi=16, red=38):
+    """
+    建立整數分數 → 燈號的查表（int8，長度 256）
+    
+    返回:
+    - np.ndarray(int8): 0 = 不動作、1 = 藍燈、2 = 紅燈
+    """
+    table = np.zeros(256, dtype=np.int8)
+    table[blue_lo:blue_hi + 1] = 1
+    table[red:] = 2
+    return table
+
+
+# 預設門檻的分數 → 燈號查表
+_SCORE_LIGHT = _build_score_light_table()
+
+# 燈號切換動作代碼（_run_light_fsm 輸出）
+FSM_NO_ACTION = 0
+FSM_BLUE_SWITCH = 1  # 藍燈：買進股票，賣出避險資產
+FSM_RED_SWITCH = 2  # 紅燈：賣出股票，買進避險資產
+
+
+def _holding_pct(positions, ticker, price_dict, portfolio_value):
+    """
+    計算單一標的的持倉比例（呼叫端需確保 portfolio_value > 0）
+    
+    參數:
+    - positions: 當前持倉字典 {ticker: shares}
+    - ticker: 標的代號
+    - price_dict: 價格字典 {ticker: close}
+    - portfolio_value: 當前投資組合總價值
+    
+    返回:
+    - float: 持倉市值 / 投資組合總價值
+    """
+    return positions.get(ticker, 0) * price_dict.get(ticker, 0) / portfolio_value
+
+
+# 持股狀態轉移表 HOLDING_TRANSITION[目前持股, 燈號] -> 新持股（0 = 未持有、1 = 持有）
+# 燈號欄位：0 = 其他或缺值、1 = 藍燈、2 = 紅燈；所有不含 FiftyFifty 的週期策略共用同一張表
+HOLDING_TRANSITION = np.array([
+    [0, 1, 0],  # 未持有：只有藍燈會買進
+    [1, 1, 0],  # 持有：只有紅燈會賣出
+], dtype=np.int8)
+
+
+@njit(cache=True)
+def scan_transitions(table, lights, init):
+    """
+    依轉移表逐點掃描燈號序列，得到每個時點之後的持股狀態（路徑相依的唯一循序部分）
+    
+    參數:
+    - table: 轉移表 table[目前持股, 燈號] -> 新持股
+    - lights: 燈號陣列（0 = 其他、1 = 藍燈、2 = 紅燈）
+    - init: 起始持股狀態（0 或 1）
+    
+    返回:
+    - np.ndarray(int8): 每個時點處理後的持股狀態
+    """
+    out = np.empty(lights.size, dtype=np.int8)
+    held = init
+    for i in range(lights.size):
+        held = table[held, lights[i]]
+        out[i] = held
+    return out
+
+
+def _run_light_fsm(score_arr, blue_lo=9, blue_hi=16, red=38):
+    """
+    執行藍燈/紅燈狀態機，只在狀態切換的那一天輸出動作
+    
+    連續相同燈號的日子只有第一天可能改變狀態，因此先以遊程編碼（RLE）
+    取出燈號變化的起點，只在這些起點上以轉移表掃描持股狀態；
+    不建立任何訂單物件，呼叫端只需在非零的少數索引上組出訂單。
+    
+    參數:
+    - score_arr: 每日景氣燈號分數陣列（缺值為 NaN）
+    - blue_lo, blue_hi: 藍燈分數區間（含端點）
+    - red: 紅燈分數下限
+    
+    返回:
+    - np.ndarray(int8): 每日動作代碼（FSM_NO_ACTION / FSM_BLUE_SWITCH / FSM_RED_SWITCH）
+    """
+    scores = np.asarray(score_arr, dtype=float)
+    actions = np.zeros(len(scores), dtype=np.int8)
+    
+    # 燈號：1 = 藍燈、2 = 紅燈、0 = 其他或缺值
+    if (blue_lo, blue_hi, red) == (9, 16, 38):
+        light_table = _SCORE_LIGHT
+    else:
+        light_table = _build_score_light_table(blue_lo, blue_hi, red)
+    light = np.zeros(len(scores), dtype=np.int8)
+    
+    # 整數分數直接查表（NaN 不等於自身的 floor，會被排除）
+    integral = scores == np.floor(scores)
+    light[integral] = light_table[np.clip(scores[integral], 0, 255).astype(np.intp)]
+    
+    # 非整數分數（少見）以區間比較判斷
+    fractional = ~integral & ~np.isnan(scores)
+    if fractional.any():
+        frac_scores = scores[fractional]
+        light[fractional] = np.where(
+            frac_scores >= red, 2, ((frac_scores >= blue_lo) & (frac_scores <= blue_hi)).astype(np.int8)
+        )
+    
+    # 燈號變化的起點（第一天必為起點）
+    run_starts = np.flatnonzero(np.diff(light, prepend=-1) != 0)
+    
+    # 只在各段起點掃描持股狀態（回測開始時已買進股票）
+    held = scan_transitions(HOLDING_TRANSITION, light[run_starts], 1)
+    change = np.diff(held, prepend=1)
+    
+    actions[run_starts[change > 0]] = FSM_BLUE_SWITCH
+    actions[run_starts[change < 0]] = FSM_RED_SWITCH
+    return actions
+
 
 class CycleStrategyNew:
     """景氣週期策略基類（新版本）"""
     
+    # 固定屬性集合：參數掃描會建立大量實例，使用 __slots__ 減少記憶體並加快屬性存取
+    __slots__ = ('stock_ticker', 'hedge_ticker', 'ticker_ids')
+    
+    # 燈號門檻（子類別可覆寫）：藍燈分數區間（含端點）與紅燈分數下限
+    BLUE_RANGE = (9, 16)
+    RED_THRESHOLD = 38
+    
+    # 產生訂單時是否依賴當前持倉與投資組合價值（為 True 時不支援整段批次計算）
+    _REQUIRES_POSITIONS = False
+    
     def __init__(self, stock_ticker='006208', hedge_ticker=None):
         """
         初始化策略
@@ -17,6 +215,43 @@ class CycleStrategyNew:
         """
         self.stock_ticker = stock_ticker
         self.hedge_ticker = hedge_ticker
+        
+        # 標的代號 → 整數編號（供 OrderBatch 使用）
+        self.ticker_ids = {stock_ticker: 0}
+        if hedge_ticker:
+            self.ticker_ids[hedge_ticker] = 1
+    
+    def initial_orders(self, state, row, price_dict):
+        """
+        回測開始買進：由引擎在迴圈中呼叫，直到股票第一次有價格為止（只成功一次）
+        
+        參數:
+        - state: 策略狀態字典
+        - row: 當天的資料行（包含所有指標，已對齊）
+        - price_dict: 價格字典 {ticker: close}
+        
+        返回:
+        - 訂單序列（股票尚無價格時為空）
+        """
+        if self.stock_ticker not in price_dict:
+            return _EMPTY_ORDERS
+        
+        return (self._initial_order(
+            state, row.get('signal_景氣對策信號綜合分數'), row.get('signal_景氣對策信號')
+        ),)
+    
+    def _initial_order(self, state, signal_score, signal_text):
+        """建立回測開始買進的訂單並標記持有股票"""
+        state['state'] = True
+        return {
+            'action': 'buy',
+            'ticker': self.stock_ticker,
+            'percent': 1.0,
+            'split_execution': True,  # 標記需要分批執行
+            'trade_step': self._create_trade_step('回測開始買進', state),
+            'signal_score': signal_score,
+            'signal_text': signal_text
+        }
     
     def _create_trade_step(self, reason, state, additional_conditions=None):
         """
@@ -29,43 +264,29 @@ class CycleStrategyNew:
         
         返回:
         - 交易步驟字典 {'reason': str, 'conditions': [{'name': str, 'value': float}, ...]}
+          （沒有額外條件時回傳共用的快取物件，不可修改）
         """
-        conditions = []
-        
-        # 添加景氣燈號分數
         score = state.get('score')
-        if score is not None:
-            conditions.append({'name': '景氣燈號分數', 'value': score})
         
-        # 添加額外條件
-        if additional_conditions:
-            conditions.extend(additional_conditions)
+        # 沒有額外條件時，交易步驟只取決於（原因, 分數），直接使用快取
+        if not additional_conditions:
+            return _cached_trade_step(reason, score)
+        
+        # 添加景氣燈號分數與額外條件
+        conditions = [{'name': _SCORE_CONDITION_NAME, 'value': score}] if score is not None else []
+        conditions.extend(additional_conditions)
         
         return {
             'reason': reason,
             'conditions': conditions
         }
-
-
-class BuyAndHoldStrategyNew:
-    """買進並持有策略（基準策略，新版本）"""
-    
-    def __init__(self, stock_ticker='006208'):
-        """
-        初始化策略
-        
-        參數:
-        - stock_ticker: 股票代號（預設 '006208'，富邦台50）
-        """
-        self.stock_ticker = stock_ticker
-        self.bought = False
     
     def generate_orders(self, state, date, row, price_dict, positions=None, portfolio_value=None):
         """
-        買進並持有策略：只在第一次有機會時買進，之後不再交易
+        景氣週期策略：藍燈買進股票並賣出避險資產，紅燈賣出股票並買進避險資產（無避險資產時持有現金）
         
         參數:
-        - state: 策略狀態字典（此策略不使用）
+        - state: 策略狀態字典
         - date: 交易日期
         - row: 當天的資料行（包含所有指標，已對齊）
         - price_dict: 價格字典 {ticker: close}
@@ -75,250 +296,285 @@ class BuyAndHoldStrategyNew:
         返回:
         - 訂單列表
         """
-        orders = []
-        
-        # 只在第一次買進
-        if not self.bought:
-            if self.stock_ticker in price_dict:
-                trade_step = {
-                    'reason': '買進並持有',
-                    'conditions': [
-                        {'name': '策略類型', 'value': 'BuyAndHold'}
-                    ]
-                }
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.stock_ticker,
-                    'percent': 1.0,  # 100% 買進
-                    'trade_step': trade_step,
-                    'signal_score': row.get('signal_景氣對策信號綜合分數'),
-                    'signal_text': row.get('signal_景氣對策信號')
-                })
-                self.bought = True
-        
-        return orders
-
-
-class ShortTermBondStrategyNew(CycleStrategyNew):
-    """短天期美債避險策略（新版本）"""
-    
-    def __init__(self, stock_ticker='006208', hedge_ticker='00865B'):
-        """
-        初始化策略
+        # 缺值或非藍/紅燈的日子先返回，不需取得交易記錄用的燈號欄位
+        score = state.get('score')
+        if score is None or self.BLUE_RANGE[1] < score < self.RED_THRESHOLD:
+            return _EMPTY_ORDERS
         
-        參數:
-        - stock_ticker: 股票代號（預設 '006208'，富邦台50）
-        - hedge_ticker: 避險資產代號（預設 '00865B'，短期美債）
-        """
-        super().__init__(stock_ticker, hedge_ticker)
-        self.first_trading_day = True  # 標記是否為第一個交易日
+        # 取得燈號分數和文字（用於交易記錄）
+        return self.generate_orders_at(
+            state,
+            score,
+            row.get('signal_景氣對策信號綜合分數'),
+            row.get('signal_景氣對策信號')
+        )
     
-    def generate_orders(self, state, date, row, price_dict, positions=None, portfolio_value=None):
+    def generate_orders_at(self, state, score, signal_score, signal_text):
         """
-        短天期美債避險策略：藍燈買進股票，紅燈賣出股票並買進避險資產
+        以位置參數傳入當天分數的訂單核心（呼叫端已預先取出分數欄位時可直接呼叫）
         
         參數:
         - state: 策略狀態字典
-        - date: 交易日期
-        - row: 當天的資料行（包含所有指標，已對齊）
-        - price_dict: 價格字典 {ticker: close}
-        - positions: 當前持倉字典（可選）
-        - portfolio_value: 當前投資組合總價值（可選）
+        - score: 景氣燈號分數（缺值為 None）
+        - signal_score: 交易記錄用的燈號分數
+        - signal_text: 交易記錄用的燈號文字
         
         返回:
         - 訂單列表
         """
-        orders = []
-        score = state.get('score')
+        blue_lo, blue_hi = self.BLUE_RANGE
+        red_threshold = self.RED_THRESHOLD
         
-        # 取得燈號分數和文字（用於交易記錄）
-        signal_score = row.get('signal_景氣對策信號綜合分數')
-        signal_text = row.get('signal_景氣對策信號')
+        # 缺值或非藍/紅燈（大多數交易日）不動作，不需讀取持倉狀態
+        if score is None or blue_hi < score < red_threshold:
+            return _EMPTY_ORDERS
         
-        # 回測開始時，在第一個交易日分批買進股票
-        if self.first_trading_day:
-            if self.stock_ticker in price_dict:
-                trade_step = self._create_trade_step('回測開始買進', state)
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.stock_ticker,
-                    'percent': 1.0,
-                    'split_execution': True,  # 標記需要分批執行
-                    'trade_step': trade_step,
-                    'signal_score': signal_score,
-                    'signal_text': signal_text
-                })
-                state['state'] = True
-                self.first_trading_day = False
+        orders = _EMPTY_ORDERS  # 有訂單時才以 += 建立新的 tuple
+        stock_ticker = self.stock_ticker
+        hedge_ticker = self.hedge_ticker
         
-        if score is None:
-            return orders
+        # 持倉狀態只讀取一次，之後以區域變數判斷
+        holding = state.get('state', False)
+        hedge_holding = state.get('hedge_state', False)
         
-        # 藍燈（9-16分）：買進股票，賣出避險資產
-        if 9 <= score <= 16:
+        # 藍燈（預設 9-16分）：買進股票，賣出避險資產
+        if blue_lo <= score <= blue_hi:
             # 如果沒有持有股票，買進（分批執行）
-            if not state.get('state', False):
-                trade_step = self._create_trade_step('藍燈買進', state)
-                orders.append({
+            if not holding:
+                orders += ({
                     'action': 'buy',
-                    'ticker': self.stock_ticker,
+                    'ticker': stock_ticker,
                     'percent': 1.0,
                     'split_execution': True,  # 標記需要分批執行
-                    'trade_step': trade_step,
+                    'trade_step': self._create_trade_step('藍燈買進', state),
                     'signal_score': signal_score,
                     'signal_text': signal_text
-                })
+                },)
                 state['state'] = True
             
             # 如果有避險資產且持有，賣出（分批執行）
-            if self.hedge_ticker and state.get('hedge_state', False):
-                hedge_trade_step = self._create_trade_step('藍燈賣出避險資產', state)
-                orders.append({
+            if hedge_ticker and hedge_holding:
+                orders += ({
                     'action': 'sell',
-                    'ticker': self.hedge_ticker,
+                    'ticker': hedge_ticker,
                     'percent': 1.0,
                     'split_execution': True,  # 標記需要分批執行
-                    'trade_step': hedge_trade_step,
+                    'trade_step': self._create_trade_step('藍燈賣出避險資產', state),
                     'signal_score': signal_score,
                     'signal_text': signal_text
-                })
+                },)
                 state['hedge_state'] = False
         
-        # 紅燈（≥38分）：賣出股票，買進避險資產
-        elif score >= 38:
+        # 紅燈（預設 ≥38分）：賣出股票，買進避險資產
+        elif score >= red_threshold:
             # 如果持有股票，賣出（分批執行）
-            if state.get('state', False):
-                hedge_trade_step = self._create_trade_step('紅燈買進避險資產', state)
-                trade_step = self._create_trade_step('紅燈賣出', state)
-                orders.append({
+            if holding:
+                order = {
                     'action': 'sell',
-                    'ticker': self.stock_ticker,
+                    'ticker': stock_ticker,
                     'percent': 1.0,
                     'split_execution': True,  # 標記需要分批執行
-                    'trigger_hedge_buy': True,  # 標記需要買進避險資產
-                    'hedge_ticker': self.hedge_ticker,
-                    'trade_step': trade_step,
-                    'hedge_trade_step': hedge_trade_step,  # 供引擎使用
+                    'trade_step': self._create_trade_step('紅燈賣出', state),
                     'signal_score': signal_score,
                     'signal_text': signal_text
-                })
-                state['state'] = False
-                if self.hedge_ticker:
+                }
+                # 有避險資產時才附加同步買進資訊（引擎以賣出所得現金逐日買進避險資產）
+                if hedge_ticker:
+                    order['trigger_hedge_buy'] = True  # 標記需要買進避險資產
+                    order['hedge_ticker'] = hedge_ticker
+                    order['hedge_trade_step'] = self._create_trade_step('紅燈買進避險資產', state)  # 供引擎使用
                     state['hedge_state'] = True
+                orders += (order,)
+                state['state'] = False
         
         return orders
-
-
-class CashStrategyNew(CycleStrategyNew):
-    """現金避險策略（新版本）"""
     
-    def __init__(self, stock_ticker='006208'):
+    @classmethod
+    def _check_batch_support(cls):
+        """整段批次計算只重現燈號切換的訂單，依賴持倉的策略（如 50:50 配置）直接拒絕"""
+        if cls._REQUIRES_POSITIONS:
+            raise TypeError(f"{cls.__name__} 產生訂單需要持倉資訊，不支援整段批次計算")
+    
+    @classmethod
+    def precompute_buckets(cls, score_arr):
         """
-        初始化策略
+        以 searchsorted 一次將整段分數分桶，取代逐日的區間比較
         
         參數:
-        - stock_ticker: 股票代號（預設 '006208'，富邦台50）
+        - score_arr: 每日景氣燈號分數陣列（缺值為 NaN）
+        
+        返回:
+        - np.ndarray(int8): 分桶編號（0 = 低於藍燈或缺值、1 = 藍燈、2 = 藍燈與紅燈之間、3 = 紅燈）
         """
-        super().__init__(stock_ticker, None)  # hedge_ticker=None
-        self.first_trading_day = True  # 標記是否為第一個交易日
+        cls._check_batch_support()
+        score_arr = np.asarray(score_arr, dtype=float)
+        blue_lo, blue_hi = cls.BLUE_RANGE
+        # searchsorted side='right'：藍燈上限取 nextafter，使非整數分數與 blue_lo <= score <= blue_hi 一致
+        bounds = np.array([blue_lo, np.nextafter(float(blue_hi), np.inf), cls.RED_THRESHOLD], dtype=float)
+        buckets = np.searchsorted(bounds, score_arr, side='right').astype(np.int8)
+        buckets[np.isnan(score_arr)] = 0
+        return buckets
     
-    def generate_orders(self, state, date, row, price_dict, positions=None, portfolio_value=None):
+    @classmethod
+    def compute_signals(cls, score_arr):
         """
-        現金避險策略：藍燈買進股票，紅燈賣出股票並持有現金
+        以 NumPy 一次計算整段回測的進出場訊號（與逐日 generate_orders 結果一致）
+        
+        回測開始時視為已持有股票（對應第一個交易日的「回測開始買進」），
+        之後只有燈號在藍燈與紅燈之間切換的那一天才會產生訊號。
         
         參數:
-        - state: 策略狀態字典
-        - date: 交易日期
-        - row: 當天的資料行（包含所有指標，已對齊）
-        - price_dict: 價格字典 {ticker: close}
-        - positions: 當前持倉字典（可選）
-        - portfolio_value: 當前投資組合總價值（可選）
+        - score_arr: 每日景氣燈號分數陣列（缺值為 NaN）
         
         返回:
-        - 訂單列表
+        - (entries, exits, hedge_entries, hedge_exits): 四個布林陣列
+          entries 為藍燈買進股票、exits 為紅燈賣出股票，
+          hedge_entries 為紅燈買進避險資產、hedge_exits 為藍燈賣出避險資產
         """
-        orders = []
-        score = state.get('score')
+        cls._check_batch_support()
+        # 燈號：1 = 藍燈，2 = 紅燈，0 = 其他或缺值
+        light = np.empty(len(score_arr) + 1, dtype=np.int8)
+        light[0] = 1  # 回測開始時持有股票，等同最後一次為藍燈
+        light[1:] = _BUCKET_LIGHT[cls.precompute_buckets(score_arr)]
+        
+        # 向前填補最近一次的藍/紅燈，得到每天開盤前的持倉狀態
+        last_idx = np.where(light != 0, np.arange(len(light)), 0)
+        np.maximum.accumulate(last_idx, out=last_idx)
+        prev_light = light[last_idx][:-1]
+        light = light[1:]
+        
+        entries = (light == 1) & (prev_light == 2)
+        exits = (light == 2) & (prev_light == 1)
+        return entries, exits, exits.copy(), entries.copy()
+    
+    @classmethod
+    def compute_actions(cls, score_arr):
+        """
+        以狀態機核心計算每日動作代碼（逐日 generate_orders 的純量對照版本）
         
-        # 取得燈號分數和文字（用於交易記錄）
-        signal_score = row.get('signal_景氣對策信號綜合分數')
-        signal_text = row.get('signal_景氣對策信號')
+        參數:
+        - score_arr: 每日景氣燈號分數陣列（缺值為 NaN）
         
-        # 回測開始時，在第一個交易日分批買進股票
-        if self.first_trading_day:
-            if self.stock_ticker in price_dict:
-                trade_step = self._create_trade_step('回測開始買進', state)
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.stock_ticker,
-                    'percent': 1.0,
-                    'split_execution': True,  # 標記需要分批執行
-                    'trade_step': trade_step,
-                    'signal_score': signal_score,
-                    'signal_text': signal_text
-                })
-                state['state'] = True
-                self.first_trading_day = False
+        返回:
+        - np.ndarray(int8): 每日動作代碼，非零處即需要產生訂單的日期
+        """
+        cls._check_batch_support()
+        blue_lo, blue_hi = cls.BLUE_RANGE
+        return _run_light_fsm(score_arr, blue_lo, blue_hi, cls.RED_THRESHOLD)
+    
+    def generate_all_orders(self, score_arr, dates, signal_texts=None):
+        """
+        一次產生整段回測的訂單（不逐日呼叫 generate_orders）
         
-        if score is None:
-            return orders
+        以狀態機找出燈號切換的日期，只在這些日期呼叫訂單核心，
+        因此訂單內容與逐日執行時相同；第 0 天為回測開始買進。
         
-        # 藍燈（9-16分）：買進股票
-        if 9 <= score <= 16:
-            # 如果沒有持有股票，買進（分批執行）
-            if not state.get('state', False):
-                trade_step = self._create_trade_step('藍燈買進', state)
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.stock_ticker,
-                    'percent': 1.0,
-                    'split_execution': True,  # 標記需要分批執行
-                    'trade_step': trade_step,
-                    'signal_score': signal_score,
-                    'signal_text': signal_text
-                })
-                state['state'] = True
+        參數:
+        - score_arr: 每日景氣燈號分數陣列（缺值為 NaN）
+        - dates: 與 score_arr 等長的交易日期序列
+        - signal_texts: 每日燈號文字序列（可選，用於交易記錄）
         
-        # 紅燈（≥38分）：賣出股票，持有現金（不買進避險資產）
-        elif score >= 38:
-            # 如果持有股票，賣出（分批執行）
-            if state.get('state', False):
-                trade_step = self._create_trade_step('紅燈賣出', state)
-                orders.append({
-                    'action': 'sell',
-                    'ticker': self.stock_ticker,
-                    'percent': 1.0,
-                    'split_execution': True,  # 標記需要分批執行
-                    # 注意：不設置 trigger_hedge_buy，因為沒有避險資產
-                    'trade_step': trade_step,
-                    'signal_score': signal_score,
-                    'signal_text': signal_text
-                })
-                state['state'] = False
+        返回:
+        - 訂單列表，每筆訂單額外帶有 'date' 欄位
+        """
+        self._check_batch_support()
+        scores = np.asarray(score_arr, dtype=float)
+        if len(scores) == 0:
+            return []
+        
+        def signal_fields(day):
+            score = scores[day].item()
+            score = None if np.isnan(score) else score
+            signal_text = signal_texts[day] if signal_texts is not None else None
+            return score, signal_text
+        
+        score, signal_text = signal_fields(0)
+        state = {'state': False, 'hedge_state': False, 'score': score}
+        orders = [dict(self._initial_order(state, score, signal_text), date=dates[0])]
+        
+        for day in np.flatnonzero(self.compute_actions(scores)).tolist():
+            score, signal_text = signal_fields(day)
+            state['score'] = score
+            for order in self.generate_orders_at(state, score, score, signal_text):
+                order['date'] = dates[day]
+                orders.append(order)
         
         return orders
+    
+    def build_order_batch(self, score_arr):
+        """
+        依整段分數序列產生欄式訂單批次（不含分批執行與價格檢查）
+        
+        第 0 天為回測開始買進；紅燈切換時同時列出賣出股票與買進避險資產兩筆訂單，
+        藍燈切換時列出買進股票與賣出避險資產兩筆訂單。
+        
+        參數:
+        - score_arr: 每日景氣燈號分數陣列（缺值為 NaN）
+        
+        返回:
+        - OrderBatch
+        """
+        self._check_batch_support()
+        stock_id = self.ticker_ids[self.stock_ticker]
+        hedge_id = self.ticker_ids.get(self.hedge_ticker)
+        
+        days = [0]
+        actions = [ORDER_ACTION_BUY]
+        ticker_ids = [stock_id]
+        aux = ['回測開始買進']
+        
+        fsm_actions = self.compute_actions(score_arr)
+        for day in np.flatnonzero(fsm_actions).tolist():
+            if fsm_actions[day] == FSM_BLUE_SWITCH:
+                legs = [(ORDER_ACTION_BUY, stock_id, '藍燈買進')]
+                if hedge_id is not None:
+                    legs.append((ORDER_ACTION_SELL, hedge_id, '藍燈賣出避險資產'))
+            else:
+                legs = [(ORDER_ACTION_SELL, stock_id, '紅燈賣出')]
+                if hedge_id is not None:
+                    legs.append((ORDER_ACTION_BUY, hedge_id, '紅燈買進避險資產'))
+            for action, ticker_id, reason in legs:
+                days.append(day)
+                actions.append(action)
+                ticker_ids.append(ticker_id)
+                aux.append(reason)
+        
+        return OrderBatch(
+            days=np.array(days, dtype=np.int32),
+            actions=np.array(actions, dtype=np.int8),
+            ticker_ids=np.array(ticker_ids, dtype=np.int16),
+            percents=np.ones(len(days), dtype=np.float64),
+            aux=aux
+        )
 
 
-class LongTermBondStrategyNew(CycleStrategyNew):
-    """長天期美債避險策略（新版本）"""
+class BuyAndHoldStrategyNew:
+    """買進並持有策略（基準策略，新版本）"""
     
-    def __init__(self, stock_ticker='006208', hedge_ticker='00687B'):
+    __slots__ = ('stock_ticker', 'bought')
+    
+    # 固定的交易步驟（所有實例共用，呼叫端不可修改；使用一般 dict 以便多程序間 pickle）
+    _BUY_AND_HOLD_STEP = {
+        'reason': '買進並持有',
+        'conditions': ({'name': '策略類型', 'value': 'BuyAndHold'},)
+    }
+    
+    def __init__(self, stock_ticker='006208'):
         """
         初始化策略
         
         參數:
         - stock_ticker: 股票代號（預設 '006208'，富邦台50）
-        - hedge_ticker: 避險資產代號（預設 '00687B'，國泰20年美債）
         """
-        super().__init__(stock_ticker, hedge_ticker)
-        self.first_trading_day = True  # 標記是否為第一個交易日
+        self.stock_ticker = stock_ticker
+        self.bought = False
     
     def generate_orders(self, state, date, row, price_dict, positions=None, portfolio_value=None):
         """
-        長天期美債避險策略：藍燈買進股票，紅燈賣出股票並買進避險資產
+        買進並持有策略：只在第一次有機會時買進，之後不再交易
         
         參數:
-        - state: 策略狀態字典
+        - state: 策略狀態字典（此策略不使用）
         - date: 交易日期
         - row: 當天的資料行（包含所有指標，已對齊）
         - price_dict: 價格字典 {ticker: close}
@@ -328,200 +584,95 @@ class LongTermBondStrategyNew(CycleStrategyNew):
         返回:
         - 訂單列表
         """
-        orders = []
-        score = state.get('score')
-        
-        # 取得燈號分數和文字（用於交易記錄）
-        signal_score = row.get('signal_景氣對策信號綜合分數')
-        signal_text = row.get('signal_景氣對策信號')
-        
-        # 回測開始時，在第一個交易日分批買進股票
-        if self.first_trading_day:
-            if self.stock_ticker in price_dict:
-                trade_step = self._create_trade_step('回測開始買進', state)
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.stock_ticker,
-                    'percent': 1.0,
-                    'split_execution': True,  # 標記需要分批執行
-                    'trade_step': trade_step,
-                    'signal_score': signal_score,
-                    'signal_text': signal_text
-                })
-                state['state'] = True
-                self.first_trading_day = False
-        
-        if score is None:
-            return orders
-        
-        # 藍燈（9-16分）：買進股票，賣出避險資產
-        if 9 <= score <= 16:
-            # 如果沒有持有股票，買進（分批執行）
-            if not state.get('state', False):
-                trade_step = self._create_trade_step('藍燈買進', state)
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.stock_ticker,
-                    'percent': 1.0,
-                    'split_execution': True,  # 標記需要分批執行
-                    'trade_step': trade_step,
-                    'signal_score': signal_score,
-                    'signal_text': signal_text
-                })
-                state['state'] = True
-            
-            # 如果有避險資產且持有，賣出（分批執行）
-            if self.hedge_ticker and state.get('hedge_state', False):
-                hedge_trade_step = self._create_trade_step('藍燈賣出避險資產', state)
-                orders.append({
-                    'action': 'sell',
-                    'ticker': self.hedge_ticker,
-                    'percent': 1.0,
-                    'split_execution': True,  # 標記需要分批執行
-                    'trade_step': hedge_trade_step,
-                    'signal_score': signal_score,
-                    'signal_text': signal_text
-                })
-                state['hedge_state'] = False
-        
-        # 紅燈（≥38分）：賣出股票，買進避險資產
-        elif score >= 38:
-            # 如果持有股票，賣出（分批執行）
-            if state.get('state', False):
-                hedge_trade_step = self._create_trade_step('紅燈買進避險資產', state)
-                trade_step = self._create_trade_step('紅燈賣出', state)
-                orders.append({
-                    'action': 'sell',
-                    'ticker': self.stock_ticker,
-                    'percent': 1.0,
-                    'split_execution': True,  # 標記需要分批執行
-                    'trigger_hedge_buy': True,  # 標記需要買進避險資產
-                    'hedge_ticker': self.hedge_ticker,
-                    'trade_step': trade_step,
-                    'hedge_trade_step': hedge_trade_step,  # 供引擎使用
-                    'signal_score': signal_score,
-                    'signal_text': signal_text
-                })
-                state['state'] = False
-                if self.hedge_ticker:
-                    state['hedge_state'] = True
-        
-        return orders
+        # 只在第一次買進
+        if self.bought or self.stock_ticker not in price_dict:
+            return _EMPTY_ORDERS
+        
+        self.bought = True
+        return [{
+            'action': 'buy',
+            'ticker': self.stock_ticker,
+            'percent': 1.0,  # 100% 買進
+            'trade_step': self._BUY_AND_HOLD_STEP,
+            'signal_score': row.get('signal_景氣對策信號綜合分數'),
+            'signal_text': row.get('signal_景氣對策信號')
+        }]
 
 
-class InverseETFStrategyNew(CycleStrategyNew):
-    """反向ETF避險策略（新版本）"""
+class ShortTermBondStrategyNew(CycleStrategyNew):
+    """短天期美債避險策略（新版本）"""
     
-    def __init__(self, stock_ticker='006208', hedge_ticker='00664R'):
+    __slots__ = ()
+    
+    def __init__(self, stock_ticker='006208', hedge_ticker='00865B'):
         """
         初始化策略
         
         參數:
         - stock_ticker: 股票代號（預設 '006208'，富邦台50）
-        - hedge_ticker: 避險資產代號（預設 '00664R'，國泰臺灣加權反1）
+        - hedge_ticker: 避險資產代號（預設 '00865B'，短期美債）
         """
         super().__init__(stock_ticker, hedge_ticker)
-        self.first_trading_day = True  # 標記是否為第一個交易日
+
+
+class CashStrategyNew(CycleStrategyNew):
+    """現金避險策略（新版本，紅燈賣出股票後持有現金）"""
     
-    def generate_orders(self, state, date, row, price_dict, positions=None, portfolio_value=None):
+    __slots__ = ()
+    
+    def __init__(self, stock_ticker='006208'):
         """
-        反向ETF避險策略：藍燈買進股票，紅燈賣出股票並買進避險資產
+        初始化策略
         
         參數:
-        - state: 策略狀態字典
-        - date: 交易日期
-        - row: 當天的資料行（包含所有指標，已對齊）
-        - price_dict: 價格字典 {ticker: close}
-        - positions: 當前持倉字典（可選）
-        - portfolio_value: 當前投資組合總價值（可選）
-        
-        返回:
-        - 訂單列表
+        - stock_ticker: 股票代號（預設 '006208'，富邦台50）
         """
-        orders = []
-        score = state.get('score')
-        
-        # 取得燈號分數和文字（用於交易記錄）
-        signal_score = row.get('signal_景氣對策信號綜合分數')
-        signal_text = row.get('signal_景氣對策信號')
-        
-        # 回測開始時，在第一個交易日分批買進股票
-        if self.first_trading_day:
-            if self.stock_ticker in price_dict:
-                trade_step = self._create_trade_step('回測開始買進', state)
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.stock_ticker,
-                    'percent': 1.0,
-                    'split_execution': True,  # 標記需要分批執行
-                    'trade_step': trade_step,
-                    'signal_score': signal_score,
-                    'signal_text': signal_text
-                })
-                state['state'] = True
-                self.first_trading_day = False
-        
-        if score is None:
-            return orders
-        
-        # 藍燈（9-16分）：買進股票，賣出避險資產
-        if 9 <= score <= 16:
-            # 如果沒有持有股票，買進（分批執行）
-            if not state.get('state', False):
-                trade_step = self._create_trade_step('藍燈買進', state)
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.stock_ticker,
-                    'percent': 1.0,
-                    'split_execution': True,  # 標記需要分批執行
-                    'trade_step': trade_step,
-                    'signal_score': signal_score,
-                    'signal_text': signal_text
-                })
-                state['state'] = True
-            
-            # 如果有避險資產且持有，賣出（分批執行）
-            if self.hedge_ticker and state.get('hedge_state', False):
-                hedge_trade_step = self._create_trade_step('藍燈賣出避險資產', state)
-                orders.append({
-                    'action': 'sell',
-                    'ticker': self.hedge_ticker,
-                    'percent': 1.0,
-                    'split_execution': True,  # 標記需要分批執行
-                    'trade_step': hedge_trade_step,
-                    'signal_score': signal_score,
-                    'signal_text': signal_text
-                })
-                state['hedge_state'] = False
+        super().__init__(stock_ticker, None)  # hedge_ticker=None
+
+
+class LongTermBondStrategyNew(CycleStrategyNew):
+    """長天期美債避險策略（新版本）"""
+    
+    __slots__ = ()
+    
+    def __init__(self, stock_ticker='006208', hedge_ticker='00687B'):
+        """
+        初始化策略
         
-        # 紅燈（≥38分）：賣出股票，買進避險資產
-        elif score >= 38:
-            # 如果持有股票，賣出（分批執行）
-            if state.get('state', False):
-                hedge_trade_step = self._create_trade_step('紅燈買進避險資產', state)
-                trade_step = self._create_trade_step('紅燈賣出', state)
-                orders.append({
-                    'action': 'sell',
-                    'ticker': self.stock_ticker,
-                    'percent': 1.0,
-                    'split_execution': True,  # 標記需要分批執行
-                    'trigger_hedge_buy': True,  # 標記需要買進避險資產
-                    'hedge_ticker': self.hedge_ticker,
-                    'trade_step': trade_step,
-                    'hedge_trade_step': hedge_trade_step,  # 供引擎使用
-                    'signal_score': signal_score,
-                    'signal_text': signal_text
-                })
-                state['state'] = False
-                if self.hedge_ticker:
-                    state['hedge_state'] = True
+        參數:
+        - stock_ticker: 股票代號（預設 '006208'，富邦台50）
+        - hedge_ticker: 避險資產代號（預設 '00687B'，國泰20年美債）
+        """
+        super().__init__(stock_ticker, hedge_ticker)
+
+
+class InverseETFStrategyNew(CycleStrategyNew):
+    """反向ETF避險策略（新版本）"""
+    
+    __slots__ = ()
+    
+    def __init__(self, stock_ticker='006208', hedge_ticker='00664R'):
+        """
+        初始化策略
         
-        return orders
+        參數:
+        - stock_ticker: 股票代號（預設 '006208'，富邦台50）
+        - hedge_ticker: 避險資產代號（預設 '00664R'，國泰臺灣加權反1）
+        """
+        super().__init__(stock_ticker, hedge_ticker)
 
 
 class FiftyFiftyStrategyNew(CycleStrategyNew):
     """50:50配置策略（新版本）"""
     
+    __slots__ = ()
+    
+    # 藍燈不設下限（分數 ≤16 即視為藍燈；綜合分數不會小於 0）
+    BLUE_RANGE = (0, 16)
+    
+    # 紅燈減碼依當前持倉比例計算
+    _REQUIRES_POSITIONS = True
+    
     def __init__(self, stock_ticker='006208', hedge_ticker='00865B'):
         """
         初始化策略
@@ -531,7 +682,6 @@ class FiftyFiftyStrategyNew(CycleStrategyNew):
         - hedge_ticker: 避險資產代號（預設 '00865B'，短期美債）
         """
         super().__init__(stock_ticker, hedge_ticker)
-        self.first_trading_day = True  # 標記是否為第一個交易日
     
     def generate_orders(self, state, date, row, price_dict, positions=None, portfolio_value=None):
         """
@@ -548,117 +698,253 @@ class FiftyFiftyStrategyNew(CycleStrategyNew):
         返回:
         - 訂單列表
         """
-        orders = []
         score = state.get('score')
+        if score is None:
+            return _EMPTY_ORDERS
+        
+        orders = _EMPTY_ORDERS  # 有訂單時才以 += 建立新的 tuple
         
         # 取得燈號分數和文字（用於交易記錄）
         signal_score = row.get('signal_景氣對策信號綜合分數')
         signal_text = row.get('signal_景氣對策信號')
         
-        # 回測開始時，在第一個交易日分批買進股票
-        if self.first_trading_day:
-            if self.stock_ticker in price_dict:
-                trade_step = self._create_trade_step('回測開始買進', state)
-                orders.append({
-                    'action': 'buy',
-                    'ticker': self.stock_ticker,
-                    'percent': 1.0,
-                    'split_execution': True,  # 標記需要分批執行
-                    'trade_step': trade_step,
-                    'signal_score': signal_score,
-                    'signal_text': signal_text
-                })
-                state['state'] = True
-                self.first_trading_day = False
-        
-        if score is None:
-            return orders
+        blue_lo, blue_hi = self.BLUE_RANGE
+        red_threshold = self.RED_THRESHOLD
+        holding = state.get('state', False)  # 各燈號分支互斥，持有狀態只需讀取一次
         
         # 藍燈（≤16分）：買進100%股票，賣出避險資產
-        if score <= 16:
+        if blue_lo <= score <= blue_hi:
             # 如果沒有持有股票，買進（分批執行）
-            if not state.get('state', False):
-                trade_step = self._create_trade_step('藍燈買進', state)
-                orders.append({
+            if not holding:
+                orders += ({
                     'action': 'buy',
                     'ticker': self.stock_ticker,
                     'percent': 1.0,
                     'split_execution': True,  # 標記需要分批執行
-                    'trade_step': trade_step,
+                    'trade_step': self._create_trade_step('藍燈買進', state),
                     'signal_score': signal_score,
                     'signal_text': signal_text
-                })
+                },)
                 state['state'] = True
             
             # 如果有避險資產且持有，賣出（分批執行）
             if self.hedge_ticker and state.get('hedge_state', False):
-                hedge_trade_step = self._create_trade_step('藍燈賣出避險資產', state)
-                orders.append({
+                orders += ({
                     'action': 'sell',
                     'ticker': self.hedge_ticker,
                     'percent': 1.0,
                     'split_execution': True,  # 標記需要分批執行
-                    'trade_step': hedge_trade_step,
+                    'trade_step': self._create_trade_step('藍燈賣出避險資產', state),
                     'signal_score': signal_score,
                     'signal_text': signal_text
-                })
+                },)
                 state['hedge_state'] = False
         
         # 其他燈號（17-37分）：首次進入時買進100%股票
-        elif 17 <= score <= 37:
+        elif blue_hi + 1 <= score <= red_threshold - 1:
             # 如果沒有持有股票，買進（分批執行）
-            if not state.get('state', False):
-                trade_step = self._create_trade_step('首次進入買進', state)
-                orders.append({
+            if not holding:
+                orders += ({
                     'action': 'buy',
                     'ticker': self.stock_ticker,
                     'percent': 1.0,
                     'split_execution': True,  # 標記需要分批執行
-                    'trade_step': trade_step,
+                    'trade_step': self._create_trade_step('首次進入買進', state),
                     'signal_score': signal_score,
                     'signal_text': signal_text
-                })
+                },)
                 state['state'] = True
         
         # 紅燈（≥38分）：保留50%股票，買進50%避險資產
-        elif score >= 38:
-            if state.get('state', False) and positions and portfolio_value and portfolio_value > 0:
+        elif score >= red_threshold:
+            if holding and positions and portfolio_value and portfolio_value > 0:
                 # 計算當前股票持倉比例
-                current_stock_value = positions.get(self.stock_ticker, 0) * price_dict.get(self.stock_ticker, 0)
-                current_stock_pct = current_stock_value / portfolio_value if portfolio_value > 0 else 0
+                current_stock_pct = _holding_pct(positions, self.stock_ticker, price_dict, portfolio_value)
                 
                 # 如果股票比例 > 55%，需要減碼至50%
                 if current_stock_pct > 0.55:
                     sell_pct = (current_stock_pct - 0.5) / current_stock_pct
-                    trade_step = self._create_trade_step('紅燈減碼至50%', state, [
-                        {'name': '當前股票比例', 'value': current_stock_pct * 100}
-                    ])
-                    hedge_trade_step = self._create_trade_step('紅燈買進避險資產至50%', state)
-                    
-                    orders.append({
+                    orders += ({
                         'action': 'sell',
                         'ticker': self.stock_ticker,
                         'percent': sell_pct,
                         'split_execution': True,  # 標記需要分批執行
                         'trigger_hedge_buy': True,  # 標記需要買進避險資產
                         'hedge_ticker': self.hedge_ticker,
-                        'trade_step': trade_step,
-                        'hedge_trade_step': hedge_trade_step,  # 供引擎使用
+                        'trade_step': self._create_trade_step('紅燈減碼至50%', state, [
+                            {'name': '當前股票比例', 'value': current_stock_pct * 100}
+                        ]),
+                        'hedge_trade_step': self._create_trade_step('紅燈買進避險資產至50%', state),  # 供引擎使用
                         'signal_score': signal_score,
                         'signal_text': signal_text
-                    })
-                    
-                    # 計算避險資產目標比例（50%）
-                    current_hedge_value = positions.get(self.hedge_ticker, 0) * price_dict.get(self.hedge_ticker, 0) if self.hedge_ticker else 0
-                    current_hedge_pct = current_hedge_value / portfolio_value if portfolio_value > 0 else 0
-                    target_hedge_pct = 0.5
-                    hedge_diff = target_hedge_pct - current_hedge_pct
+                    },)
                     
-                    # 如果避險資產不足50%，需要買進
-                    if hedge_diff > 0.05 and self.hedge_ticker:  # 5% 的容許誤差
-                        # 注意：避險資產買進會在引擎中根據 trigger_hedge_buy 自動處理
-                        # 這裡只標記狀態
+                    # 如果避險資產不足目標比例 50%，需要買進（5% 的容許誤差）
+                    # 注意：避險資產買進會在引擎中根據 trigger_hedge_buy 自動處理，這裡只標記狀態
+                    if self.hedge_ticker and 0.5 - _holding_pct(positions, self.hedge_ticker, price_dict, portfolio_value) > 0.05:
                         state['hedge_state'] = True
         
         return orders
 
+
+def _sweep_worker(strategy_class, params, score_arr):
+    """參數掃描的子行程工作函數：建立策略並產生整段訂單批次"""
+    return strategy_class(**params).build_order_batch(score_arr)
+
+
+def run_sweep(params_list, score_arr, strategy_class=ShortTermBondStrategyNew, max_workers=None):
+    """
+    以多行程平行執行參數掃描（各組參數的時間序列彼此獨立）
+    
+    子行程與 run_all_strategies 相同使用 spawn 啟動，避免 fork 複製父行程的資料庫連線等狀態；
+    在 Windows 上呼叫端必須位於 if __name__ == '__main__': 區塊內。
+    
+    參數:
+    - params_list: 策略建構參數字典列表，例如 [{'hedge_ticker': '00865B'}, ...]
+    - score_arr: 每日景氣燈號分數陣列（缺值為 NaN）
+    - strategy_class: 策略類別（需提供 build_order_batch，預設 ShortTermBondStrategyNew）
+    - max_workers: 行程數（預設 os.cpu_count()）
+    
+    返回:
+    - OrderBatch 列表，順序與 params_list 相同
+    """
+    if not params_list:
+        return []
+    
+    max_workers = max_workers or os.cpu_count() or 1
+    score_arr = np.asarray(score_arr, dtype=float)
+    n = len(params_list)
+    chunksize = max(1, n // (4 * max_workers))
+    
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return list(executor.map(
+            _sweep_worker, [strategy_class] * n, params_list, [score_arr] * n, chunksize=chunksize
+        ))
+
+
+# 整段回測訂單的記憶體快取（LRU）：{快取鍵: 訂單列表}
+_ALL_ORDERS_CACHE = OrderedDict()
+_ALL_ORDERS_CACHE_SIZE = 64
+
+# 訂單邏輯版本：修改 generate_orders_at、燈號門檻或訂單格式時必須遞增，使磁碟上的舊快取失效
+_ALL_ORDERS_CACHE_VERSION = 1
+
+
+def _all_orders_cache_key(strategy_class, params, score_arr, dates, signal_texts):
+    """以快取版本、策略類別與燈號門檻、建構參數與整段輸入資料計算 SHA256 快取鍵"""
+    digest = hashlib.sha256()
+    digest.update(repr((
+        _ALL_ORDERS_CACHE_VERSION,
+        f"{strategy_class.__module__}.{strategy_class.__qualname__}",
+        strategy_class.BLUE_RANGE,
+        strategy_class.RED_THRESHOLD
+    )).encode())
+    digest.update(repr(sorted(params.items())).encode())
+    digest.update(np.ascontiguousarray(score_arr, dtype=float).tobytes())
+    digest.update(repr(list(dates)).encode())
+    digest.update(repr(None if signal_texts is None else list(signal_texts)).encode())
+    return digest.hexdigest()
+
+
+def cached_all_orders(strategy_class, params, score_arr, dates, signal_texts=None, cache_dir=None):
+    """
+    帶快取的 generate_all_orders（記憶體 LRU + 磁碟 pickle 兩層）
+    
+    同一組策略、參數與資料只計算一次；資料或燈號門檻有任何變動時快取鍵不同，自然重新計算。
+    訂單邏輯本身的修改無法自動偵測，需遞增 _ALL_ORDERS_CACHE_VERSION。
+    
+    參數:
+    - strategy_class: 策略類別（需提供 generate_all_orders）
+    - params: 策略建構參數字典
+    - score_arr: 每日景氣燈號分數陣列（缺值為 NaN）
+    - dates: 與 score_arr 等長的交易日期序列
+    - signal_texts: 每日燈號文字序列（可選）
+    - cache_dir: 磁碟快取目錄（None 表示只使用記憶體快取）
+    
+    返回:
+    - 訂單列表（與快取共用，呼叫端不可修改）
+    """
+    key = _all_orders_cache_key(strategy_class, params, score_arr, dates, signal_texts)
+    
+    # 第一層：記憶體
+    orders = _ALL_ORDERS_CACHE.get(key)
+    if orders is not None:
+        _ALL_ORDERS_CACHE.move_to_end(key)
+        return orders
+    
+    # 第二層：磁碟
+    cache_path = os.path.join(cache_dir, f'{key}.pkl') if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            orders = pickle.load(f)
+    else:
+        orders = strategy_class(**params).generate_all_orders(score_arr, dates, signal_texts)
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            # 先寫入暫存檔再改名，避免平行行程讀到寫一半的檔案
+            tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(orders, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+    
+    _ALL_ORDERS_CACHE[key] = orders
+    if len(_ALL_ORDERS_CACHE) > _ALL_ORDERS_CACHE_SIZE:
+        _ALL_ORDERS_CACHE.popitem(last=False)
+    return orders
+
+
+def _all_orders_worker(strategy_class, params, score_arr, dates, signal_texts, cache_dir):
+    """跨策略回測的子行程工作函數：建立策略並產生整段回測訂單"""
+    if cache_dir:
+        return cached_all_orders(strategy_class, params, score_arr, dates, signal_texts, cache_dir)
+    return strategy_class(**params).generate_all_orders(score_arr, dates, signal_texts)
+
+
+def run_all_strategies(score_arr, dates, strategy_specs=None, signal_texts=None, max_workers=None,
+                       cache_dir=None):
+    """
+    以多行程平行產生多個策略的整段回測訂單（各策略的路徑相依只在自己的行程內）
+    
+    子行程使用 spawn 啟動，避免 fork 複製父行程的資料庫連線等狀態；
+    在 Windows 上呼叫端必須位於 if __name__ == '__main__': 區塊內。
+    
+    參數:
+    - score_arr: 每日景氣燈號分數陣列（缺值為 NaN）
+    - dates: 與 score_arr 等長的交易日期序列
+    - strategy_specs: [(策略類別, 建構參數字典), ...]（預設為短天期美債、現金、長天期美債、反向ETF 四個策略；
+      只接受不依賴持倉的 CycleStrategyNew 子類，其他類別會引發 TypeError）
+    - signal_texts: 每日燈號文字序列（可選）
+    - max_workers: 行程數（預設 os.cpu_count()）
+    - cache_dir: 磁碟快取目錄（可選，設定後已計算過的策略/資料組合直接讀取快取）
+    
+    返回:
+    - 訂單列表的列表，順序與 strategy_specs 相同
+    """
+    if strategy_specs is None:
+        strategy_specs = [
+            (ShortTermBondStrategyNew, {}),
+            (CashStrategyNew, {}),
+            (LongTermBondStrategyNew, {}),
+            (InverseETFStrategyNew, {}),
+        ]
+    if not strategy_specs:
+        return []
+    
+    # 在啟動子行程前檢查，避免不支援的策略在子行程內才失敗
+    unsupported = [
+        strategy_class.__name__ for strategy_class, _ in strategy_specs
+        if not issubclass(strategy_class, CycleStrategyNew) or strategy_class._REQUIRES_POSITIONS
+    ]
+    if unsupported:
+        raise TypeError(f"以下策略沒有整段批次計算路徑: {', '.join(unsupported)}")
+    
+    score_arr = np.asarray(score_arr, dtype=float)
+    n = len(strategy_specs)
+    max_workers = min(max_workers or os.cpu_count() or 1, n)
+    
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [
+            executor.submit(_all_orders_worker, strategy_class, params, score_arr, dates, signal_texts, cache_dir)
+            for strategy_class, params in strategy_specs
+        ]
+        return [future.result() for future in futures]
@@ -7,6 +7,7 @@ Orange 智能預測交易策略
 
 import os
 import sys
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 
@@ -21,6 +22,53 @@ except ImportError:
     ORANGE_LOADER_AVAILABLE = False
     OrangeModelLoader = None
 
+# Numba 為可選依賴，未安裝時 njit 不做事（函數以純 Python 執行）
+from utils._njit import njit
+
+
+# 已載入的模型（以檔案絕對路徑與修改時間為鍵）：參數掃描重複建立策略時不必重新讀取模型檔
+_LOADER_CACHE = {}
+
+
+def _get_model_loader(model_path):
+    """
+    取得模型載入器（同一個模型檔在行程內只載入一次）
+    
+    參數:
+    - model_path: Orange 模型文件路徑
+    
+    返回:
+    - OrangeModelLoader 實例（多個策略實例共用）
+    """
+    key = (os.path.abspath(model_path), os.path.getmtime(model_path))
+    loader = _LOADER_CACHE.get(key)
+    if loader is None:
+        loader = _LOADER_CACHE[key] = OrangeModelLoader(model_path)
+    return loader
+
+
+# row 中缺少欄位時 dict.get 的預設值（與值為 None/NaN 區分）
+_MISSING = object()
+
+# 均值回歸訂單交易步驟記錄的條件名稱（順序與 _signal_order 中的數值對應）
+_SIGNAL_CONDITION_NAMES = ('預測價格', '當前價格', '價格偏離度(%)', '預測波動率(%)', '倉位大小(%)')
+
+@njit(cache=True)
+def _stability_core(recent_predictions):
+    """
+    預測波動率核心計算
+    
+    參數:
+    - recent_predictions: 最近 N 天的預測價格（float64 陣列）
+    
+    返回:
+    - 波動率（標準差 / 平均值 %），平均值非正數時為 NaN
+    """
+    mean_prediction = np.mean(recent_predictions)
+    if mean_prediction <= 0:
+        return np.nan
+    return np.std(recent_predictions) / mean_prediction * 100
+
 
 class OrangePredictionStrategy:
     """
@@ -37,8 +85,17 @@ class OrangePredictionStrategy:
     如果 Orange 模型不可用，策略不會執行（返回空訂單列表）
     """
     
+    # 屬性固定，使用 __slots__ 減少每個實例的記憶體並加快屬性存取（參數掃描時會建立大量實例）
+    __slots__ = (
+        'stock_ticker', 'hedge_ticker', 'model_path', 'use_multi_model', 'model_price_ranges', 'verbose',
+        'model_loader', 'model_available', 'load_error', 'feature_names',
+        '_model_names', '_model_loaders_list', '_model_paths', '_model_mins', '_model_maxes', '_bucket_disjoint',
+        '_predict_cached', '_deviation_threshold_pct', '_buy_ratio', '_sell_ratio',
+        'stability_lookback_days', 'max_volatility_for_full_position'
+    )
+    
     def __init__(self, stock_ticker='006208', hedge_ticker=None, model_path=None, 
-                 use_multi_model=False, model_price_ranges=None):
+                 use_multi_model=False, model_price_ranges=None, verbose=False):
         """
         初始化 Orange 預測策略
         
@@ -50,14 +107,22 @@ class OrangePredictionStrategy:
         - use_multi_model: 是否使用多模型（根據價格範圍選擇，預設 False）
         - model_price_ranges: 多模型價格範圍配置（預設 None，會使用預設配置）
                             格式: [(min_price, max_price, model_path), ...]
+        - verbose: 是否輸出模型載入成功的訊息（預設 False；警告訊息一律輸出）
         """
         self.stock_ticker = stock_ticker
+        self.verbose = verbose
         self.hedge_ticker = None  # 已移除避險資產邏輯
         self.use_multi_model = use_multi_model
         
         # 載入 Orange 模型（可選）
         self.model_loader = None
-        self.model_loaders = {}  # 多模型載入器字典 {model_name: loader}
+        # 多模型以平行陣列保存（依價格下限排序）：名稱、載入器、模型路徑、價格下限與上限
+        self._model_names = []
+        self._model_loaders_list = []
+        self._model_paths = []
+        self._model_mins = np.empty(0, dtype=np.float64)
+        self._model_maxes = np.empty(0, dtype=np.float64)
+        self._bucket_disjoint = True  # 價格區間互不重疊時以二分搜尋選擇模型
         self.model_available = False
         self.load_error = None
         
@@ -79,19 +144,21 @@ class OrangePredictionStrategy:
                 self.model_available = False
                 
                 # 載入所有模型
+                model_mins = []
+                model_maxes = []
                 for min_price, max_price, model_path in self.model_price_ranges:
                     model_name = f"model_{min_price}_{max_price}"
                     try:
                         if os.path.exists(model_path):
-                            loader = OrangeModelLoader(model_path)
-                            self.model_loaders[model_name] = {
-                                'loader': loader,
-                                'min_price': min_price,
-                                'max_price': max_price,
-                                'path': model_path
-                            }
+                            loader = _get_model_loader(model_path)
+                            self._model_names.append(model_name)
+                            self._model_loaders_list.append(loader)
+                            self._model_paths.append(model_path)
+                            model_mins.append(min_price)
+                            model_maxes.append(max_price)
                             self.model_available = True
-                            print(f"[Orange] 成功載入模型 {model_name}: {model_path} (價格範圍: {min_price}-{max_price})")
+                            if verbose:
+                                print(f"[Orange] 成功載入模型 {model_name}: {model_path} (價格範圍: {min_price}-{max_price})")
                         else:
                             print(f"[Orange Warning] 模型文件不存在: {model_path}")
                     except Exception as e:
@@ -100,28 +167,33 @@ class OrangePredictionStrategy:
                 if not self.model_available:
                     self.load_error = "所有模型載入失敗"
                     print(f"[Orange Warning] 所有模型載入失敗")
-                else:
-                    print(f"[Orange] 成功載入 {len(self.model_loaders)} 個模型")
+                elif verbose:
+                    print(f"[Orange] 成功載入 {len(self._model_names)} 個模型")
+                
+                self._model_mins = np.array(model_mins, dtype=np.float64)
+                self._model_maxes = np.array(model_maxes, dtype=np.float64)
+                self._bucket_disjoint = bool(np.all(self._model_mins[1:] >= self._model_maxes[:-1]))
             else:
                 # 單一模型模式（原有邏輯）
                 if model_path is None:
                     model_path = 'orange_data_export/tree.pkcls'
                 self.model_path = model_path
                 
-            try:
-                if os.path.exists(self.model_path):
-                    self.model_loader = OrangeModelLoader(self.model_path)
-                    self.model_available = True
-                    self.load_error = None
-                    print(f"[Orange] 成功載入 Orange 模型: {self.model_path}")
-                else:
+                try:
+                    if os.path.exists(self.model_path):
+                        self.model_loader = _get_model_loader(self.model_path)
+                        self.model_available = True
+                        self.load_error = None
+                        if verbose:
+                            print(f"[Orange] 成功載入 Orange 模型: {self.model_path}")
+                    else:
+                        self.model_available = False
+                        self.load_error = f"模型文件不存在: {self.model_path}"
+                        print(f"[Orange Warning] 模型文件不存在: {self.model_path}")
+                except Exception as e:
                     self.model_available = False
-                    self.load_error = f"模型文件不存在: {self.model_path}"
-                    print(f"[Orange Warning] 模型文件不存在: {self.model_path}")
-            except Exception as e:
-                self.model_available = False
-                self.load_error = str(e)
-                print(f"[Orange Warning] 載入 Orange 模型失敗: {e}")
+                    self.load_error = str(e)
+                    print(f"[Orange Warning] 載入 Orange 模型失敗: {e}")
         else:
             self.model_available = False
             self.load_error = "Orange 模型載入器不可用"
@@ -134,6 +206,9 @@ class OrangePredictionStrategy:
             'lagging_全體金融機構放款與投資(10億元)'
         ]
         
+        # 預測快取（每個實例各自一份）：月資料特徵在連續多個交易日相同，不必重複呼叫模型
+        self._predict_cached = lru_cache(maxsize=4096)(self._predict_cached_impl)
+        
         # ==========================================
         # 【參數調整區】策略參數設定
         # ==========================================
@@ -173,6 +248,33 @@ class OrangePredictionStrategy:
         #    - 範例：設定為 1.5 時，波動率超過 1.5% 就開始降低倉位；設定為 3.0 時超過 3% 才降低
         self.max_volatility_for_full_position = 2.0
     
+    @property
+    def deviation_threshold_pct(self):
+        """價格偏離閾值（%）；設定時同時更新買進與賣出的價格比例"""
+        return self._deviation_threshold_pct
+    
+    @deviation_threshold_pct.setter
+    def deviation_threshold_pct(self, value):
+        self._deviation_threshold_pct = value
+        # 買進：當前價格 <= 預測價格 × _buy_ratio；賣出：當前價格 >= 預測價格 × _sell_ratio
+        self._buy_ratio = 1.0 - value / 100.0
+        self._sell_ratio = 1.0 + value / 100.0
+    
+    @property
+    def model_loaders(self):
+        """
+        多模型載入器字典（供診斷與相容舊程式使用，每次呼叫時由平行陣列組成）
+        
+        返回:
+        - {model_name: {'loader': loader, 'min_price': float, 'max_price': float, 'path': str}}
+        """
+        return {
+            name: {'loader': loader, 'min_price': min_price, 'max_price': max_price, 'path': path}
+            for name, loader, min_price, max_price, path in zip(
+                self._model_names, self._model_loaders_list, self._model_mins.tolist(),
+                self._model_maxes.tolist(), self._model_paths)
+        }
+    
     def _select_model_by_price(self, current_price):
         """
         根據當前價格選擇合適的模型
@@ -187,25 +289,31 @@ class OrangePredictionStrategy:
         if not self.use_multi_model:
             return self.model_loader, 'single_model'
         
-        if not self.model_available or not self.model_loaders:
+        if not self.model_available or not self._model_names:
+            return None, None
+        
+        # 區間互不重疊：二分搜尋第一個價格上限大於當前價格的模型，再確認價格不低於其下限
+        if self._bucket_disjoint:
+            idx = int(np.searchsorted(self._model_maxes, current_price, side='right'))
+            if idx < len(self._model_names) and self._model_mins[idx] <= current_price:
+                return self._model_loaders_list[idx], self._model_names[idx]
             return None, None
         
-        # 根據價格範圍選擇模型
-        for model_name, model_info in self.model_loaders.items():
-            min_price = model_info['min_price']
-            max_price = model_info['max_price']
-            if min_price <= current_price < max_price:
-                return model_info['loader'], model_name
+        # 區間有重疊：依價格下限順序選擇第一個符合的模型
+        for idx in range(len(self._model_names)):
+            if self._model_mins[idx] <= current_price < self._model_maxes[idx]:
+                return self._model_loaders_list[idx], self._model_names[idx]
         
         # 如果沒有找到合適的模型，返回 None
         return None, None
     
-    def _predict_price(self, row):
+    def _predict_price(self, row, state=None):
         """
         使用 Orange 模型預測收盤價
         
         參數:
         - row: 當天的資料行（包含所有指標）
+        - state: 策略狀態字典（可選）；提供時若模型與特徵值和前一次預測相同，直接沿用上次的預測價格
         
         返回:
         - dict: 包含預測結果和調試信息的字典
@@ -234,8 +342,9 @@ class OrangePredictionStrategy:
         
         # 獲取當前價格（用於選擇模型）
         current_price = None
-        if 'close' in row and pd.notna(row['close']):
-            current_price = float(row['close'])
+        close = row.get('close')
+        if close is not None and close == close:  # NaN 不等於自身
+            current_price = float(close)
         
         # 選擇模型
         if self.use_multi_model:
@@ -263,17 +372,16 @@ class OrangePredictionStrategy:
         feature_dict = {}
         missing_features = []
         for feature_name in self.feature_names:
-            if feature_name in row:
-                value = row[feature_name]
-                # 檢查是否為有效數值
-                if pd.notna(value):
-                    feature_dict[feature_name] = float(value)
-                else:
-                    # 特徵缺失，無法預測
-                    missing_features.append(f"{feature_name} (值為 NaN)")
-            else:
+            value = row.get(feature_name, _MISSING)  # 單次查詢同時判斷欄位是否存在
+            # 檢查是否為有效數值（NaN 不等於自身，比 pd.notna 的逐次型別判斷便宜）
+            if value is not None and value is not _MISSING and value == value:
+                feature_dict[feature_name] = float(value)
+            elif value is _MISSING:
                 # 特徵不存在，無法預測
                 missing_features.append(f"{feature_name} (欄位不存在)")
+            else:
+                # 特徵缺失，無法預測
+                missing_features.append(f"{feature_name} (值為 NaN)")
         
         result['missing_features'] = missing_features
         result['feature_values'] = feature_dict.copy()
@@ -284,13 +392,20 @@ class OrangePredictionStrategy:
             result['error_message'] = f"缺少特徵: {', '.join(missing_features)}"
             return result
         
-        # 轉換為 DataFrame
-        feature_df = pd.DataFrame([feature_dict])
+        # 特徵為月資料：與前一天相同時不必再查詢模型或快取
+        prediction_key = (model_loader, *feature_dict.values())
+        if state is not None and state.get('last_feature_tuple') == prediction_key:
+            result['predicted_price'] = state['last_predicted_price']
+            result['prediction_status'] = 'success'
+            return result
         
         try:
-            # 使用模型預測
-            predicted_price = model_loader.predict(feature_df)[0]
-            result['predicted_price'] = float(predicted_price)
+            # 使用模型預測（相同模型與特徵值直接取用快取結果）
+            predicted_price = self._predict_cached(*prediction_key)
+            if state is not None:
+                state['last_feature_tuple'] = prediction_key
+                state['last_predicted_price'] = predicted_price
+            result['predicted_price'] = predicted_price
             result['prediction_status'] = 'success'
             return result
         except Exception as e:
@@ -299,6 +414,20 @@ class OrangePredictionStrategy:
             result['error_message'] = str(e)
             return result
     
+    def _predict_cached_impl(self, model_loader, *feature_values):
+        """
+        以單筆特徵值呼叫模型預測收盤價（由 self._predict_cached 快取）
+        
+        參數:
+        - model_loader: 使用的模型載入器
+        - feature_values: 依 self.feature_names 順序排列的特徵值
+        
+        返回:
+        - 預測收盤價（float）
+        """
+        features = np.array([feature_values], dtype=np.float64)
+        return float(model_loader.predict_fast(features, self.feature_names)[0])
+    
     def _calculate_price_deviation(self, current_price, predicted_price):
         """
         計算當前價格相對於預測價格的偏離度
@@ -319,121 +448,57 @@ class OrangePredictionStrategy:
         deviation = ((current_price - predicted_price) / predicted_price) * 100
         return deviation
     
-    def _calculate_prediction_momentum(self, state, current_prediction):
+    def _prediction_ring_size(self):
+        """
+        預測歷史環形緩衝區的長度（子類別需要較長的歷史時覆寫）
+        
+        返回:
+        - 緩衝區長度（預設為穩定性回顧天數）
+        """
+        return self.stability_lookback_days
+    
+    def _push_prediction(self, state, predicted_price):
         """
-        計算預測動量（最近N天的預測價格變化趨勢）
+        將預測價格寫入狀態中的預測歷史環形緩衝區
+        
+        緩衝區為固定長度的 float64 陣列（首次呼叫時建立），
+        state['pred_idx'] 為下一個寫入位置的累計計數，state['pred_count'] 為目前保留的筆數。
         
         參數:
         - state: 策略狀態字典
-        - current_prediction: 當前預測價格
-        
-        返回:
-        - (momentum_direction, momentum_strength, momentum_confirmed)
-        - momentum_direction: 'up', 'down', 或 None
-        - momentum_strength: 動量強度（累積變化%）
-        - momentum_confirmed: 是否確認（連續N天同方向）
-        """
-        if current_prediction is None or current_prediction <= 0:
-            return None, 0.0, False
-        
-        # 初始化預測歷史
-        if 'prediction_history' not in state:
-            state['prediction_history'] = []
-        
-        prediction_history = state['prediction_history']
-        
-        # 添加當前預測到歷史
-        prediction_history.append(current_prediction)
-        
-        # 只保留最近需要的天數
-        max_history = max(self.momentum_lookback_days, self.stability_lookback_days)
-        if len(prediction_history) > max_history:
-            prediction_history = prediction_history[-max_history:]
-            state['prediction_history'] = prediction_history
-        
-        # 如果歷史數據不足，無法計算動量
-        if len(prediction_history) < self.momentum_lookback_days:
-            return None, 0.0, False
-        
-        # 計算最近N天的動量
-        recent_predictions = prediction_history[-self.momentum_lookback_days:]
-        start_price = recent_predictions[0]
-        end_price = recent_predictions[-1]
-        
-        # 計算累積變化率
-        momentum_strength = ((end_price - start_price) / start_price) * 100
-        
-        # 檢查方向是否一致（所有變化都是同方向）
-        direction_confirmed = True
-        direction = None
-        
-        for i in range(1, len(recent_predictions)):
-            change = recent_predictions[i] - recent_predictions[i-1]
-            if change > 0:
-                current_dir = 'up'
-            elif change < 0:
-                current_dir = 'down'
-            else:
-                current_dir = None
-            
-            if direction is None:
-                direction = current_dir
-            elif current_dir is not None and current_dir != direction:
-                direction_confirmed = False
-                break
-        
-        # 動量確認：方向一致且強度超過閾值
-        momentum_confirmed = (
-            direction_confirmed and 
-            direction is not None and 
-            abs(momentum_strength) >= self.momentum_threshold_pct
-        )
-        
-        return direction, momentum_strength, momentum_confirmed
+        - predicted_price: 預測價格
+        """
+        ring = state.get('pred_ring')
+        if ring is None:
+            ring = state['pred_ring'] = np.zeros(self._prediction_ring_size(), dtype=np.float64)
+            state['pred_idx'] = 0
+            state['pred_count'] = 0
+        
+        ring[state['pred_idx'] % len(ring)] = predicted_price
+        state['pred_idx'] += 1
+        state['pred_count'] = min(state['pred_count'] + 1, len(ring))
     
-    def _check_momentum_signal(self, state, current_prediction):
+    def _recent_predictions(self, state, n):
         """
-        檢查動量信號（雙重確認：連續N天確認）
+        依時間順序取出最近 n 筆預測價格
         
         參數:
         - state: 策略狀態字典
-        - current_prediction: 當前預測價格
+        - n: 筆數
         
         返回:
-        - (signal, direction, strength)
-        - signal: 'buy', 'sell', 或 None
-        - direction: 'up' 或 'down'
-        - strength: 動量強度
-        """
-        direction, strength, confirmed = self._calculate_prediction_momentum(state, current_prediction)
-        
-        if not confirmed:
-            # 重置確認計數器
-            state['momentum_confirmation'] = 0
-            return None, None, 0.0
-        
-        # 更新確認計數器
-        if 'momentum_confirmation' not in state:
-            state['momentum_confirmation'] = 0
-        if 'last_momentum_direction' not in state:
-            state['last_momentum_direction'] = None
-        
-        # 如果方向改變，重置計數器
-        if state['last_momentum_direction'] != direction:
-            state['momentum_confirmation'] = 1
-            state['last_momentum_direction'] = direction
-        else:
-            # 方向相同，增加計數
-            state['momentum_confirmation'] += 1
-        
-        # 需要連續N天確認才產生信號
-        if state['momentum_confirmation'] >= self.momentum_lookback_days:
-            if direction == 'up':
-                return 'buy', direction, strength
-            elif direction == 'down':
-                return 'sell', direction, strength
-        
-        return None, direction, strength
+        - float64 陣列（未跨越緩衝區尾端時為不複製的視圖），歷史不足 n 筆時返回 None
+        """
+        if state.get('pred_count', 0) < n:
+            return None
+        if n == 0:
+            return np.empty(0, dtype=np.float64)
+        
+        ring = state['pred_ring']
+        end = (state['pred_idx'] - 1) % len(ring) + 1  # 最新一筆之後的位置（1 ~ 緩衝區長度）
+        if end >= n:
+            return ring[end - n:end]
+        return np.concatenate((ring[len(ring) - (n - end):], ring[:end]))
     
     def _calculate_prediction_stability(self, state):
         """
@@ -445,27 +510,16 @@ class OrangePredictionStrategy:
         返回:
         - 波動率（標準差%），數值越大表示預測越不穩定
         """
-        if 'prediction_history' not in state:
+        # 使用最近的N天數據計算標準差（歷史不足時無法計算）
+        recent_predictions = self._recent_predictions(state, self.stability_lookback_days)
+        if recent_predictions is None:
             return None
         
-        prediction_history = state['prediction_history']
+        volatility_pct = _stability_core(recent_predictions)
         
-        if len(prediction_history) < self.stability_lookback_days:
+        if np.isnan(volatility_pct):
             return None
         
-        # 使用最近的N天數據
-        recent_predictions = prediction_history[-self.stability_lookback_days:]
-        
-        # 計算標準差
-        predictions_array = np.array(recent_predictions)
-        mean_prediction = np.mean(predictions_array)
-        
-        if mean_prediction <= 0:
-            return None
-        
-        std_dev = np.std(predictions_array)
-        volatility_pct = (std_dev / mean_prediction) * 100
-        
         return volatility_pct
     
     def _calculate_position_size(self, prediction_stability):
@@ -482,23 +536,21 @@ class OrangePredictionStrategy:
             # 如果無法計算穩定性，使用全倉
             return 1.0
         
-        # 如果波動率低於閾值，使用全倉
-        if prediction_stability <= self.max_volatility_for_full_position:
-            return 1.0
-        
         # 根據波動率調整倉位（波動率越高，倉位越小）
         # 線性遞減：波動率 2% = 100%倉位，波動率 10% = 20%倉位
         # 參數說明：max_volatility - 當波動率達到此值時使用最小倉位（20%）
         #           調整建議：可根據風險承受度調整（建議範圍：8.0-12.0）
         max_volatility = 10.0
-        if prediction_stability >= max_volatility:
-            return 0.2
+        full_volatility = self.max_volatility_for_full_position
+        if full_volatility >= max_volatility:
+            # 兩個門檻重疊時沒有線性區間
+            return 1.0 if prediction_stability <= full_volatility else 0.2
         
-        # 線性插值
-        position_size = 1.0 - ((prediction_stability - self.max_volatility_for_full_position) / 
-                               (max_volatility - self.max_volatility_for_full_position)) * 0.8
+        # 線性插值後夾在 [0.2, 1.0]：低於全倉門檻時為 1.0，達到 max_volatility 時為 0.2
+        position_size = 1.0 - ((prediction_stability - full_volatility) /
+                               (max_volatility - full_volatility)) * 0.8
         
-        return max(0.2, position_size)
+        return min(1.0, max(0.2, position_size))
     
     def _create_trade_step(self, reason, additional_conditions=None):
         """
@@ -521,6 +573,42 @@ class OrangePredictionStrategy:
             'conditions': conditions
         }
     
+    def _signal_order(self, action, predicted_price, current_price, deviation, prediction_stability, position_size,
+                      record_trade_step=True):
+        """
+        建立均值回歸買進或賣出訂單（逐日與批次回測共用）
+        
+        參數:
+        - action: 'buy' 或 'sell'
+        - predicted_price: 預測收盤價
+        - current_price: 當前收盤價
+        - deviation: 價格偏離度（%）
+        - prediction_stability: 預測波動率（%），無法計算時為 None
+        - position_size: 倉位大小（0.0 到 1.0）
+        - record_trade_step: 是否建立交易步驟記錄（False 時訂單的 trade_step 為 None，引擎顯示為未知原因）
+        
+        返回:
+        - 訂單字典
+        """
+        trade_step = None
+        if record_trade_step:
+            reason = 'Orange均值回歸買進' if action == 'buy' else 'Orange均值回歸賣出'
+            values = (predicted_price, current_price, deviation,
+                      prediction_stability if prediction_stability else 0, position_size * 100)
+            trade_step = self._create_trade_step(reason, [
+                {'name': name, 'value': value} for name, value in zip(_SIGNAL_CONDITION_NAMES, values)
+            ])
+        return {
+            'action': action,
+            'ticker': self.stock_ticker,
+            'percent': position_size,
+            'trade_step': trade_step,
+            'predicted_price': predicted_price,
+            'current_price': current_price,
+            'deviation_pct': deviation,
+            'position_size': position_size
+        }
+    
     def generate_orders(self, state, date, row, price_dict, positions=None, portfolio_value=None):
         """
         基於 Orange 預測的純均值回歸策略產生交易訂單
@@ -536,7 +624,7 @@ class OrangePredictionStrategy:
         - 賣出：當前價格 > 預測價格 × (1 + 閾值%) 且已持有
         
         參數:
-        - state: 策略狀態字典
+        - state: 策略狀態字典（state['record_trade_steps'] 為 False 時訂單不附交易步驟記錄）
         - date: 交易日期
         - row: 當天的資料行（包含所有指標，已對齊）
         - price_dict: 價格字典 {ticker: close}
@@ -552,14 +640,15 @@ class OrangePredictionStrategy:
         if not self.model_available:
             return orders
         
-        # 獲取當前價格
-        if 'close' not in row or pd.isna(row['close']) or row['close'] <= 0:
+        # 獲取當前價格（缺值、NaN 或非正數皆不交易）
+        close = row.get('close')
+        if close is None or not close > 0:
             return orders
         
-        current_price = float(row['close'])
+        current_price = float(close)
         
         # 使用 Orange 模型預測收盤價
-        prediction_result = self._predict_price(row)
+        prediction_result = self._predict_price(row, state)
         predicted_price = prediction_result.get('predicted_price')
         
         # 保存預測結果到狀態（包含調試信息）
@@ -572,73 +661,144 @@ class OrangePredictionStrategy:
             'selected_model': prediction_result.get('selected_model')  # 多模型模式下顯示選中的模型
         }
         
-        if predicted_price is None:
-            # 預測失敗，不執行交易
+        if predicted_price is None or predicted_price <= 0:
+            # 預測失敗或預測價格無效，不執行交易
             return orders
         
-        # 計算價格偏離度
-        deviation = self._calculate_price_deviation(current_price, predicted_price)
+        # 更新預測歷史（用於計算穩定性）
+        self._push_prediction(state, predicted_price)
         
-        if deviation is None:
+        # 檢查是否持有股票
+        is_holding = state.get('state', False)
+        
+        # 買進條件：當前價格 <= 預測價格 × (1 - 閾值%) 且未持有
+        if not is_holding and current_price <= predicted_price * self._buy_ratio:
+            action = 'buy'
+        # 賣出條件：當前價格 >= 預測價格 × (1 + 閾值%) 且已持有
+        elif is_holding and current_price >= predicted_price * self._sell_ratio:
+            action = 'sell'
+        else:
             return orders
         
-        # 更新預測歷史（用於計算穩定性）
-        if 'prediction_history' not in state:
-            state['prediction_history'] = []
-        prediction_history = state['prediction_history']
-        prediction_history.append(predicted_price)
-        # 只保留最近需要的天數
-        if len(prediction_history) > self.stability_lookback_days:
-            prediction_history = prediction_history[-self.stability_lookback_days:]
-            state['prediction_history'] = prediction_history
-        
-        # 計算預測穩定性（用於風險調整）
+        # 只有觸發交易時才計算偏離度與預測穩定性（用於風險調整與交易記錄）
+        deviation = self._calculate_price_deviation(current_price, predicted_price)
         prediction_stability = self._calculate_prediction_stability(state)
         position_size = self._calculate_position_size(prediction_stability)
         
-        # 檢查是否持有股票
-        is_holding = state.get('state', False)
+        orders.append(self._signal_order(action, predicted_price, current_price, deviation,
+                                         prediction_stability, position_size,
+                                         state.get('record_trade_steps', True)))
+        state['state'] = action == 'buy'
         
-        # 買進條件：當前價格低於預測 >= 閾值 且未持有
-        if deviation <= -self.deviation_threshold_pct and not is_holding:
-            trade_step = self._create_trade_step('Orange均值回歸買進', [
-                {'name': '預測價格', 'value': predicted_price},
-                {'name': '當前價格', 'value': current_price},
-                {'name': '價格偏離度(%)', 'value': deviation},
-                {'name': '預測波動率(%)', 'value': prediction_stability if prediction_stability else 0},
-                {'name': '倉位大小(%)', 'value': position_size * 100}
-            ])
-            orders.append({
-                'action': 'buy',
-                'ticker': self.stock_ticker,
-                'percent': position_size,
-                'trade_step': trade_step,
-                'predicted_price': predicted_price,
-                'current_price': current_price,
-                'deviation_pct': deviation,
-                'position_size': position_size
-            })
-            state['state'] = True
-        
-        # 賣出條件：當前價格高於預測 >= 閾值 且已持有
-        elif deviation >= self.deviation_threshold_pct and is_holding:
-            trade_step = self._create_trade_step('Orange均值回歸賣出', [
-                {'name': '預測價格', 'value': predicted_price},
-                {'name': '當前價格', 'value': current_price},
-                {'name': '價格偏離度(%)', 'value': deviation},
-                {'name': '預測波動率(%)', 'value': prediction_stability if prediction_stability else 0},
-                {'name': '倉位大小(%)', 'value': position_size * 100}
-            ])
-            orders.append({
-                'action': 'sell',
-                'ticker': self.stock_ticker,
-                'percent': position_size,
-                'trade_step': trade_step,
-                'predicted_price': predicted_price,
-                'current_price': current_price,
-                'deviation_pct': deviation,
-                'position_size': position_size
-            })
-            state['state'] = False
+        return orders
+    
+    def _predict_batch(self, closes, feats):
+        """
+        以整段特徵矩陣批次預測收盤價（每個模型只呼叫一次 predict）
+        
+        參數:
+        - closes: 每日收盤價陣列（多模型模式依此選擇模型）
+        - feats: 特徵矩陣，形狀為 [n, len(self.feature_names)]
+        
+        返回:
+        - 預測價格陣列，無法預測的日期為 NaN
+        """
+        predicted = np.full(len(feats), np.nan)
+        row_valid = ~np.isnan(feats).any(axis=1)
+        
+        # 依模型分組：多模型模式與逐日選擇相同，取第一個價格範圍符合的模型
+        groups = []
+        if self.use_multi_model and self._bucket_disjoint:
+            # 區間互不重疊：整段收盤價一次二分搜尋出模型編號，每個有資料的模型只預測一次
+            bucket_idx = np.searchsorted(self._model_maxes, closes, side='right')
+            in_range = bucket_idx < len(self._model_names)
+            in_range[in_range] &= self._model_mins[bucket_idx[in_range]] <= closes[in_range]
+            for b in np.unique(bucket_idx[row_valid & in_range]).tolist():
+                groups.append((self._model_loaders_list[b], row_valid & in_range & (bucket_idx == b)))
+        elif self.use_multi_model:
+            unassigned = row_valid.copy()
+            for idx, loader in enumerate(self._model_loaders_list):
+                mask = unassigned & (closes >= self._model_mins[idx]) & (closes < self._model_maxes[idx])
+                unassigned &= ~mask
+                groups.append((loader, mask))
+        elif self.model_loader is not None:
+            groups.append((self.model_loader, row_valid))
+        
+        for model_loader, mask in groups:
+            if not mask.any():
+                continue
+            try:
+                predicted[mask] = model_loader.predict_fast(feats[mask], self.feature_names)
+            except Exception:
+                # 整批預測失敗時逐筆重試，只讓出錯的日期缺少預測值
+                for i in np.flatnonzero(mask):
+                    try:
+                        predicted[i] = model_loader.predict_fast(feats[i:i + 1], self.feature_names)[0]
+                    except Exception:
+                        pass
+        
+        return predicted
+    
+    def generate_orders_batch(self, df, record_trade_steps=True):
+        """
+        一次產生整段回測的訂單（不逐日呼叫 generate_orders）
+        
+        預測、偏離度與預測穩定性皆以向量計算，只有觸發買賣條件的日期
+        才依序檢查持有狀態並建立訂單，因此訂單內容與逐日執行時相同。
+        
+        參數:
+        - df: 每日資料（需包含 'close' 與 self.feature_names 欄位，'date' 欄位可選）
+        - record_trade_steps: 是否為訂單建立交易步驟記錄（預設 True）
+        
+        返回:
+        - 訂單列表，每筆訂單額外帶有 'date' 欄位
+        """
+        if not self.model_available or len(df) == 0:
+            return []
+        
+        dates = df['date'].tolist() if 'date' in df.columns else df.index.tolist()
+        closes = pd.to_numeric(df['close'], errors='coerce').to_numpy(dtype=np.float64)
+        feats = df.reindex(columns=self.feature_names).to_numpy(dtype=np.float64)
+        
+        predicted = self._predict_batch(closes, feats)
+        
+        # 只有價格與預測皆為正值的日期才計入預測歷史（與逐日執行相同）
+        usable = np.flatnonzero((closes > 0) & (predicted > 0))
+        if len(usable) == 0:
+            return []
+        history = predicted[usable]
+        usable_closes = closes[usable]
+        
+        # 以價格比例直接比較（不經過百分比偏離度）
+        buy_signal = usable_closes <= history * self._buy_ratio
+        sell_signal = usable_closes >= history * self._sell_ratio
+        signal_pos = np.flatnonzero(buy_signal | sell_signal)
+        
+        lookback = self.stability_lookback_days
+        orders = []
+        is_holding = False
+        for k in signal_pos.tolist():
+            if buy_signal[k] and not is_holding:
+                action = 'buy'
+            elif sell_signal[k] and is_holding:
+                action = 'sell'
+            else:
+                continue
+            
+            # 只有觸發交易的日期才計算偏離度與預測穩定性（最近 N 筆預測的標準差 / 平均值）
+            predicted_price = history[k].item()
+            current_price = usable_closes[k].item()
+            deviation = self._calculate_price_deviation(current_price, predicted_price)
+            prediction_stability = None
+            if k >= lookback - 1:
+                volatility_pct = _stability_core(history[k - lookback + 1:k + 1])
+                prediction_stability = None if np.isnan(volatility_pct) else volatility_pct
+            position_size = self._calculate_position_size(prediction_stability)
+            day = usable[k]
+            order = self._signal_order(action, predicted_price, current_price, deviation,
+                                       prediction_stability, position_size, record_trade_steps)
+            order['date'] = dates[day]
+            orders.append(order)
+            is_holding = action == 'buy'
         
         return orders
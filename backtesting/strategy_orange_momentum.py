@@ -0,0 +1,164 @@
+"""
+[Orange 相關功能] Orange 預測動量策略
+
+在 Orange 均值回歸策略之上提供預測動量計算（最近 N 天預測價格的變化方向與強度），
+供診斷腳本分析預測趨勢使用
+"""
+
+import os
+import sys
+import numpy as np
+
+# 添加專案根目錄到路徑
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtesting.strategy_orange import OrangePredictionStrategy, njit
+
+
+# 預測動量方向代碼（_momentum_core 使用）
+_MOMENTUM_DIRECTIONS = {1: 'up', -1: 'down', 0: None}
+
+
+@njit(cache=True)
+def _momentum_core(recent_predictions, threshold_pct):
+    """
+    預測動量核心計算
+    
+    參數:
+    - recent_predictions: 最近 N 天的預測價格（float64 陣列）
+    - threshold_pct: 動量確認所需的最小累積變化（%）
+    
+    返回:
+    - (direction, strength, confirmed)：direction 為 1（上升）、-1（下降）或 0（無方向）
+    """
+    start_price = recent_predictions[0]
+    strength = (recent_predictions[-1] - start_price) / start_price * 100
+    
+    # 檢查方向是否一致（持平的日子不影響方向）
+    direction = 0
+    direction_confirmed = True
+    for i in range(1, len(recent_predictions)):
+        change = recent_predictions[i] - recent_predictions[i - 1]
+        if change > 0:
+            current_dir = 1
+        elif change < 0:
+            current_dir = -1
+        else:
+            current_dir = 0
+        
+        if direction == 0:
+            direction = current_dir
+        elif current_dir != 0 and current_dir != direction:
+            direction_confirmed = False
+            break
+    
+    confirmed = direction_confirmed and direction != 0 and abs(strength) >= threshold_pct
+    return direction, strength, confirmed
+
+
+class OrangeMomentumStrategy(OrangePredictionStrategy):
+    """
+    [Orange 相關功能] Orange 預測動量策略
+    
+    交易邏輯與 OrangePredictionStrategy 相同，另外提供預測動量與動量信號的計算：
+    - 動量方向：最近 N 天預測價格的變化方向（持平的日子不影響方向）
+    - 動量確認：方向一致且累積變化超過閾值，並連續 N 天確認
+    """
+    
+    __slots__ = ('momentum_lookback_days', 'momentum_threshold_pct')
+    
+    def __init__(self, *args, **kwargs):
+        """
+        初始化 Orange 預測動量策略（參數同 OrangePredictionStrategy）
+        """
+        super().__init__(*args, **kwargs)
+        
+        # 動量確認天數：計算動量時使用的預測天數，也是產生信號前需要連續確認的天數
+        self.momentum_lookback_days = 5
+        
+        # 動量閾值（%）：最近 N 天預測價格的累積變化至少需達到此值才確認動量
+        self.momentum_threshold_pct = 1.0
+    
+    def _prediction_ring_size(self):
+        """
+        預測歷史環形緩衝區的長度：同時滿足穩定性與動量計算所需的歷史天數
+        
+        返回:
+        - 緩衝區長度
+        """
+        return max(self.stability_lookback_days, self.momentum_lookback_days)
+    
+    def _calculate_prediction_momentum(self, state, current_prediction):
+        """
+        計算預測動量（最近N天的預測價格變化趨勢）
+        
+        參數:
+        - state: 策略狀態字典
+        - current_prediction: 當前預測價格
+        
+        返回:
+        - (momentum_direction, momentum_strength, momentum_confirmed)
+        - momentum_direction: 'up', 'down', 或 None
+        - momentum_strength: 動量強度（累積變化%）
+        - momentum_confirmed: 是否確認（連續N天同方向）
+        """
+        if current_prediction is None or current_prediction <= 0:
+            return None, 0.0, False
+        
+        # 預測歷史只由 generate_orders 寫入：這裡以歷史中最近 N-1 筆加上當前預測計算，
+        # 不再寫入歷史，避免同一天的預測被加入兩次
+        previous_predictions = self._recent_predictions(state, self.momentum_lookback_days - 1)
+        if previous_predictions is None:
+            # 如果歷史數據不足，無法計算動量
+            return None, 0.0, False
+        recent_predictions = np.append(previous_predictions, current_prediction)
+        
+        # 計算最近N天的動量（累積變化率與方向一致性）
+        direction, momentum_strength, momentum_confirmed = _momentum_core(
+            recent_predictions, self.momentum_threshold_pct)
+        
+        return _MOMENTUM_DIRECTIONS[direction], momentum_strength, momentum_confirmed
+    
+    def _check_momentum_signal(self, state, current_prediction):
+        """
+        檢查動量信號（雙重確認：連續N天確認）
+        
+        參數:
+        - state: 策略狀態字典
+        - current_prediction: 當前預測價格
+        
+        返回:
+        - (signal, direction, strength)
+        - signal: 'buy', 'sell', 或 None
+        - direction: 'up' 或 'down'
+        - strength: 動量強度
+        """
+        direction, strength, confirmed = self._calculate_prediction_momentum(state, current_prediction)
+        
+        if not confirmed:
+            # 重置確認計數器
+            state['momentum_confirmation'] = 0
+            return None, None, 0.0
+        
+        # 更新確認計數器
+        if 'momentum_confirmation' not in state:
+            state['momentum_confirmation'] = 0
+        if 'last_momentum_direction' not in state:
+            state['last_momentum_direction'] = None
+        
+        # 如果方向改變，重置計數器
+        if state['last_momentum_direction'] != direction:
+            state['momentum_confirmation'] = 1
+            state['last_momentum_direction'] = direction
+        else:
+            # 方向相同，增加計數
+            state['momentum_confirmation'] += 1
+        
+        # 需要連續N天確認才產生信號
+        if state['momentum_confirmation'] >= self.momentum_lookback_days:
+            if direction == 'up':
+                return 'buy', direction, strength
+            elif direction == 'down':
+                return 'sell', direction, strength
+        
+        return None, direction, strength
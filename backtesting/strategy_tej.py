@@ -5,12 +5,19 @@ TEJ 台灣經濟新報對照組策略
 """
 
 from datetime import date
+import numpy as np
 import pandas as pd
 
 
+# 非交易日共用的空結果（不可變，避免每日配置新的空列表）
+_EMPTY_ORDERS = ()
+
+
 class TEJStrategy:
     """TEJ 策略：基於固定日期的買賣"""
     
+    __slots__ = ('stock_ticker', 'hedge_ticker', 'trade_dates', '_trade_dates_ts', '_trade_dates_arr')
+    
     def __init__(self, stock_ticker='006208', hedge_ticker='00865B'):
         """
         初始化策略
@@ -49,6 +56,10 @@ class TEJStrategy:
                 'reason': '紅燈賣出並買入債券避險'
             }
         }
+        
+        # 以正規化後的 Timestamp 為鍵的交易日期表，每日查詢不必再轉換日期型別
+        self._trade_dates_ts = {pd.Timestamp(d): info for d, info in self.trade_dates.items()}
+        self._trade_dates_arr = np.array(sorted(self._trade_dates_ts), dtype='datetime64[ns]')
     
     def _create_trade_step(self, reason, score):
         """
@@ -81,25 +92,23 @@ class TEJStrategy:
         - portfolio_value: 當前投資組合總價值（可選）
         
         返回:
-        - 訂單列表
+        - 訂單列表（非交易日為空的 tuple）
         """
-        orders = []
-        
-        # 將 date 轉換為 date 對象（如果它是 datetime 或其他格式）
-        if hasattr(date, 'date'):
-            trade_date = date.date()
-        elif isinstance(date, str):
-            trade_date = pd.to_datetime(date).date()
-        else:
-            trade_date = date
+        # 將 date 轉換為正規化的 Timestamp（引擎傳入的通常已是 Timestamp）
+        trade_ts = date if isinstance(date, pd.Timestamp) else pd.Timestamp(date)
+        if trade_ts.tzinfo is not None:
+            trade_ts = trade_ts.tz_localize(None)
         
-        # 檢查是否為交易日期
-        if trade_date not in self.trade_dates:
-            return orders
+        # 檢查是否為交易日期（非交易日直接回傳共用的空結果，不讀取 row）
+        trade_info = self._trade_dates_ts.get(trade_ts.normalize())
+        if trade_info is None:
+            return _EMPTY_ORDERS
         
-        trade_info = self.trade_dates[trade_date]
+        orders = []
         score = trade_info['score']
         reason = trade_info['reason']
+        stock_action = trade_info['stock_action']
+        hedge_action = trade_info['hedge_action']
         
         # 取得燈號分數和文字（用於交易記錄）
         signal_score = row.get('signal_景氣對策信號綜合分數', score)
@@ -109,7 +118,7 @@ class TEJStrategy:
         # 這樣可以確保在同一天需要同時買賣時，先有現金再買進
         
         # 1. 處理債券賣出（如果有的話）
-        if trade_info['hedge_action'] == 'sell':
+        if hedge_action == 'sell':
             if self.hedge_ticker and self.hedge_ticker in price_dict:
                 hedge_trade_step = self._create_trade_step('賣出債券', score)
                 orders.append({
@@ -122,21 +131,21 @@ class TEJStrategy:
                 })
         
         # 2. 處理股票賣出（如果有的話）
-        if trade_info['stock_action'] == 'sell':
+        if stock_action == 'sell':
             if self.stock_ticker in price_dict:
                 trade_step = self._create_trade_step(reason, score)
                 hedge_trade_step = None
                 
                 # 如果需要同時買進債券
-                if trade_info['hedge_action'] == 'buy':
+                if hedge_action == 'buy':
                     hedge_trade_step = self._create_trade_step('買入債券避險', score)
                 
                 orders.append({
                     'action': 'sell',
                     'ticker': self.stock_ticker,
                     'percent': 1.0,  # 100% 賣出
-                    'trigger_hedge_buy': trade_info['hedge_action'] == 'buy',
-                    'hedge_ticker': self.hedge_ticker if trade_info['hedge_action'] == 'buy' else None,
+                    'trigger_hedge_buy': hedge_action == 'buy',
+                    'hedge_ticker': self.hedge_ticker if hedge_action == 'buy' else None,
                     'trade_step': trade_step,
                     'hedge_trade_step': hedge_trade_step,
                     'signal_score': signal_score,
@@ -144,7 +153,7 @@ class TEJStrategy:
                 })
         
         # 3. 處理股票買進（在賣出之後，確保有現金）
-        if trade_info['stock_action'] == 'buy':
+        if stock_action == 'buy':
             if self.stock_ticker in price_dict:
                 trade_step = self._create_trade_step(reason, score)
                 orders.append({
@@ -157,4 +166,45 @@ class TEJStrategy:
                 })
         
         return orders
-
+    
+    def generate_orders_batch(self, df):
+        """
+        一次產生整段回測的訂單（不逐日呼叫 generate_orders）
+        
+        以 np.isin 一次找出落在固定交易日期的資料列，只有這些日期才建立
+        價格字典並產生訂單，因此訂單內容與逐日執行時相同。
+        
+        參數:
+        - df: 每日資料（需包含 'date'、'ticker'、'close' 欄位，同一日期可有多個 ticker）
+        
+        返回:
+        - 訂單列表，每筆訂單額外帶有 'date' 欄位
+        """
+        if len(df) == 0:
+            return []
+        
+        dates = pd.to_datetime(df['date'])
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        day_values = dates.dt.normalize().to_numpy()
+        hits = np.isin(day_values, self._trade_dates_arr)
+        
+        orders = []
+        for trade_day in np.unique(day_values[hits]):
+            day_rows = df[day_values == trade_day]
+            
+            # 建立價格字典（與回測引擎相同，只保留有效價格）
+            price_dict = {}
+            for ticker, close in zip(day_rows['ticker'].tolist(), day_rows['close'].tolist()):
+                if pd.notna(close) and close > 0:
+                    price_dict[ticker] = close
+            if not price_dict:
+                continue
+            
+            trade_date = day_rows['date'].iloc[0]
+            row = day_rows.iloc[0].to_dict()
+            for order in self.generate_orders({}, pd.Timestamp(trade_day), row, price_dict):
+                order['date'] = trade_date
+                orders.append(order)
+        
+        return orders
@@ -3,15 +3,40 @@
 從 CSV 檔案讀取景氣指標資料，將月資料轉換為交易日資料
 """
 
+import numpy as np
 import pandas as pd
 import pandas_market_calendars as pmc
 from datetime import datetime, timedelta
+from functools import lru_cache
 import os
 
 
+@lru_cache(maxsize=1)
+def _get_xtai_calendar():
+    """取得台灣交易日曆（建立成本高，整個程序共用一份）"""
+    return pmc.get_calendar('XTAI')
+
+
+@lru_cache(maxsize=8)
+def _get_trading_days(start_date, end_date):
+    """
+    取得日期範圍內的台灣交易日（相同範圍重複查詢時直接取用快取）
+    
+    參數:
+    - start_date: 起始日期（pd.Timestamp）
+    - end_date: 結束日期（pd.Timestamp）
+    
+    回傳:
+    - DatetimeIndex
+    """
+    return _get_xtai_calendar().valid_days(start_date=start_date, end_date=end_date)
+
+
 class CycleDataCollector:
     """景氣燈號資料讀取器"""
     
+    __slots__ = ('csv_path', 'monthly_data', 'daily_data', '_date_values', '_score_values')
+    
     def __init__(self, csv_path='business_cycle/景氣指標與燈號.csv'):
         """
         初始化景氣燈號資料讀取器
@@ -22,6 +47,9 @@ class CycleDataCollector:
         self.csv_path = csv_path
         self.monthly_data = None
         self.daily_data = None
+        # 依日期排序的交易日（不含時區）與對應分數，供 get_cycle_score_by_date 二分搜尋
+        self._date_values = None
+        self._score_values = None
     
     def load_cycle_data_from_csv(self):
         """
@@ -63,22 +91,16 @@ class CycleDataCollector:
         if 'Date' not in df.columns or '景氣對策信號綜合分數' not in df.columns:
             raise ValueError("CSV 檔案缺少必要欄位")
         
-        # 建立新的 DataFrame
+        # 建立新的 DataFrame（date 從 YYYYMM 格式轉換為日期，score 的 '-' 等非數值轉為 NaN）
         result_df = pd.DataFrame({
-            'date': df['Date'],
+            'date': pd.to_datetime(df['Date'], format='%Y%m', errors='coerce'),
             'score': pd.to_numeric(df['景氣對策信號綜合分數'], errors='coerce'),
             'signal': df['景氣對策信號'].str.strip() if '景氣對策信號' in df.columns else None
         })
         
-        # 移除 score 為 NaN 或 '-' 的資料
-        result_df = result_df[result_df['score'].notna()]
-        result_df = result_df[result_df['score'] != '-']
-        
-        # 將 date 從 YYYYMM 格式轉換為日期
-        result_df['date'] = pd.to_datetime(result_df['date'], format='%Y%m', errors='coerce')
-        result_df = result_df[result_df['date'].notna()]
-        
-        result_df = result_df.sort_values('date').reset_index(drop=True)
+        # 一次移除 score 或 date 無效的資料
+        valid = result_df['score'].notna() & result_df['date'].notna()
+        result_df = result_df[valid].sort_values('date').reset_index(drop=True)
         
         self.monthly_data = result_df
         print(f"[Info] 成功讀取 {len(result_df)} 筆月資料")
@@ -99,9 +121,6 @@ class CycleDataCollector:
         if self.monthly_data is None:
             raise ValueError("請先呼叫 load_cycle_data_from_csv() 讀取資料")
         
-        # 取得台灣交易日曆
-        cal = pmc.get_calendar('XTAI')
-        
         # 確定日期範圍：如果不提供，使用資料的完整日期範圍
         if start_date is None:
             start_date = self.monthly_data['date'].min()
@@ -119,66 +138,43 @@ class CycleDataCollector:
                 end_date = pd.Timestamp(end_date)
         
         # 取得交易日列表
-        trading_days = cal.valid_days(start_date=start_date, end_date=end_date)
-        trading_days = [pd.Timestamp(day).normalize() for day in trading_days]
+        trading_days = _get_trading_days(start_date, end_date).normalize()
         
         print(f"[Info] 取得 {len(trading_days)} 個交易日（{start_date.date()} 至 {end_date.date()}）")
         
         # 建立每日資料 DataFrame
-        daily_records = []
-        
-        for trading_day in trading_days:
-            # 找到該交易日應該使用的月份資料（前一個月）
-            # 因為N月的資料在N+1月27日才發布，所以在N+1月的交易日應該使用N月的資料
-            prev_month = trading_day - pd.DateOffset(months=1)
-            prev_month_year = prev_month.year
-            prev_month_month = prev_month.month
-            
-            # 找到前一個月的資料
-            month_data = self.monthly_data[
-                (self.monthly_data['date'].dt.year == prev_month_year) &
-                (self.monthly_data['date'].dt.month == prev_month_month)
-            ]
-            
-            if not month_data.empty:
-                # 使用前一個月的資料
-                month_row = month_data.iloc[0]
-                # 計算發布日期（該月+1個月的27日）
-                publish_date = pd.Timestamp(prev_month_year, prev_month_month, 27) + pd.DateOffset(months=1)
-                # 資料所屬年月
-                data_year = prev_month_year
-                data_month = prev_month_month
-                
-                daily_records.append({
-                    'date': trading_day,
-                    'score': month_row['score'],
-                    'signal': month_row.get('signal', None),
-                    'publish_date': publish_date,  # 發布日期
-                    'data_year': data_year,  # 資料所屬年份
-                    'data_month': data_month  # 資料所屬月份
-                })
-            else:
-                # 如果找不到前一個月的資料，嘗試使用前兩個月的資料
-                prev_prev_month = prev_month - pd.DateOffset(months=1)
-                prev_prev_month_data = self.monthly_data[
-                    (self.monthly_data['date'].dt.year == prev_prev_month.year) &
-                    (self.monthly_data['date'].dt.month == prev_prev_month.month)
-                ]
-                
-                if not prev_prev_month_data.empty:
-                    prev_prev_month_row = prev_prev_month_data.iloc[0]
-                    # 計算發布日期
-                    publish_date = pd.Timestamp(prev_prev_month.year, prev_prev_month.month, 27) + pd.DateOffset(months=1)
-                    daily_records.append({
-                        'date': trading_day,
-                        'score': prev_prev_month_row['score'],
-                        'signal': prev_prev_month_row.get('signal', None),
-                        'publish_date': publish_date,
-                        'data_year': prev_prev_month.year,
-                        'data_month': prev_prev_month.month
-                    })
-        
-        daily_df = pd.DataFrame(daily_records)
+        # 因為N月的資料在N+1月27日才發布，所以在N+1月的交易日應該使用N月（前一個月）的資料，
+        # 找不到時改用前兩個月的資料。以「年 * 12 + 月」的月份序號做 merge_asof，
+        # 向前最多容許一個月，一次完成所有交易日的對應
+        trading_df = pd.DataFrame({'date': trading_days})
+        trading_df['month_key'] = trading_df['date'].dt.year * 12 + trading_df['date'].dt.month - 2
+        
+        # 同一月份有多筆資料時使用第一筆
+        monthly_df = self.monthly_data.drop_duplicates('date')
+        monthly_df = pd.DataFrame({
+            'data_key': monthly_df['date'].dt.year * 12 + monthly_df['date'].dt.month - 1,
+            'score': monthly_df['score'],
+            'signal': monthly_df['signal'] if 'signal' in monthly_df.columns else None
+        }).sort_values('data_key')
+        
+        merged = pd.merge_asof(trading_df, monthly_df, left_on='month_key', right_on='data_key',
+                               direction='backward', tolerance=1)
+        merged = merged[merged['data_key'].notna()]
+        data_key = merged['data_key'].astype('int64')
+        
+        daily_df = pd.DataFrame({
+            'date': merged['date'],
+            'score': merged['score'],
+            'signal': merged['signal'],
+            # 發布日期（資料月份+1個月的27日）
+            'publish_date': pd.to_datetime(pd.DataFrame({
+                'year': (data_key + 1) // 12,
+                'month': (data_key + 1) % 12 + 1,
+                'day': 27
+            })),
+            'data_year': data_key // 12,  # 資料所屬年份
+            'data_month': data_key % 12 + 1  # 資料所屬月份
+        })
         
         if daily_df.empty:
             print("[Warning] 轉換後的日資料為空")
@@ -192,6 +188,11 @@ class CycleDataCollector:
         daily_df['date_str'] = daily_df['date'].dt.strftime('%Y-%m-%d')
         
         self.daily_data = daily_df
+        dates = daily_df['date']
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        self._date_values = dates.to_numpy()
+        self._score_values = daily_df['score'].to_numpy()
         print(f"[Info] 成功轉換為 {len(daily_df)} 筆交易日資料")
         
         return daily_df
@@ -228,22 +229,14 @@ class CycleDataCollector:
         if self.daily_data is None:
             raise ValueError("請先呼叫 process_cycle_data() 處理資料")
         
-        if isinstance(date, str):
-            date = pd.Timestamp(date)
-        
-        # 找到最接近的交易日資料
-        date_str = date.strftime('%Y-%m-%d')
-        
-        # 精確匹配
-        match = self.daily_data[self.daily_data['date_str'] == date_str]
-        
-        if not match.empty:
-            return match.iloc[0]['score']
+        date = pd.Timestamp(date)
+        if date.tzinfo is not None:
+            date = date.tz_localize(None)
         
-        # 如果找不到，找最近的前一個交易日
-        before = self.daily_data[self.daily_data['date'] <= date]
-        if not before.empty:
-            return before.iloc[-1]['score']
+        # 找到該日（含）之前最近的交易日資料：日期已排序，以二分搜尋取代逐列比對
+        idx = np.searchsorted(self._date_values, date.to_datetime64(), side='right') - 1
+        if idx >= 0:
+            return self._score_values[idx]
         
         return None
     
@@ -280,9 +273,9 @@ class CycleDataCollector:
         if self.daily_data is None:
             raise ValueError("請先呼叫 process_cycle_data() 處理資料")
         
-        # 準備儲存的資料
-        df_to_save = self.daily_data[['date_str', 'score', 'val_shifted', 'signal']].copy()
-        df_to_save.columns = ['date', 'score', 'val_shifted', 'signal']
+        # 準備儲存的資料（save_dataframe 只讀取資料，選取欄位後直接改名，不另外複製）
+        df_to_save = self.daily_data[['date_str', 'score', 'val_shifted', 'signal']].set_axis(
+            ['date', 'score', 'val_shifted', 'signal'], axis=1)
         
         # 儲存到資料庫
         db_manager.save_dataframe(df_to_save, table_name, if_exists='replace')
@@ -9,6 +9,16 @@ from datetime import datetime
 import os
 
 
+# 資料庫結構版本（記錄在 PRAGMA user_version）：達到此版本後不再檢查舊版資料表結構
+_SCHEMA_VERSION = 1
+
+# 股價資料表的 (ticker, date) 索引名稱（主鍵為 (date, ticker)）：資料表建立或重建後都要補建
+_PRICE_TABLE_INDEXES = {
+    'tw_stock_price_data': 'idx_tw_stock_price_ticker_date',
+    'tw_otc_stock_price_data': 'idx_tw_otc_stock_price_ticker_date',
+}
+
+
 class DatabaseManager:
     """資料庫管理類別"""
     
@@ -20,6 +30,12 @@ class DatabaseManager:
         - db_path: SQLite 資料庫路徑
         """
         self.db_path = db_path
+        # 管理器內部方法共用的長連線（第一次使用時建立，避免每次查詢重新連線）
+        self._conn = None
+        # 資料表欄位名稱快取 {table_name: set(column_names)}，只記錄已存在的資料表；
+        # 透過管理器刪除或重建資料表時（含 save_dataframe 的 replace）移除對應項目；
+        # 其他連線自行執行的 DDL 不會反映在快取中
+        self._schema_cache = {}
         self._ensure_database_exists()
     
     def _ensure_database_exists(self):
@@ -30,9 +46,16 @@ class DatabaseManager:
             conn.close()
             print(f"[Info] 建立新資料庫: {self.db_path}")
         
+        # WAL 模式會記錄在資料庫檔案中，設定一次即對之後所有連線生效
+        self._shared_connection().execute("PRAGMA journal_mode=WAL")
+        
+        # 舊版指數表結構的檢查與重建只需執行一次，完成後以 user_version 記錄
+        schema_version = self.execute_query("PRAGMA user_version")[0][0]
+        check_legacy_schema = schema_version < _SCHEMA_VERSION
+        
         # 確保所需資料表存在
-        self.init_price_indices_table()
-        self.init_return_indices_table()
+        self.init_price_indices_table(check_legacy_schema)
+        self.init_return_indices_table(check_legacy_schema)
         self.init_otc_stock_price_table()
         self.init_market_margin_table()
         # 確保上市/上櫃股票資料表含必要欄位
@@ -43,15 +66,59 @@ class DatabaseManager:
         self.ensure_table_column('leading_indicators_data', 'm1b_yoy_momentum', 'REAL')
         self.ensure_table_column('leading_indicators_data', 'm1b_mom', 'REAL')
         self.ensure_table_column('leading_indicators_data', 'm1b_vs_3m_avg', 'REAL')
+        # 股價資料表以 (ticker, date) 索引加速單一標的的日期範圍查詢
+        for table_name in _PRICE_TABLE_INDEXES:
+            self._ensure_price_table_index(table_name)
         # 初始化技術指標表
         self.init_stock_technical_indicators_table()
         self.init_stock_technical_indicators_monthly_table()
         # 初始化總經指標合併表
         self.init_merged_economic_indicators_table()
+        
+        if check_legacy_schema:
+            self._shared_connection().execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+    
+    def _connect(self):
+        """
+        開啟新的資料庫連接並套用效能設定
+        
+        WAL 模式下 synchronous=NORMAL 不需每次提交都 fsync；暫存表放在記憶體，
+        並加大頁面快取（64MB）與記憶體映射（256MB）以加快重複查詢
+        """
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+    
+    def _shared_connection(self):
+        """取得管理器內部共用的長連線（第一次使用時建立）"""
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+    
+    def _release_connection(self, conn):
+        """
+        內部方法使用完共用連線後呼叫：未提交的變更一律回滾
+        （與過去每次關閉連線時捨棄未提交變更的行為相同），連線本身保持開啟
+        """
+        if conn.in_transaction:
+            conn.rollback()
     
     def get_connection(self):
-        """取得資料庫連接"""
-        return sqlite3.connect(self.db_path)
+        """
+        取得新的資料庫連接（由呼叫端負責關閉）
+        
+        管理器內部方法使用共用的長連線；此方法提供給外部模組自行管理交易的情況
+        """
+        return self._connect()
+    
+    def close(self):
+        """關閉管理器內部共用的資料庫連線"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
     
     def execute_query(self, query, params=None):
         """
@@ -64,7 +131,7 @@ class DatabaseManager:
         回傳:
         - 查詢結果列表
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         try:
             cursor = conn.cursor()
             if params:
@@ -74,51 +141,64 @@ class DatabaseManager:
             results = cursor.fetchall()
             return results
         finally:
-            conn.close()
+            self._release_connection(conn)
     
-    def execute_query_dataframe(self, query, params=None):
+    def execute_query_dataframe(self, query, params=None, chunksize=None):
         """
         執行查詢並回傳 DataFrame
         
         參數:
         - query: SQL 查詢語句
         - params: 查詢參數（可選）
+        - chunksize: 每批讀取的資料筆數（可選）；指定時逐批從游標讀取，
+          不一次將整個查詢結果載入記憶體
         
         回傳:
-        - DataFrame
+        - DataFrame；指定 chunksize 時為依序產生 DataFrame 的迭代器
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         try:
             if params:
-                df = pd.read_sql_query(query, conn, params=params)
+                df = pd.read_sql_query(query, conn, params=params, chunksize=chunksize)
             else:
-                df = pd.read_sql_query(query, conn)
+                df = pd.read_sql_query(query, conn, chunksize=chunksize)
             return df
         finally:
-            conn.close()
+            self._release_connection(conn)
     
-    def save_dataframe(self, df, table_name, if_exists='replace'):
+    def save_dataframe(self, df, table_name, if_exists='replace', chunksize=10000):
         """
         儲存 DataFrame 到資料庫
         
+        pandas 對 sqlite3 連線已在單一交易內以 executemany 批次寫入；
+        分段寫入讓每次 executemany 只建立 chunksize 筆資料列的 tuple，降低大量資料的記憶體峰值
+        
         參數:
         - df: 要儲存的 DataFrame
         - table_name: 資料表名稱
         - if_exists: 如果表存在時的處理方式（'replace', 'append', 'fail'）
+        - chunksize: 每批寫入的資料筆數（None 表示一次寫入全部）
         """
         if df.empty:
             print(f"[Warning] DataFrame 為空，跳過儲存到 {table_name}")
             return
         
-        conn = self.get_connection()
+        conn = self._shared_connection()
         try:
-            df.to_sql(table_name, conn, if_exists=if_exists, index=False)
+            df.to_sql(table_name, conn, if_exists=if_exists, index=False, chunksize=chunksize)
             print(f"[Info] 成功儲存 {len(df)} 筆資料到 {table_name}")
         except Exception as e:
             print(f"[Error] 儲存資料到 {table_name} 失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
+            # 非 append 模式可能刪除並重建資料表，欄位快取失效
+            if if_exists != 'append':
+                self._schema_cache.pop(table_name, None)
+        
+        # 重建的股價資料表需要補建索引
+        if if_exists != 'append':
+            self._ensure_price_table_index(table_name)
     
     def get_stock_price(self, ticker=None, start_date=None, end_date=None):
         """
@@ -211,6 +291,9 @@ class DatabaseManager:
         回傳:
         - True 或 False
         """
+        if table_name in self._schema_cache:
+            return True
+        
         query = "SELECT name FROM sqlite_master WHERE type='table' AND name=?"
         results = self.execute_query(query, (table_name,))
         return len(results) > 0
@@ -225,39 +308,89 @@ class DatabaseManager:
         回傳:
         - 資料表結構資訊
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         try:
             cursor = conn.cursor()
             cursor.execute(f"PRAGMA table_info({table_name})")
             return cursor.fetchall()
         finally:
-            conn.close()
+            self._release_connection(conn)
+    
+    def _table_columns(self, table_name):
+        """
+        取得資料表的欄位名稱集合（第一次查詢後快取）
+        
+        參數:
+        - table_name: 資料表名稱
+        
+        回傳:
+        - 欄位名稱集合；資料表不存在時回傳 None（不快取）
+        """
+        columns = self._schema_cache.get(table_name)
+        if columns is None:
+            columns = {col[1] for col in self.get_table_schema(table_name)}
+            if not columns:
+                return None
+            self._schema_cache[table_name] = columns
+        return columns
     
     def ensure_table_column(self, table_name, column_name, column_definition):
         """
         確保指定資料表包含特定欄位，若不存在則新增
         """
-        if not self.check_table_exists(table_name):
+        columns = self._table_columns(table_name)
+        if columns is None or column_name in columns:
             return
         
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         try:
-            cursor.execute(f"PRAGMA table_info({table_name})")
-            columns = cursor.fetchall()
-            column_names = [col[1] for col in columns]
-            if column_name in column_names:
-                return
             cursor.execute(
                 f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_definition}"
             )
             conn.commit()
+            columns.add(column_name)
             print(f"[Info] {table_name} 已新增欄位 {column_name}")
         except Exception as e:
             conn.rollback()
+            # 欄位可能已由其他連線新增，下次重新讀取資料表結構
+            self._schema_cache.pop(table_name, None)
             print(f"[Warning] 無法為 {table_name} 新增欄位 {column_name}: {e}")
         finally:
-            conn.close()
+            self._release_connection(conn)
+    
+    def ensure_table_index(self, table_name, index_name, columns):
+        """
+        確保指定資料表有特定索引，若不存在則建立（資料表不存在時不動作）
+        
+        參數:
+        - table_name: 資料表名稱
+        - index_name: 索引名稱
+        - columns: 索引欄位列表（依序）
+        """
+        if not self.check_table_exists(table_name):
+            return
+        
+        conn = self._shared_connection()
+        try:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({', '.join(columns)})")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"[Warning] 無法為 {table_name} 建立索引 {index_name}: {e}")
+        finally:
+            self._release_connection(conn)
+    
+    def _ensure_price_table_index(self, table_name):
+        """
+        補建股價資料表的 (ticker, date) 索引（資料表建立或重建後呼叫；非股價資料表不動作）
+        
+        參數:
+        - table_name: 資料表名稱
+        """
+        index_name = _PRICE_TABLE_INDEXES.get(table_name)
+        if index_name is not None:
+            self.ensure_table_index(table_name, index_name, ['ticker', 'date'])
     
     def ensure_vix_data_derivative_columns(self):
         """
@@ -304,18 +437,23 @@ class DatabaseManager:
         query += " ORDER BY tradeDate"
         return self.execute_query_dataframe(query, params if params else None)
     
-    def init_price_indices_table(self):
+    def init_price_indices_table(self, check_legacy_schema=True):
         """
         初始化價格指數資料表（tw_price_indices_data）
         根據 API 回應格式設計：指數名稱、收盤指數、漲跌符號、漲跌點數、漲跌百分比、特殊處理註記
+        
+        參數:
+        - check_legacy_schema: 是否檢查並重建舊版表結構（資料庫已記錄為新版結構時可略過）
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
             # 檢查表是否存在
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='tw_price_indices_data'")
-            table_exists = cursor.fetchone()
+            table_exists = None
+            if check_legacy_schema:
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='tw_price_indices_data'")
+                table_exists = cursor.fetchone()
             
             if table_exists:
                 # 檢查表結構是否正確（檢查是否有 close_index 欄位）
@@ -328,6 +466,7 @@ class DatabaseManager:
                     print("[Info] 偵測到舊版價格指數表結構，正在重建...")
                     # 刪除舊表
                     cursor.execute("DROP TABLE tw_price_indices_data")
+                    self._schema_cache.pop('tw_price_indices_data', None)
                     conn.commit()
             
             # 建立價格指數資料表（符合 API 格式）
@@ -352,20 +491,25 @@ class DatabaseManager:
             print(f"[Error] 初始化價格指數資料表失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
-    def init_return_indices_table(self):
+    def init_return_indices_table(self, check_legacy_schema=True):
         """
         初始化報酬指數資料表（tw_return_indices_data）
         結構與價格指數表相同
+        
+        參數:
+        - check_legacy_schema: 是否檢查並重建舊版表結構（資料庫已記錄為新版結構時可略過）
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
             # 檢查表是否存在
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='tw_return_indices_data'")
-            table_exists = cursor.fetchone()
+            table_exists = None
+            if check_legacy_schema:
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='tw_return_indices_data'")
+                table_exists = cursor.fetchone()
             
             if table_exists:
                 # 檢查表結構是否正確（檢查是否有 close_index 欄位）
@@ -378,6 +522,7 @@ class DatabaseManager:
                     print("[Info] 偵測到舊版報酬指數表結構，正在重建...")
                     # 刪除舊表
                     cursor.execute("DROP TABLE tw_return_indices_data")
+                    self._schema_cache.pop('tw_return_indices_data', None)
                     conn.commit()
             
             # 建立報酬指數資料表（符合 API 格式）
@@ -402,14 +547,14 @@ class DatabaseManager:
             print(f"[Error] 初始化報酬指數資料表失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def init_otc_stock_price_table(self):
         """
         初始化上櫃股票資料表（tw_otc_stock_price_data）
         結構與上市股票資料表相同，獨立儲存櫃買中心資料
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
@@ -437,14 +582,14 @@ class DatabaseManager:
             print(f"[Error] 初始化上櫃股票資料表失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def init_market_margin_table(self):
         """
         初始化大盤融資融券資料表（market_margin_data）
         儲存從證交所 MI_MARGN API 取得的每日融資融券原始數據
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
@@ -479,7 +624,7 @@ class DatabaseManager:
             print(f"[Error] 初始化大盤融資融券資料表失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def get_market_margin_data(self, start_date=None, end_date=None):
         """
@@ -545,7 +690,7 @@ class DatabaseManager:
         參數:
         - table_name: 要清除的資料表名稱
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         try:
             cursor.execute(f"DELETE FROM {table_name}")
@@ -556,14 +701,14 @@ class DatabaseManager:
             print(f"[Error] 清除 {table_name} 表資料失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def modify_stock_price_table_add_stock_name(self):
         """
         修改 tw_stock_price_data 表，在 date 和 ticker 之間新增 stock_name 欄位
         由於 SQLite 不支援 ALTER TABLE ADD COLUMN AFTER，需要重建表結構
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
@@ -589,6 +734,7 @@ class DatabaseManager:
                     )
                 ''')
                 conn.commit()
+                self._ensure_price_table_index('tw_stock_price_data')
                 print("[Info] 已建立新的 tw_stock_price_data 表（包含 stock_name 欄位）")
                 return
             
@@ -636,8 +782,10 @@ class DatabaseManager:
             
             # 重新命名新表
             cursor.execute("ALTER TABLE tw_stock_price_data_new RENAME TO tw_stock_price_data")
+            self._schema_cache.pop('tw_stock_price_data', None)
             
             conn.commit()
+            self._ensure_price_table_index('tw_stock_price_data')
             print("[Info] tw_stock_price_data 表結構重建完成（已加入 stock_name 欄位）")
             
         except Exception as e:
@@ -645,7 +793,7 @@ class DatabaseManager:
             print(f"[Error] 修改 tw_stock_price_data 表結構失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def get_return_indices(self, ticker=None, start_date=None, end_date=None):
         """
@@ -685,7 +833,7 @@ class DatabaseManager:
         參數:
         - table_name: 資料表名稱
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         try:
             cursor.execute(f"DELETE FROM {table_name}")
@@ -696,14 +844,14 @@ class DatabaseManager:
             print(f"[Error] 清除 {table_name} 表資料失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def modify_stock_price_table_add_stock_name(self):
         """
         修改 tw_stock_price_data 表結構，在 date 和 ticker 之間加入 stock_name 欄位
         由於 SQLite 不支援 ALTER TABLE ADD COLUMN AFTER，需要重建表
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
@@ -728,6 +876,7 @@ class DatabaseManager:
                     )
                 ''')
                 conn.commit()
+                self._ensure_price_table_index('tw_stock_price_data')
                 print("[Info] 已建立包含 stock_name 欄位的 tw_stock_price_data 表")
                 return
             
@@ -773,8 +922,10 @@ class DatabaseManager:
             
             # 4. 重新命名新表
             cursor.execute('ALTER TABLE tw_stock_price_data_new RENAME TO tw_stock_price_data')
+            self._schema_cache.pop('tw_stock_price_data', None)
             
             conn.commit()
+            self._ensure_price_table_index('tw_stock_price_data')
             print("[Info] 已成功重建 tw_stock_price_data 表結構，加入 stock_name 欄位")
             
         except Exception as e:
@@ -782,13 +933,13 @@ class DatabaseManager:
             print(f"[Error] 修改 tw_stock_price_data 表結構失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def init_leading_indicators_table(self):
         """
         初始化領先指標資料表（leading_indicators_data）
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
@@ -815,13 +966,13 @@ class DatabaseManager:
             print(f"[Error] 初始化領先指標資料表失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def init_coincident_indicators_table(self):
         """
         初始化同時指標資料表（coincident_indicators_data）
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
@@ -845,13 +996,13 @@ class DatabaseManager:
             print(f"[Error] 初始化同時指標資料表失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def init_lagging_indicators_table(self):
         """
         初始化落後指標資料表（lagging_indicators_data）
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
@@ -873,13 +1024,13 @@ class DatabaseManager:
             print(f"[Error] 初始化落後指標資料表失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def init_composite_indicators_table(self):
         """
         初始化綜合指標資料表（composite_indicators_data）
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
@@ -904,13 +1055,13 @@ class DatabaseManager:
             print(f"[Error] 初始化綜合指標資料表失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def init_business_cycle_signal_components_table(self):
         """
         初始化景氣對策信號構成項目資料表（business_cycle_signal_components_data）
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
@@ -935,7 +1086,7 @@ class DatabaseManager:
             print(f"[Error] 初始化景氣對策信號構成項目資料表失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def init_all_indicator_tables(self):
         """
@@ -955,7 +1106,7 @@ class DatabaseManager:
         此表包含所有合併後的總經指標，帶前綴（leading_, coincident_, lagging_, signal_）
         注意：表結構會動態調整以適應實際匯入的欄位
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
@@ -981,13 +1132,13 @@ class DatabaseManager:
             print(f"[Error] 初始化總經指標合併表失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def init_stock_technical_indicators_table(self):
         """
         初始化日線技術指標資料表（stock_technical_indicators）
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
@@ -1018,13 +1169,13 @@ class DatabaseManager:
             print(f"[Error] 初始化日線技術指標資料表失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def init_stock_technical_indicators_monthly_table(self):
         """
         初始化月線技術指標資料表（stock_technical_indicators_monthly）
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
@@ -1055,14 +1206,14 @@ class DatabaseManager:
             print(f"[Error] 初始化月線技術指標資料表失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def ensure_etf_006208_monthly_future_table(self):
         """
         確保 etf_006208_monthly_future 資料表存在。
         儲存 006208 月線 OHLCV、月均價/月中位數、三種未來1月報酬率、未來1月最高/最低價。
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         try:
             cursor.execute('''
@@ -1089,14 +1240,14 @@ class DatabaseManager:
             print(f"[Error] ensure_etf_006208_monthly_future_table 失敗: {e}")
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
     
     def create_chinese_views(self):
         """
         為所有資料表建立中文別名 VIEW
         使用 vw_ 前綴命名，例如：vw_tw_stock_price_data
         """
-        conn = self.get_connection()
+        conn = self._shared_connection()
         cursor = conn.cursor()
         
         try:
@@ -1668,5 +1819,5 @@ class DatabaseManager:
             traceback.print_exc()
             raise
         finally:
-            conn.close()
+            self._release_connection(conn)
 
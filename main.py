@@ -889,7 +889,8 @@ def run_backtest_new():
                         hedge_ticker, 
                         model_path=None,  # 多模型模式不需要單一 model_path
                         use_multi_model=True,
-                        model_price_ranges=model_price_ranges
+                        model_price_ranges=model_price_ranges,
+                        verbose=True
                     )
                 elif strategy_name == 'Cash':
                     # Cash Strategy 沒有 hedge_ticker
@@ -922,8 +923,12 @@ def run_backtest_new():
                 strategy_tickers.append(hedge_ticker)
             
             # 執行回測
+            # 回測開始買進由引擎在第一個有價格的交易日呼叫（週期策略才有）
+            initial_orders_func = getattr(strategy, 'initial_orders', None)
+            
             engine = BacktestEngineNew(initial_capital=capital)
-            results = engine.run_backtest(start_date, end_date, strategy_func, tickers=strategy_tickers)
+            results = engine.run_backtest(start_date, end_date, strategy_func, tickers=strategy_tickers,
+                                          initial_orders_func=initial_orders_func)
             
             # 產生持倉變動摘要
             position_summary = engine.generate_position_summary()
@@ -1380,7 +1385,7 @@ def run_backtest():
                 elif strategy_name == 'TSMCProportionalAllocation':
                     strategy = strategy_class(stock_ticker, hedge_ticker)
                 elif strategy_name in ['M1BFilterProportional', 'DynamicPositionProportional']:
-                    # 這些策略需要特殊處理（多重繼承）
+                    # 這些策略內部組合等比例配置邏輯
                     strategy = strategy_class(stock_ticker, hedge_ticker)
                 elif hedge_ticker:
                     strategy = strategy_class(stock_ticker, hedge_ticker)
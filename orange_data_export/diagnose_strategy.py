@@ -12,7 +12,7 @@ import numpy as np
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from backtesting.strategy_orange import OrangePredictionStrategy
+    from backtesting.strategy_orange_momentum import OrangeMomentumStrategy
 except Exception as e:
     print(f"[Error] 無法導入策略模組: {e}")
     import traceback
@@ -43,7 +43,7 @@ def diagnose_strategy():
     
     # 創建策略實例
     print(f"\n[步驟 2] 初始化策略")
-    strategy = OrangePredictionStrategy(
+    strategy = OrangeMomentumStrategy(
         stock_ticker='006208',
         model_path='orange_data_export/tree.pkcls'
     )
@@ -80,7 +80,7 @@ def diagnose_strategy():
         current_price = row['close']
         
         # 獲取預測價格
-        predicted_price = strategy._predict_price(row)
+        predicted_price = strategy._predict_price(row).get('predicted_price')
         
         if predicted_price is None:
             analysis_results.append({
@@ -108,7 +108,7 @@ def diagnose_strategy():
         
         # 獲取動量確認狀態
         momentum_confirmation = state.get('momentum_confirmation', 0)
-        prediction_history_len = len(state.get('prediction_history', []))
+        prediction_history_len = state.get('pred_count', 0)
         
         # 模擬執行 generate_orders（但不實際交易）
         price_dict = {'006208': current_price}
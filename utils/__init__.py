@@ -0,0 +1,4 @@
+"""
+工具模組
+包含時間戳轉換、可選依賴的相容層等共用工具
+"""
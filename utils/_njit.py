@@ -0,0 +1,15 @@
+"""
+Numba njit 相容層
+Numba 為可選依賴：未安裝時 njit 為不做事的裝飾器，函數以純 Python 執行
+"""
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func